@@ -1,11 +1,25 @@
+from typing import TYPE_CHECKING
+from typing import AsyncGenerator
 from typing import Generator
+from typing import Iterator
 from typing import Optional
+from typing import Union
+import asyncio
 import logging
+from contextlib import aclosing
 
 from pydantic import BaseModel, Field
 from rich.text import Text
 from rich.console import Console
 
+from proscenium.routing import PreRouter
+from proscenium.routing import RoutingCache
+from proscenium.speculation import SpeculationStats
+from proscenium.speculation import iterate_in_threads
+
+if TYPE_CHECKING:
+    from proscenium.patterns.routing import BatchRouter
+
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 log = logging.getLogger(__name__)
@@ -34,6 +48,26 @@ class WantsToHandleResponse(BaseModel):
     )
 
 
+class CharacterWantsToHandleResponse(WantsToHandleResponse):
+    """
+    Whether the named Character wants to handle the provided utterance.
+    """
+
+    character: str = Field(
+        description="The name of the Character, exactly as listed.",
+    )
+
+
+class WantsToHandleBatchResponse(BaseModel):
+    """
+    For each listed Character, whether it wants to handle the provided utterance.
+    """
+
+    decisions: list[CharacterWantsToHandleResponse] = Field(
+        description="One decision for each listed Character.",
+    )
+
+
 class Prop:
     """
     A `Prop` is a resource available to the `Character`s in a `Scene`.
@@ -66,8 +100,24 @@ class Character:
     A `Character` is a participant in a `Scene` that `handle`s utterances from the
     scene by producing its own utterances."""
 
-    def __init__(self, admin_channel_id: str):
+    def __init__(
+        self,
+        admin_channel_id: str,
+        routing_cache: Union[RoutingCache, bool, None] = None,
+        pre_routers: Optional[list[PreRouter]] = None,
+        speculate: bool = False,
+    ):
         self.admin_channel_id = admin_channel_id
+        if routing_cache is None or routing_cache is True:
+            routing_cache = RoutingCache()
+        elif routing_cache is False:
+            # An empty cache that keeps nothing
+            routing_cache = RoutingCache(max_entries=0)
+        self.routing_cache = routing_cache
+        self.pre_routers = pre_routers or []
+        # Start `handle` alongside a slow `wants_to_handle`. See proscenium.speculation
+        self.speculate = speculate
+        self.speculation_stats = SpeculationStats()
 
     def name(self) -> str:
         return self.__class__.__name__
@@ -79,13 +129,130 @@ class Character:
         return f"- {self.name()}, {self.description().strip()}"
 
     def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        """
+        Whether this character wants to handle `utterance`.
+
+        Decisions are cached by `routing_key`, which depends on the
+        utterance alone: the same utterance in another channel or from
+        another speaker gets the cached decision. Characters whose decision
+        depends on `channel_id` or `speaker_id` should pass
+        `routing_cache=False`.
+        """
         return False
 
+    def routing_key(self, utterance: str) -> tuple:
+        """
+        The routing cache key for `utterance`. Characters that decide with an
+        LLM keep its id in `control_flow_model`, so changing models does not
+        reuse stale decisions.
+        """
+        return RoutingCache.key(
+            self.name(), getattr(self, "control_flow_model", None), utterance
+        )
+
+    def quick_decision(self, utterance: str) -> Optional[bool]:
+        """
+        A decision that needs no `wants_to_handle` call: the first confident
+        `pre_routers` answer, else a recent decision from the routing cache.
+        None when neither knows.
+        """
+        for pre_router in self.pre_routers:
+            decision = pre_router.route(utterance)
+            if decision is not None:
+                log.info(
+                    "%s pre-routed by %s: %s",
+                    self.name(),
+                    pre_router.__class__.__name__,
+                    decision,
+                )
+                return decision
+
+        decision = self.routing_cache.get(self.routing_key(utterance))
+        if decision is not None:
+            log.info("%s routing decision from cache: %s", self.name(), decision)
+        return decision
+
+    def ask_wants_to_handle(
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> bool:
+        """`wants_to_handle`, with the decision added to the routing cache."""
+        decision = self.wants_to_handle(channel_id, speaker_id, utterance)
+        if decision is not None:
+            self.routing_cache.put(self.routing_key(utterance), bool(decision))
+        return bool(decision)
+
+    def decide_to_handle(
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> bool:
+        """
+        `wants_to_handle`, unless `quick_decision` already knows the answer.
+        Interfaces call this rather than `wants_to_handle`.
+        """
+        decision = self.quick_decision(utterance)
+        if decision is not None:
+            return decision
+        return self.ask_wants_to_handle(channel_id, speaker_id, utterance)
+
     def handle(
-        channel_id: str, speaker_id: str, utterance: str
-    ) -> Generator[tuple[str, str], None, None]:
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> Generator[tuple[str, Union[str, Iterator[str]]], None, None]:
+        """
+        Yields (channel_id, response) pairs. A response is either the full
+        text, or an iterator of text chunks that interfaces may show
+        incrementally as they arrive.
+        """
         pass
 
+    async def awants_to_handle(
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> bool:
+        """
+        Async variant of `wants_to_handle`, used by asyncio interfaces.
+        Runs `wants_to_handle` in a worker thread unless overridden.
+        """
+        return await asyncio.to_thread(
+            self.wants_to_handle, channel_id, speaker_id, utterance
+        )
+
+    async def aask_wants_to_handle(
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> bool:
+        """Async variant of `ask_wants_to_handle`."""
+        decision = await self.awants_to_handle(channel_id, speaker_id, utterance)
+        if decision is not None:
+            self.routing_cache.put(self.routing_key(utterance), bool(decision))
+        return bool(decision)
+
+    async def adecide_to_handle(
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> bool:
+        """Async variant of `decide_to_handle`."""
+        decision = self.quick_decision(utterance)
+        if decision is not None:
+            return decision
+        return await self.aask_wants_to_handle(channel_id, speaker_id, utterance)
+
+    async def ahandle(
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> AsyncGenerator[tuple[str, Union[str, Iterator[str]]], None]:
+        """
+        Async variant of `handle`, used by asyncio interfaces.
+        Steps through `handle` in a worker thread unless overridden.
+        A response may also be an async iterator of text chunks.
+        """
+        async with aclosing(
+            iterate_in_threads(self.handle(channel_id, speaker_id, utterance))
+        ) as responses:
+            async for response in responses:
+                yield response
+
+
+def characters_in_place(place: Union[Character, list[Character]]) -> list[Character]:
+    """The characters in a `Scene.places` entry, as a list."""
+    if isinstance(place, Character):
+        return [place]
+    return list(place)
+
 
 class Scene:
     """
@@ -134,7 +301,11 @@ Props:
     def characters(self) -> list[Character]:
         return []
 
-    def places(self) -> dict[str, Character]:
+    def places(self) -> dict[str, Union[Character, list[Character]]]:
+        """
+        The characters placed in each channel, by channel id. A channel may
+        hold one character or a list of candidates, earliest listed first.
+        """
         pass
 
     def curtain(self) -> None:
@@ -177,6 +348,14 @@ class Production:
     def scenes(self) -> list[Scene]:
         return []
 
+    def router(self) -> Optional["BatchRouter"]:
+        """
+        A `proscenium.patterns.routing.BatchRouter` that decides among
+        several characters placed in one channel with a single LLM call.
+        None, the default, asks each character separately.
+        """
+        return None
+
     def curtain(self) -> None:
         for scene in self.scenes():
             scene.curtain()
@@ -35,6 +35,7 @@ class Admin(Character):
         return False
 
     def handle(
+        self,
         channel_id: str,
         speaker_id: str,
         question: str,
@@ -0,0 +1,278 @@
+"""
+A semantic cache of `proscenium.patterns.rag.answer_question` answers.
+
+Questions are looked up by their embedding, computed with the same
+embedding function used to search the collection, so a new phrasing of an
+answered question is answered without retrieval or generation. An answer
+is reused when the cosine similarity of the questions is at least
+`threshold`, for the same collection and generator model.
+
+Each collection has its own index. Entries expire after `ttl_seconds`, and
+the least recently used are evicted beyond `max_entries` per collection.
+Call `invalidate(collection_name)` when a collection is rebuilt or
+changed, so stale answers are not served.
+
+`proscenium.bin.production_from_config` installs the default cache from
+the `inference.answer_cache` configuration section.
+"""
+
+from typing import Any
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_answer_cache_threshold = 0.95
+default_answer_cache_max_entries = 1000
+default_answer_cache_ttl_seconds = 86400.0
+
+
+def unit_vector(vector: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float64)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return vector
+    return vector / norm
+
+
+class CachedAnswer:
+
+    __slots__ = ["question", "vector", "answer", "expires"]
+
+    def __init__(self, question: str, vector: np.ndarray, answer: str, expires: float):
+        self.question = question
+        self.vector = vector
+        self.answer = answer
+        self.expires = expires
+
+
+class AnswerMatrix:
+    """
+    A snapshot of one collection's unexpired answers, with their question
+    vectors stacked in a matrix so a lookup is one matrix product. It is
+    rebuilt once its earliest answer expires.
+    """
+
+    def __init__(self, items: list[tuple[tuple[str, str], CachedAnswer]], now: float):
+
+        items = [(key, entry) for key, entry in items if entry.expires > now]
+        self.keys = [key for key, _ in items]
+        self.model_ids = np.array([key[0] for key in self.keys], dtype=object)
+        self.earliest_expiry = min((e.expires for _, e in items), default=math.inf)
+        self.vectors = np.stack([entry.vector for _, entry in items]) if items else None
+
+    def closest(
+        self, model_id: str, vector: np.ndarray
+    ) -> tuple[Optional[tuple[str, str]], float]:
+        """The key of the most similar answer from `model_id`, and its similarity."""
+
+        if self.vectors is None:
+            return None, -math.inf
+
+        similarities = self.vectors @ vector
+        similarities[self.model_ids != model_id] = -math.inf
+        best = int(np.argmax(similarities))
+        return self.keys[best], float(similarities[best])
+
+
+class CollectionAnswers:
+    """
+    The cached answers about one collection, in least recently used order.
+    `matrix` is rebuilt on the first lookup after answers change.
+    """
+
+    __slots__ = ["entries", "version", "matrix"]
+
+    def __init__(self):
+        self.entries: OrderedDict[tuple[str, str], CachedAnswer] = OrderedDict()
+        self.version = 0
+        self.matrix: Optional[AnswerMatrix] = None
+
+    def changed(self) -> None:
+        self.version += 1
+        self.matrix = None
+
+
+class SemanticAnswerCache:
+    """
+    Answers to questions about each collection, found by the similarity of
+    the question embeddings. `hits` and `misses` count lookups.
+
+    Similarities are computed outside the lock, against a snapshot of the
+    collection, so concurrent lookups do not wait for each other.
+    """
+
+    def __init__(
+        self,
+        threshold: float = default_answer_cache_threshold,
+        max_entries: int = default_answer_cache_max_entries,
+        ttl_seconds: float = default_answer_cache_ttl_seconds,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+        # Per collection name: (model id, question) -> cached answer
+        self._collections: dict[str, CollectionAnswers] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, collection_name: str, model_id: str, query_vector: Sequence[float]
+    ) -> Optional[str]:
+        """The answer to the most similar question, if similar enough."""
+
+        vector = unit_vector(query_vector)
+        now = time.time()
+
+        with self._lock:
+            answers = self._collections.get(collection_name, None)
+            if answers is None:
+                self.misses += 1
+                return None
+            matrix = answers.matrix
+            if matrix is not None and matrix.earliest_expiry <= now:
+                matrix = None
+            version = answers.version
+            items = list(answers.entries.items()) if matrix is None else None
+
+        if matrix is None:
+            matrix = AnswerMatrix(items, now)
+            self._store(answers, version, matrix)
+
+        key, similarity = matrix.closest(model_id, vector)
+
+        with self._lock:
+            entry = None
+            if key is not None and similarity >= self.threshold:
+                if self._collections.get(collection_name, None) is answers:
+                    entry = answers.entries.get(key, None)
+            if entry is None or entry.expires <= now:
+                self.misses += 1
+                return None
+            answers.entries.move_to_end(key)
+            self.hits += 1
+
+        log.info(
+            "Answering from the cached answer to %r (similarity %.3f)",
+            key[1],
+            similarity,
+        )
+        return entry.answer
+
+    def _store(
+        self, answers: CollectionAnswers, version: int, matrix: AnswerMatrix
+    ) -> None:
+        """Keeps `matrix` unless the answers changed while it was built."""
+
+        with self._lock:
+            if answers.version != version:
+                return
+            kept = set(matrix.keys)
+            expired = [key for key in answers.entries if key not in kept]
+            for key in expired:
+                del answers.entries[key]
+            answers.matrix = matrix
+
+    def put(
+        self,
+        collection_name: str,
+        model_id: str,
+        question: str,
+        query_vector: Sequence[float],
+        answer: str,
+    ) -> None:
+
+        if not isinstance(answer, str) or self.max_entries <= 0:
+            return
+
+        entry = CachedAnswer(
+            question, unit_vector(query_vector), answer, time.time() + self.ttl_seconds
+        )
+        with self._lock:
+            answers = self._collections.setdefault(collection_name, CollectionAnswers())
+            answers.entries[(model_id, question)] = entry
+            answers.entries.move_to_end((model_id, question))
+            while len(answers.entries) > self.max_entries:
+                answers.entries.popitem(last=False)
+            answers.changed()
+
+    def invalidate(self, collection_name: str) -> None:
+        """Forgets every answer about `collection_name`."""
+
+        with self._lock:
+            forgotten = self._collections.pop(collection_name, None)
+        if forgotten is not None and forgotten.entries:
+            log.info(
+                "Forgot %s cached answers about %s",
+                len(forgotten.entries),
+                collection_name,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._collections.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries = {name: len(a.entries) for name, a in self._collections.items()}
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+_default_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def set_default_answer_cache(cache: Optional[SemanticAnswerCache]) -> None:
+    global _default_answer_cache
+    _default_answer_cache = cache
+
+
+def default_answer_cache() -> Optional[SemanticAnswerCache]:
+    return _default_answer_cache
+
+
+def answer_cache_from_config(
+    answer_cache_config: dict,
+) -> Optional[SemanticAnswerCache]:
+    """
+    A cache from the `inference.answer_cache` configuration section, or
+    None unless it sets `enabled: true`.
+    """
+
+    if not answer_cache_config.get("enabled", False):
+        return None
+
+    return SemanticAnswerCache(
+        threshold=answer_cache_config.get("threshold", default_answer_cache_threshold),
+        max_entries=answer_cache_config.get(
+            "max_entries", default_answer_cache_max_entries
+        ),
+        ttl_seconds=answer_cache_config.get(
+            "ttl_seconds", default_answer_cache_ttl_seconds
+        ),
+    )
+
+
+def resolve_answer_cache(
+    cache: Union[SemanticAnswerCache, bool, None],
+) -> Optional[SemanticAnswerCache]:
+    """The cache a call site asked for: its own, none (False), or the default."""
+
+    if cache is False:
+        return None
+    if cache is None or cache is True:
+        return _default_answer_cache
+    return cache
@@ -6,6 +6,20 @@ import yaml
 from pathlib import Path
 from rich.console import Console
 from proscenium import Production
+from proscenium.answer_cache import answer_cache_from_config
+from proscenium.answer_cache import set_default_answer_cache
+from proscenium.clients import client_registry_from_config
+from proscenium.clients import set_default_client_registry
+from proscenium.completion_cache import completion_cache_from_config
+from proscenium.completion_cache import set_default_completion_cache
+from proscenium.concurrency import limiter_from_config
+from proscenium.concurrency import set_default_limiter
+from proscenium.failover import failover_from_config
+from proscenium.failover import set_default_failover
+from proscenium.prompt_cache import prompt_caching_from_config
+from proscenium.prompt_cache import set_default_prompt_caching
+from proscenium.tokens import set_default_token_accounting
+from proscenium.tokens import token_accounting_from_config
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
@@ -23,6 +37,28 @@ def load_config(config_file_name: Path) -> dict:
         return config
 
 
+def configure_inference(inference_config: dict) -> None:
+    """Process-wide inference settings from the `inference` configuration section."""
+
+    set_default_answer_cache(
+        answer_cache_from_config(inference_config.get("answer_cache", {}))
+    )
+    set_default_client_registry(
+        client_registry_from_config(inference_config.get("providers", {}))
+    )
+    set_default_completion_cache(
+        completion_cache_from_config(inference_config.get("cache", {}))
+    )
+    set_default_failover(failover_from_config(inference_config.get("failover", {})))
+    set_default_limiter(limiter_from_config(inference_config.get("concurrency", {})))
+    set_default_prompt_caching(
+        prompt_caching_from_config(inference_config.get("prompt_caching", {}))
+    )
+    set_default_token_accounting(
+        token_accounting_from_config(inference_config.get("tokens", {}))
+    )
+
+
 def production_from_config(
     config_file_name: Path,
     get_secret: Callable[[str, str], str],
@@ -31,6 +67,8 @@ def production_from_config(
 
     config = load_config(config_file_name)
 
+    configure_inference(config.get("inference", {}))
+
     production_config = config.get("production", {})
 
     production_module_name = production_config.get("module", None)
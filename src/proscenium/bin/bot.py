@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import typer
+import asyncio
 import time
 import os
 import sys
@@ -11,6 +12,10 @@ from rich.console import Console
 from proscenium import header
 from proscenium.bin import production_from_config
 from proscenium.interfaces.slack import SlackProductionProcessor
+from proscenium.interfaces.slack_async import AsyncSlackProductionProcessor
+from proscenium.metrics import start_metrics
+from proscenium.tracing import add_subscriber
+from proscenium.tracing_console import RichConsoleSubscriber
 
 logging.basicConfig(
     stream=sys.stdout,
@@ -32,6 +37,11 @@ def start(
         help="The name of the Proscenium YAML configuration file.",
     ),
     verbose: bool = False,
+    use_asyncio: bool = typer.Option(
+        False,
+        "--asyncio",
+        help="Handle Slack events on an asyncio event loop instead of threads.",
+    ),
 ):
 
     console = Console()
@@ -42,6 +52,7 @@ def start(
         logging.getLogger("proscenium").setLevel(logging.INFO)
         logging.getLogger("demo").setLevel(logging.INFO)
         sub_console = console
+        add_subscriber(RichConsoleSubscriber(console))
 
     console.print(header())
 
@@ -49,15 +60,36 @@ def start(
         config_file, os.environ.get, sub_console
     )
 
+    metrics_server = start_metrics(config.get("metrics", {}))
+
     console.print("Preparing props...")
     production.prepare_props()
     console.print("Props are up-to-date.")
 
-    slack_admin_channel = config.get("slack", {}).get("admin_channel", None)
+    slack_config = config.get("slack", {})
+    slack_admin_channel = slack_config.get("admin_channel", None)
+
+    if use_asyncio:
+        async_processor = AsyncSlackProductionProcessor(
+            production,
+            slack_admin_channel,
+            console,
+            slack_config=slack_config,
+        )
+        try:
+            asyncio.run(async_processor.run_forever())
+        except KeyboardInterrupt:
+            console.print("Exiting...")
+        finally:
+            if metrics_server is not None:
+                metrics_server.shutdown()
+        return
+
     slack_production_processor = SlackProductionProcessor(
         production,
         slack_admin_channel,
         console,
+        slack_config=slack_config,
     )
 
     try:
@@ -65,8 +97,12 @@ def start(
             time.sleep(1)
     except KeyboardInterrupt:
         console.print("Exiting...")
-
-    slack_production_processor.shutdown()
+    finally:
+        try:
+            slack_production_processor.shutdown()
+        finally:
+            if metrics_server is not None:
+                metrics_server.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+"""
+A process-wide registry of inference clients, one per provider.
+
+Each provider's `aisuite` client is built on first use and then shared by
+every character and pattern function, instead of being rebuilt per caller.
+
+Providers built on an SDK client, such as OpenAI's, keep HTTP connections
+alive in that client's pool. Those that post each request with a bare
+`httpx.post`, such as Together's, are given one pooled `httpx.Client` per
+registry instead (see `pooled_providers`), so their connections are reused
+too.
+
+Functions in `proscenium.complete` and `proscenium.patterns` that are given
+no `chat_completion_client` use `default_client(model_id)`.
+`proscenium.bin.production_from_config` installs the default registry with
+provider settings (API keys, base URLs, timeouts) from the
+`inference.providers` configuration section.
+"""
+
+from typing import Optional
+
+import functools
+import importlib
+import logging
+import threading
+
+import httpx
+
+from aisuite import Client as AISuiteClient
+from aisuite.provider import Provider
+
+from proscenium.concurrency import provider_of
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+
+pooled_providers = ("fireworks", "together", "xai")
+
+default_keepalive_connections = 20
+
+
+class PooledHTTP:
+    """
+    Stands in for the `httpx` module of an `aisuite` provider that posts
+    each request with `httpx.post`, sending the requests through one
+    `httpx.Client` so that its keep-alive connections are reused.
+    """
+
+    def __init__(self, http: httpx.Client):
+        self.http = http
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.http.post(url, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(httpx, name)
+
+
+class ClientRegistry:
+    """
+    Lazily builds and keeps one `AISuiteClient` per provider, configured
+    with `provider_configs[provider]` if present.
+
+    Providers in `pooled_providers` send their requests through `http`,
+    or an `httpx.Client` built on first use. Their `aisuite` modules are
+    shared by the process, so the last registry to build such a client
+    owns their connections.
+    """
+
+    def __init__(
+        self,
+        provider_configs: Optional[dict[str, dict]] = None,
+        http: Optional[httpx.Client] = None,
+    ):
+        self.provider_configs = provider_configs or {}
+        self.http = http
+        self._clients: dict[str, AISuiteClient] = {}
+        self._lock = threading.Lock()
+
+    def client(self, model_id: str) -> AISuiteClient:
+
+        provider = provider_of(model_id)
+        with self._lock:
+            if provider not in self._clients:
+                log.info("Creating inference client for provider %s", provider)
+                if provider in pooled_providers:
+                    self._pool(provider)
+                config = self.provider_configs.get(provider, None)
+                self._clients[provider] = AISuiteClient(
+                    provider_configs={provider: config} if config else None
+                )
+            return self._clients[provider]
+
+    def _pool(self, provider: str) -> None:
+
+        if self.http is None:
+            self.http = httpx.Client(
+                limits=httpx.Limits(
+                    max_keepalive_connections=default_keepalive_connections
+                )
+            )
+        module = importlib.import_module(f"aisuite.providers.{provider}_provider")
+        module.httpx = PooledHTTP(self.http)
+
+    def providers(self) -> list[str]:
+        with self._lock:
+            return list(self._clients.keys())
+
+
+_default_registry = ClientRegistry()
+
+
+def set_default_client_registry(registry: ClientRegistry) -> None:
+    global _default_registry
+    _default_registry = registry
+
+
+def default_client_registry() -> ClientRegistry:
+    return _default_registry
+
+
+def default_client(model_id: str) -> AISuiteClient:
+    return _default_registry.client(model_id)
+
+
+def resolve_client(
+    chat_completion_client: Optional[AISuiteClient], model_id: str
+) -> AISuiteClient:
+    """The given client, or the shared one for the provider of `model_id`."""
+
+    if chat_completion_client is None:
+        return default_client(model_id)
+    return chat_completion_client
+
+
+@functools.cache
+def provider_streams(model_id: str) -> bool:
+    """
+    Whether the `aisuite` provider of `model_id` implements streaming chat
+    completions. Providers that do not, such as Together's, raise on
+    `stream=True` instead.
+    """
+
+    provider = provider_of(model_id)
+    try:
+        module = importlib.import_module(f"aisuite.providers.{provider}_provider")
+        provider_class = getattr(module, f"{provider.capitalize()}Provider")
+    except (ImportError, AttributeError):
+        return True
+    return (
+        provider_class.chat_completions_create_stream
+        is not Provider.chat_completions_create_stream
+    )
+
+
+def client_registry_from_config(providers_config: dict) -> ClientRegistry:
+    """A registry from the `inference.providers` configuration section."""
+
+    return ClientRegistry(provider_configs=providers_config)
@@ -37,8 +37,16 @@ Valid model ids:
 - `ollama:granite3.1-dense:2b`
 """
 
+from typing import Generator
+from typing import Optional
+from typing import Union
+
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 
+from rich.console import Console
 from rich.console import Group
 from rich.panel import Panel
 from rich.table import Table
@@ -46,52 +54,379 @@ from rich.text import Text
 
 from aisuite import Client as AISuiteClient
 
+from proscenium.clients import provider_streams
+from proscenium.clients import resolve_client
+from proscenium.completion_cache import CompletionCache
+from proscenium.completion_cache import completion_key
+from proscenium.completion_cache import resolve_cache
+from proscenium.concurrency import default_limiter
+from proscenium.failover import default_failover
+from proscenium.prompt_cache import cacheable_prefix
+from proscenium.tokens import default_token_accounting
+from proscenium.tracing import Span
+from proscenium.tracing import completion_span
+from proscenium.tracing import span
+from proscenium.tracing_console import ensure_console_subscriber
+from proscenium.provider_batch import openai_batch
+from proscenium.provider_batch import provider_batch_client
+
 log = logging.getLogger(__name__)
 
 
+def complete_simple_panel(model_id: str, messages: list, kwargs: dict) -> Panel:
+
+    kwargs_text = "\n".join([str(k) + ": " + str(v) for k, v in kwargs.items()])
+
+    params_text = Text(
+        f"""
+model_id: {model_id}
+{kwargs_text}
+    """
+    )
+
+    messages_table = Table(title="Messages", show_lines=True)
+    messages_table.add_column("Role", justify="left")
+    messages_table.add_column("Content", justify="left")  # style="green"
+    for message in messages:
+        messages_table.add_row(message["role"], message["content"])
+
+    return Panel(Group(params_text, messages_table), title="complete_simple call")
+
+
 def complete_simple(
-    chat_completion_client: AISuiteClient,
+    chat_completion_client: Optional[AISuiteClient],
     model_id: str,
     system_prompt: str,
     user_prompt: str,
     **kwargs,
 ) -> str:
+    """
+    Completes one system and user prompt pair. Without a
+    `chat_completion_client`, the provider's shared client from
+    `proscenium.clients` is used. A `cache` keyword argument
+    (see `proscenium.completion_cache`) answers repeated prompts without
+    calling the provider. With a default `proscenium.failover.Failover`
+    installed, the request may be hedged or fail over to other models.
 
-    console = kwargs.pop("console", None)
+    The call is traced as a `proscenium.tracing` span; a `console`
+    keyword argument has it rendered there.
+    """
+
+    with span(completion_span, call_site="complete_simple", model_id=model_id) as s:
+
+        cache, key, messages, response, tokens = _simple_request(
+            s, model_id, system_prompt, user_prompt, kwargs
+        )
+
+        failover = default_failover()
+        if response is None and failover is not None:
+            response = failover.create(
+                chat_completion_client, model_id, messages, kwargs
+            )
+            response = _simple_response(response, cache, key, model_id, tokens)
+        elif response is None:
+            client = resolve_client(chat_completion_client, model_id)
+            messages, kwargs = cacheable_prefix(model_id, messages, kwargs)
+            with default_limiter().limit(model_id):
+                response = client.chat.completions.create(
+                    model=model_id, messages=messages, **kwargs
+                )
+            response = _simple_response(response, cache, key, model_id, tokens)
+
+        s.set(response=response)
+
+    return response
+
+
+async def acomplete_simple(
+    chat_completion_client: Optional[AISuiteClient],
+    model_id: str,
+    system_prompt: str,
+    user_prompt: str,
+    **kwargs,
+) -> str:
+    """
+    Async variant of `complete_simple`. Calls to the same provider share
+    its slots in `proscenium.concurrency.default_limiter()` with the
+    synchronous functions.
+    """
+
+    with span(completion_span, call_site="complete_simple", model_id=model_id) as s:
+
+        cache, key, messages, response, tokens = _simple_request(
+            s, model_id, system_prompt, user_prompt, kwargs
+        )
+
+        failover = default_failover()
+        if response is None and failover is not None:
+            response = await failover.acreate(
+                chat_completion_client, model_id, messages, kwargs
+            )
+            response = _simple_response(response, cache, key, model_id, tokens)
+        elif response is None:
+            client = resolve_client(chat_completion_client, model_id)
+            messages, kwargs = cacheable_prefix(model_id, messages, kwargs)
+            async with default_limiter().alimit(model_id):
+                response = await client.chat.completions.acreate(
+                    model=model_id, messages=messages, **kwargs
+                )
+            response = _simple_response(response, cache, key, model_id, tokens)
+
+        s.set(response=response)
+
+    return response
+
+
+def _simple_request(
+    s: Span, model_id: str, system_prompt: str, user_prompt: str, kwargs: dict
+) -> tuple:
+    """
+    The cache, cache key and messages for a `complete_simple` call, the
+    response if it is cached, and the input and trimmed token counts.
+    The messages are trimmed to the model's token budget. Removes the
+    console and cache from `kwargs` and records the request on span `s`.
+    """
+
+    _trace_console(s, kwargs.pop("console", None))
+    cache = resolve_cache(kwargs.pop("cache", None), kwargs)
 
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt},
     ]
+    messages, input_tokens, trimmed_tokens = default_token_accounting().fit_messages(
+        model_id, messages
+    )
+    s.set(messages=messages, kwargs=kwargs, input_tokens=input_tokens)
+
+    key = None
+    response = None
+    if cache is not None:
+        key = completion_key(model_id, messages, kwargs)
+        response = cache.get(key)
+        if response is not None:
+            log.info("complete_simple response for %s from cache", model_id)
+            s.set(cached=True)
 
+    return cache, key, messages, response, (input_tokens, trimmed_tokens)
+
+
+def _simple_response(
+    response,
+    cache: Optional[CompletionCache],
+    key: str,
+    model_id: str,
+    tokens: tuple[int, int],
+) -> str:
+
+    default_token_accounting().record(model_id, *tokens, response=response)
+    response = response.choices[0].message.content
+    if cache is not None:
+        cache.put(key, response)
+    return response
+
+
+def _trace_console(s: Span, console: Optional[Console]) -> None:
     if console is not None:
+        ensure_console_subscriber()
+        s.set(console=console)
 
-        kwargs_text = "\n".join([str(k) + ": " + str(v) for k, v in kwargs.items()])
 
-        params_text = Text(
-            f"""
-model_id: {model_id}
-{kwargs_text}
+def complete_simple_stream(
+    chat_completion_client: Optional[AISuiteClient],
+    model_id: str,
+    system_prompt: str,
+    user_prompt: str,
+    **kwargs,
+) -> Generator[str, None, None]:
+    """
+    Like `complete_simple`, but yields the response text in pieces
+    as the provider streams them. Streamed responses are not cached.
+
+    Providers that cannot stream are called through `complete_simple`
+    instead, and the whole response is yielded as one piece.
     """
+
+    if not provider_streams(model_id):
+        log.info("%s does not stream; completing in one piece", model_id)
+        kwargs["cache"] = False
+        yield complete_simple(
+            chat_completion_client, model_id, system_prompt, user_prompt, **kwargs
         )
+        return
+
+    with span(
+        completion_span, call_site="complete_simple", model_id=model_id, stream=True
+    ) as s:
 
-        messages_table = Table(title="Messages", show_lines=True)
-        messages_table.add_column("Role", justify="left")
-        messages_table.add_column("Content", justify="left")  # style="green"
-        for message in messages:
-            messages_table.add_row(message["role"], message["content"])
+        _trace_console(s, kwargs.pop("console", None))
+        kwargs.pop("cache", None)
 
-        call_panel = Panel(
-            Group(params_text, messages_table), title="complete_simple call"
+        accounting = default_token_accounting()
+        messages, input_tokens, trimmed_tokens = accounting.fit_messages(
+            model_id,
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
         )
-        console.print(call_panel)
+        s.set(messages=messages, kwargs=kwargs, input_tokens=input_tokens)
 
-    response = chat_completion_client.chat.completions.create(
-        model=model_id, messages=messages, **kwargs
-    )
-    response = response.choices[0].message.content
+        client = resolve_client(chat_completion_client, model_id)
+        request, kwargs = cacheable_prefix(model_id, messages, kwargs)
+
+        response = []
+        with default_limiter().limit(model_id):
+            chunks = client.chat.completions.create(
+                model=model_id, messages=request, stream=True, **kwargs
+            )
+            for chunk in chunks:
+                if len(chunk.choices) == 0:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    response.append(content)
+                    yield content
+
+        accounting.record(model_id, input_tokens, trimmed_tokens)
+
+        s.set(response="".join(response))
+
+
+default_batch_parallelism = 8
+default_batch_retries = 2
+default_batch_backoff_seconds = 1.0
+
+
+def complete_batch_stream(
+    chat_completion_client: Optional[AISuiteClient],
+    model_id: str,
+    prompts: list[tuple[str, str]],
+    parallelism: int = default_batch_parallelism,
+    retries: int = default_batch_retries,
+    backoff_seconds: float = default_batch_backoff_seconds,
+    provider_batch: bool = False,
+    **kwargs,
+) -> Generator[tuple[int, Union[str, Exception]], None, None]:
+    """
+    Completes many (system prompt, user prompt) pairs, up to `parallelism`
+    at a time, yielding (index, response) pairs as they finish. A prompt that
+    still fails after `retries` further attempts, with exponentially growing
+    pauses from `backoff_seconds`, yields its last exception as its response.
+
+    With `provider_batch`, prompts go to the provider's batch endpoint where
+    `proscenium.provider_batch` supports one. Results then arrive together
+    when the provider finishes the batch; prompts it did not answer, or
+    every prompt if the batch fails, are retried through `complete_simple`.
+    """
+
+    console = kwargs.pop("console", None)
+
+    remaining = list(range(len(prompts)))
+
+    if provider_batch:
+        client = resolve_client(chat_completion_client, model_id)
+        sdk_client = provider_batch_client(client, model_id)
+        if sdk_client is None:
+            log.warning("No batch endpoint for %s; completing directly", model_id)
+        else:
+            yield from _provider_batch(sdk_client, model_id, prompts, remaining, kwargs)
 
     if console is not None:
-        console.print(Panel(response, title="Response"))
+        console.print(f"Completing {len(remaining)} prompts with {model_id}")
 
-    return response
+    def complete(index: int) -> Union[str, Exception]:
+        system_prompt, user_prompt = prompts[index]
+        for attempt in range(retries + 1):
+            try:
+                return complete_simple(
+                    chat_completion_client,
+                    model_id,
+                    system_prompt,
+                    user_prompt,
+                    **kwargs,
+                )
+            except Exception as e:
+                log.warning("Prompt %s attempt %s failed: %s", index, attempt + 1, e)
+                if attempt == retries:
+                    return e
+                time.sleep(backoff_seconds * 2**attempt)
+
+    with ThreadPoolExecutor(
+        max_workers=parallelism, thread_name_prefix="proscenium-batch"
+    ) as executor:
+        futures = {executor.submit(complete, index): index for index in remaining}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _provider_batch(
+    sdk_client,
+    model_id: str,
+    prompts: list[tuple[str, str]],
+    remaining: list[int],
+    kwargs: dict,
+) -> Generator[tuple[int, str], None, None]:
+    """
+    Answers what it can of `remaining` from the cache and then the provider's
+    batch endpoint, removing the indices it answers. A failed batch answers
+    none of them.
+    """
+
+    batch_kwargs = {k: v for k, v in kwargs.items() if k != "cache"}
+    cache = resolve_cache(kwargs.get("cache", None), batch_kwargs)
+
+    requests = {}
+    keys = {}
+    for index in list(remaining):
+        system_prompt, user_prompt = prompts[index]
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        if cache is not None:
+            keys[index] = completion_key(model_id, messages, batch_kwargs)
+            response = cache.get(keys[index])
+            if response is not None:
+                remaining.remove(index)
+                yield index, response
+                continue
+        requests[index] = messages
+
+    if len(requests) == 0:
+        return
+
+    try:
+        responses = openai_batch(sdk_client, model_id, requests, **batch_kwargs)
+    except Exception as e:
+        log.error("Batch of %s prompts to %s failed: %s", len(requests), model_id, e)
+        return
+
+    for index, response in responses.items():
+        if cache is not None:
+            cache.put(keys[index], response)
+        remaining.remove(index)
+        yield index, response
+
+
+def complete_batch(
+    chat_completion_client: Optional[AISuiteClient],
+    model_id: str,
+    prompts: list[tuple[str, str]],
+    **kwargs,
+) -> list[Union[str, Exception]]:
+    """
+    The responses to `prompts` in their given order.
+    Takes the same arguments as `complete_batch_stream`.
+    """
+
+    responses: list[Union[str, Exception]] = [None] * len(prompts)
+    for index, response in complete_batch_stream(
+        chat_completion_client, model_id, prompts, **kwargs
+    ):
+        responses[index] = response
+    return responses
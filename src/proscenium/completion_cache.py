@@ -0,0 +1,261 @@
+"""
+A cache for `proscenium.complete.complete_simple` responses.
+
+Responses are keyed on a hash of the model id, the messages and the
+keyword arguments that affect the completion. Recently used responses are
+kept in memory, in front of an optional SQLite file that survives restarts.
+
+Pass `cache=CompletionCache(...)` to `complete_simple` to cache one call
+site, or install a process-wide default with `set_default_completion_cache`,
+as `proscenium.bin.production_from_config` does from the `inference.cache`
+configuration section. The default cache only answers deterministic calls,
+those made with `temperature=0`, so sampled responses are not repeated.
+`cache=True` opts any call site in, and `cache=False` opts it out.
+"""
+
+from typing import Any
+from typing import Optional
+from typing import Union
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_memory_entries = 1000
+default_max_entries = 100000
+default_ttl_seconds = 86400.0
+# Disk hits whose last use is recorded in one write
+default_touch_batch = 100
+# Eviction trims the file to this fraction of max_entries
+eviction_low_water = 0.9
+
+# Keyword arguments that do not change what the provider returns
+uncached_kwargs = ["console", "timeout", "stream", "user"]
+
+
+def completion_key(model_id: str, messages: list[dict], kwargs: dict) -> str:
+
+    deterministic = {k: v for k, v in kwargs.items() if k not in uncached_kwargs}
+    text = json.dumps([model_id, messages, deterministic], sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    An LRU of up to `memory_entries` responses in front of a SQLite file at
+    `path` holding up to `max_entries`. Entries expire after `ttl_seconds`.
+    Without a `path` the cache lives in memory only. Last use times of
+    disk hits are written in batches of `touch_batch`, and the file is
+    trimmed only once it holds more than `max_entries`.
+
+    `memory_hits`, `disk_hits` and `misses` count lookups.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        memory_entries: int = default_memory_entries,
+        max_entries: int = default_max_entries,
+        ttl_seconds: float = default_ttl_seconds,
+        touch_batch: int = default_touch_batch,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.touch_batch = touch_batch
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        # Disk hits not yet written: key -> last used
+        self._touched: dict[str, float] = {}
+        # At least the number of rows in the file
+        self._rows = 0
+
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions "
+                "(key TEXT PRIMARY KEY, response TEXT, expires REAL, used REAL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS completions_used ON completions (used)"
+            )
+            self._db.commit()
+            self._rows = self._count_rows()
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def get(self, key: str) -> Optional[str]:
+
+        now = time.time()
+        with self._lock:
+
+            entry = self._memory.get(key, None)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, expires FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._touched[key] = now
+                    if len(self._touched) >= self.touch_batch:
+                        self._write_touched()
+                        self._db.commit()
+                    self._remember(key, row[1], row[0])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str) -> None:
+
+        if not isinstance(response, str):
+            return
+
+        now = time.time()
+        expires = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires, response)
+            if self._db is not None:
+                self._touched.pop(key, None)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                    (key, response, expires, now),
+                )
+                self._rows += 1
+                if self._rows > self.max_entries:
+                    self._evict(now)
+                self._db.commit()
+
+    def _count_rows(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def _write_touched(self) -> None:
+        if len(self._touched) > 0:
+            self._db.executemany(
+                "UPDATE completions SET used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self, now: float) -> None:
+
+        self._rows = self._count_rows()
+        if self._rows <= self.max_entries:
+            return
+
+        self._write_touched()
+        self._db.execute(
+            "DELETE FROM completions WHERE expires <= ? OR key IN "
+            "(SELECT key FROM completions ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (now, int(self.max_entries * eviction_low_water)),
+        )
+        self._rows = self._count_rows()
+
+    def _remember(self, key: str, expires: float, response: str) -> None:
+        self._memory[key] = (expires, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._touched.clear()
+                self._db.execute("DELETE FROM completions")
+                self._db.commit()
+                self._rows = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._write_touched()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+
+_default_cache: Optional[CompletionCache] = None
+
+
+def set_default_completion_cache(cache: Optional[CompletionCache]) -> None:
+    global _default_cache
+    _default_cache = cache
+
+
+def default_completion_cache() -> Optional[CompletionCache]:
+    return _default_cache
+
+
+def completion_cache_from_config(cache_config: dict) -> Optional[CompletionCache]:
+    """
+    A cache from the `inference.cache` configuration section, or None
+    unless it sets `enabled: true`.
+    """
+
+    if not cache_config.get("enabled", False):
+        return None
+
+    return CompletionCache(
+        path=cache_config.get("path", None),
+        memory_entries=cache_config.get("memory_entries", default_memory_entries),
+        max_entries=cache_config.get("max_entries", default_max_entries),
+        ttl_seconds=cache_config.get("ttl_seconds", default_ttl_seconds),
+        touch_batch=cache_config.get("touch_batch", default_touch_batch),
+    )
+
+
+def is_deterministic(kwargs: dict) -> bool:
+    return kwargs.get("temperature", None) == 0
+
+
+def resolve_cache(
+    cache: Union[CompletionCache, bool, None],
+    kwargs: dict,
+) -> Optional[CompletionCache]:
+    """
+    The cache a call site asked for: its own, the default (True), none
+    (False), or, when it did not say, the default for deterministic calls.
+    """
+
+    if cache is False:
+        return None
+    if cache is True:
+        return _default_cache
+    if cache is None:
+        return _default_cache if is_deterministic(kwargs) else None
+    return cache
@@ -0,0 +1,179 @@
+"""
+Per-provider limits on concurrent inference calls.
+
+The provider of a model id is the part before the first ":", as in
+`together:meta-llama/...`. Every call through `proscenium.complete` and
+`proscenium.patterns.tools`, synchronous or async, takes one of its
+provider's slots for as long as the provider is working on it, so that
+threads and tasks share one limit.
+
+`proscenium.bin.production_from_config` installs the default limiter from
+the `inference.concurrency` configuration section.
+"""
+
+from typing import AsyncIterator
+from typing import Iterator
+from typing import Optional
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_provider_concurrency = 8
+
+
+def provider_of(model_id: str) -> str:
+    return model_id.split(":", 1)[0]
+
+
+class ProviderSlots:
+    """
+    A semaphore of `limit` slots that both threads and asyncio tasks can
+    wait on. Waiters are served in arrival order; a released slot is handed
+    directly to the next waiter.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError(f"Concurrency limit must be at least 1, not {limit}")
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self) -> None:
+
+        with self._lock:
+            if self.in_flight < self.limit and len(self._waiters) == 0:
+                self.in_flight += 1
+                return
+            handed_over = threading.Event()
+            self._waiters.append(handed_over)
+
+        handed_over.wait()
+
+    async def aacquire(self) -> None:
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < self.limit and len(self._waiters) == 0:
+                self.in_flight += 1
+                return
+            handed_over = loop.create_future()
+            self._waiters.append(handed_over)
+
+        try:
+            await handed_over
+        except asyncio.CancelledError:
+            with self._lock:
+                if handed_over in self._waiters:
+                    self._waiters.remove(handed_over)
+            if handed_over.done() and not handed_over.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+
+        with self._lock:
+            if len(self._waiters) == 0:
+                self.in_flight -= 1
+                return
+            waiter = self._waiters.popleft()
+
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+
+    def _hand_over(self, waiter: asyncio.Future) -> None:
+        if waiter.cancelled():
+            # The task gave up after the slot was on its way; pass it on
+            self.release()
+        else:
+            waiter.set_result(None)
+
+
+class ProviderLimiter:
+    """
+    Allows at most `limits[provider]`, or `default_limit`, calls in flight
+    to each provider.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[dict[str, int]] = None,
+        default_limit: int = default_provider_concurrency,
+    ):
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self._slots: dict[str, ProviderSlots] = {}
+        self._lock = threading.Lock()
+
+    def slots(self, provider: str) -> ProviderSlots:
+        with self._lock:
+            if provider not in self._slots:
+                self._slots[provider] = ProviderSlots(
+                    self.limits.get(provider, self.default_limit)
+                )
+            return self._slots[provider]
+
+    @contextmanager
+    def limit(self, model_id: str) -> Iterator[None]:
+        slots = self.slots(provider_of(model_id))
+        slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @asynccontextmanager
+    async def alimit(self, model_id: str) -> AsyncIterator[None]:
+        slots = self.slots(provider_of(model_id))
+        await slots.aacquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                provider: {
+                    "limit": slots.limit,
+                    "in_flight": slots.in_flight,
+                    "waiting": slots.waiting,
+                }
+                for provider, slots in self._slots.items()
+            }
+
+
+_default_limiter = ProviderLimiter()
+
+
+def set_default_limiter(limiter: ProviderLimiter) -> None:
+    global _default_limiter
+    _default_limiter = limiter
+
+
+def default_limiter() -> ProviderLimiter:
+    return _default_limiter
+
+
+def limiter_from_config(concurrency_config: dict) -> ProviderLimiter:
+    """A limiter from the `inference.concurrency` configuration section."""
+
+    return ProviderLimiter(
+        limits=concurrency_config.get("providers", {}),
+        default_limit=concurrency_config.get("default", default_provider_concurrency),
+    )
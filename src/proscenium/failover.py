@@ -0,0 +1,440 @@
+"""
+Fallback chains, hedged requests and circuit breakers for
+`proscenium.complete.complete_simple`.
+
+Each model id may have a chain of fallback model ids. A call starts with
+the first model in the chain whose provider's circuit breaker is closed.
+If no response has arrived after `hedge_after_seconds`, or the call fails,
+the next model in the chain is sent the same request. The first response
+wins and the others are cancelled. Synchronous calls that are already
+running cannot be interrupted; they finish in the background and their
+results are discarded. Such an abandoned call gives its provider's
+concurrency slot back at once, and counts as a breaker failure if it had
+been running for `hedge_after_seconds` (or `timeout_seconds` without
+hedging).
+
+A provider's breaker opens after `failures` consecutive calls fail or take
+longer than `slow_seconds`. Its models are then skipped until
+`reset_seconds` have passed, when calls are let through again to test it.
+
+`proscenium.bin.production_from_config` installs the default failover from
+the `inference.failover` configuration section.
+"""
+
+from typing import Any
+from typing import Optional
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from aisuite import Client as AISuiteClient
+
+from proscenium.clients import resolve_client
+from proscenium.concurrency import default_limiter
+from proscenium.concurrency import provider_of
+from proscenium.prompt_cache import cacheable_prefix
+from proscenium.tracing import current_span
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_breaker_failures = 5
+default_breaker_slow_seconds = 30.0
+default_breaker_reset_seconds = 60.0
+default_failover_timeout_seconds = 120.0
+default_failover_workers = 32
+
+
+class CircuitBreaker:
+
+    def __init__(
+        self,
+        failures: int = default_breaker_failures,
+        slow_seconds: float = default_breaker_slow_seconds,
+        reset_seconds: float = default_breaker_reset_seconds,
+    ):
+        self.failures = failures
+        self.slow_seconds = slow_seconds
+        self.reset_seconds = reset_seconds
+
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return (
+                self.opened_at is not None
+                and time.monotonic() - self.opened_at < self.reset_seconds
+            )
+
+    def allow(self) -> bool:
+        return not self.is_open
+
+    def record(self, seconds: float, succeeded: bool) -> None:
+
+        with self._lock:
+            if succeeded and seconds <= self.slow_seconds:
+                self.consecutive_failures = 0
+                self.opened_at = None
+                return
+
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failures:
+                if self.opened_at is None:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+
+
+class Attempt:
+    """
+    One synchronous call along a fallback chain. Holds a slot of its
+    provider's `proscenium.concurrency` limit while the provider works on
+    it, and records the outcome in the provider's breaker, unless it is
+    `abandon`ed first.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, model_id: str):
+        self.breaker = breaker
+        self.model_id = model_id
+        self.slots = default_limiter().slots(provider_of(model_id))
+        self.started: Optional[float] = None
+        self._settled = False
+        self._lock = threading.Lock()
+
+    def running_seconds(self) -> float:
+        with self._lock:
+            return 0.0 if self.started is None else time.monotonic() - self.started
+
+    def run(self, client: AISuiteClient, messages: list, kwargs: dict) -> Any:
+
+        messages, kwargs = cacheable_prefix(self.model_id, messages, kwargs)
+        self.slots.acquire()
+        with self._lock:
+            abandoned = self._settled
+            self.started = time.monotonic()
+        if abandoned:
+            self.slots.release()
+            raise TimeoutError(f"Call to {self.model_id} abandoned")
+
+        try:
+            response = client.chat.completions.create(
+                model=self.model_id, messages=messages, **kwargs
+            )
+        except Exception:
+            self._settle(False)
+            raise
+        self._settle(True)
+        return response
+
+    def abandon(self, timed_out: bool) -> None:
+        """Give the slot back now, recording a failure if the call `timed_out`."""
+        self._settle(False if timed_out else None)
+
+    def _settle(self, succeeded: Optional[bool]) -> None:
+
+        with self._lock:
+            if self._settled:
+                return
+            self._settled = True
+            started = self.started
+
+        if started is None:
+            return
+        self.slots.release()
+        if succeeded is not None:
+            self.breaker.record(time.monotonic() - started, succeeded)
+
+
+class Failover:
+    """
+    Runs completions along the fallback chain of their model id,
+    hedging after `hedge_after_seconds` (None to only fail over on errors)
+    and giving up after `timeout_seconds`.
+    """
+
+    def __init__(
+        self,
+        fallbacks: Optional[dict[str, list[str]]] = None,
+        hedge_after_seconds: Optional[float] = None,
+        timeout_seconds: float = default_failover_timeout_seconds,
+        breaker_config: Optional[dict] = None,
+        workers: int = default_failover_workers,
+    ):
+        self.fallbacks = fallbacks or {}
+        self.hedge_after_seconds = hedge_after_seconds
+        self.timeout_seconds = timeout_seconds
+        self.breaker_config = breaker_config or {}
+
+        self.hedges = 0
+        self.fallback_wins = 0
+
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="proscenium-failover"
+        )
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(**self.breaker_config)
+            return self._breakers[provider]
+
+    def chain(self, model_id: str) -> list[str]:
+        """The models to try for `model_id`, skipping providers with open breakers."""
+
+        models = [model_id] + self.fallbacks.get(model_id, [])
+        available = [m for m in models if self.breaker(provider_of(m)).allow()]
+        if len(available) == 0:
+            log.warning("All providers for %s are failing; trying it anyway", model_id)
+            return models[:1]
+        return available
+
+    def _client(
+        self, chat_completion_client: Optional[AISuiteClient], model_id: str, m: str
+    ) -> AISuiteClient:
+        return resolve_client(chat_completion_client if m == model_id else None, m)
+
+    async def _aattempt(
+        self, client: AISuiteClient, model_id: str, messages: list, kwargs: dict
+    ) -> Any:
+
+        breaker = self.breaker(provider_of(model_id))
+        messages, kwargs = cacheable_prefix(model_id, messages, kwargs)
+        async with default_limiter().alimit(model_id):
+            started = time.monotonic()
+            try:
+                response = await client.chat.completions.acreate(
+                    model=model_id, messages=messages, **kwargs
+                )
+            except Exception:
+                breaker.record(time.monotonic() - started, False)
+                raise
+        breaker.record(time.monotonic() - started, True)
+        return response
+
+    def _wait_seconds(self, launched: float, deadline: float, more: bool) -> float:
+        now = time.monotonic()
+        seconds = deadline - now
+        if more and self.hedge_after_seconds is not None:
+            seconds = min(seconds, launched + self.hedge_after_seconds - now)
+        return max(0.0, seconds)
+
+    def _won(self, model_id: str, m: str) -> None:
+        s = current_span()
+        if s is not None:
+            s.set(served_model_id=m)
+        if m != model_id:
+            self.fallback_wins += 1
+            log.info("Response for %s came from %s", model_id, m)
+
+    def create(
+        self,
+        chat_completion_client: Optional[AISuiteClient],
+        model_id: str,
+        messages: list,
+        kwargs: dict,
+    ) -> Any:
+        """The first provider response along the chain for `model_id`."""
+
+        chain = self.chain(model_id)
+        deadline = time.monotonic() + self.timeout_seconds
+        pending: dict[Future, Attempt] = {}
+        last_error: Optional[Exception] = None
+        next_model = 0
+        launched = 0.0
+
+        def launch() -> None:
+            nonlocal next_model, launched
+            m = chain[next_model]
+            next_model += 1
+            client = self._client(chat_completion_client, model_id, m)
+            attempt = Attempt(self.breaker(provider_of(m)), m)
+            future = self.executor.submit(attempt.run, client, messages, kwargs)
+            pending[future] = attempt
+            launched = time.monotonic()
+
+        launch()
+        try:
+            while len(pending) > 0 and time.monotonic() < deadline:
+                more = next_model < len(chain)
+                done, _ = wait(
+                    pending,
+                    timeout=self._wait_seconds(launched, deadline, more),
+                    return_when=FIRST_COMPLETED,
+                )
+                if len(done) == 0:
+                    if more and self.hedge_after_seconds is not None:
+                        log.info(
+                            "Hedging %s after %ss", model_id, self.hedge_after_seconds
+                        )
+                        self.hedges += 1
+                        launch()
+                    continue
+                for future in done:
+                    m = pending.pop(future).model_id
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        log.warning("Completion with %s failed: %s", m, e)
+                        last_error = e
+                        continue
+                    self._won(model_id, m)
+                    return response
+                if next_model < len(chain):
+                    launch()
+        finally:
+            self._abandon(pending)
+
+        if len(pending) > 0 or last_error is None:
+            raise TimeoutError(
+                f"No response for {model_id} in {self.timeout_seconds} seconds"
+            )
+        raise last_error
+
+    def _abandon(self, pending: dict[Future, Attempt]) -> None:
+
+        patience = self.hedge_after_seconds
+        if patience is None:
+            patience = self.timeout_seconds
+        for future, attempt in pending.items():
+            future.cancel()
+            timed_out = attempt.running_seconds() >= patience
+            if timed_out:
+                log.info("Abandoning %s as timed out", attempt.model_id)
+            attempt.abandon(timed_out)
+
+    async def acreate(
+        self,
+        chat_completion_client: Optional[AISuiteClient],
+        model_id: str,
+        messages: list,
+        kwargs: dict,
+    ) -> Any:
+        """Async variant of `create`, cancelling the requests that lose."""
+
+        chain = self.chain(model_id)
+        deadline = time.monotonic() + self.timeout_seconds
+        pending: dict[asyncio.Task, str] = {}
+        last_error: Optional[Exception] = None
+        next_model = 0
+        launched = 0.0
+
+        def launch() -> None:
+            nonlocal next_model, launched
+            m = chain[next_model]
+            next_model += 1
+            client = self._client(chat_completion_client, model_id, m)
+            task = asyncio.create_task(self._aattempt(client, m, messages, kwargs))
+            pending[task] = m
+            launched = time.monotonic()
+
+        launch()
+        try:
+            while len(pending) > 0 and time.monotonic() < deadline:
+                more = next_model < len(chain)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._wait_seconds(launched, deadline, more),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if len(done) == 0:
+                    if more and self.hedge_after_seconds is not None:
+                        log.info(
+                            "Hedging %s after %ss", model_id, self.hedge_after_seconds
+                        )
+                        self.hedges += 1
+                        launch()
+                    continue
+                for task in done:
+                    m = pending.pop(task)
+                    if task.exception() is not None:
+                        log.warning(
+                            "Completion with %s failed: %s", m, task.exception()
+                        )
+                        last_error = task.exception()
+                        continue
+                    self._won(model_id, m)
+                    return task.result()
+                if next_model < len(chain):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if len(pending) > 0 or last_error is None:
+            raise TimeoutError(
+                f"No response for {model_id} in {self.timeout_seconds} seconds"
+            )
+        raise last_error
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            breakers = {
+                provider: {
+                    "open": breaker.is_open,
+                    "times_opened": breaker.times_opened,
+                }
+                for provider, breaker in self._breakers.items()
+            }
+        return {
+            "hedges": self.hedges,
+            "fallback_wins": self.fallback_wins,
+            "breakers": breakers,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_failover: Optional[Failover] = None
+
+
+def set_default_failover(failover: Optional[Failover]) -> None:
+    global _default_failover
+    if _default_failover is not None and _default_failover is not failover:
+        _default_failover.shutdown()
+    _default_failover = failover
+
+
+def default_failover() -> Optional[Failover]:
+    return _default_failover
+
+
+def failover_from_config(failover_config: dict) -> Optional[Failover]:
+    """
+    Failover from the `inference.failover` configuration section,
+    or None if the section is absent.
+    """
+
+    if len(failover_config) == 0:
+        return None
+
+    breaker_config = failover_config.get("circuit_breaker", {})
+
+    return Failover(
+        fallbacks=failover_config.get("fallbacks", {}),
+        hedge_after_seconds=failover_config.get("hedge_after_seconds", None),
+        timeout_seconds=failover_config.get(
+            "timeout_seconds", default_failover_timeout_seconds
+        ),
+        breaker_config={
+            "failures": breaker_config.get("failures", default_breaker_failures),
+            "slow_seconds": breaker_config.get(
+                "slow_seconds", default_breaker_slow_seconds
+            ),
+            "reset_seconds": breaker_config.get(
+                "reset_seconds", default_breaker_reset_seconds
+            ),
+        },
+    )
@@ -0,0 +1,397 @@
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+from typing import Union
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_workers = 4
+default_queue_depth = 100
+
+
+class ChannelDispatcher:
+    """
+    Runs work items on a bounded pool of worker threads.
+
+    Work submitted for different channels runs in parallel.
+    Work submitted for the same channel runs one item at a time,
+    in the order it was submitted.
+    """
+
+    def __init__(
+        self,
+        workers: int = default_workers,
+        queue_depth: int = default_queue_depth,
+    ):
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        if queue_depth < 1:
+            raise ValueError(f"queue_depth must be at least 1, got {queue_depth}")
+
+        self.workers = workers
+        self.queue_depth = queue_depth
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="proscenium-dispatch"
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # A channel id is present in _pending exactly when a worker
+        # is draining that channel's queue.
+        self._pending: dict[str, deque] = {}
+        self._depth = 0
+        self._done_callbacks: list[Callable[[], None]] = []
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        """Call `callback` on the worker thread after each work item finishes."""
+        self._done_callbacks.append(callback)
+
+    def depth(self) -> int:
+        """The number of work items queued or running."""
+        with self._lock:
+            return self._depth
+
+    def submit(self, channel_id: str, fn: Callable[..., Any], *args: Any) -> bool:
+        """
+        Queue `fn(*args)` behind any earlier work for `channel_id`.
+
+        Returns False, without queueing, when `queue_depth` items are
+        already queued or running.
+        """
+
+        with self._lock:
+            if self._depth >= self.queue_depth:
+                log.warning(
+                    "Dispatch queue full (%s). Dropping work for channel %s",
+                    self._depth,
+                    channel_id,
+                )
+                return False
+            self._depth += 1
+            channel_queue = self._pending.get(channel_id)
+            if channel_queue is not None:
+                channel_queue.append((fn, args))
+                return True
+            self._pending[channel_id] = deque([(fn, args)])
+
+        self._executor.submit(self._drain, channel_id)
+        return True
+
+    def _drain(self, channel_id: str) -> None:
+
+        while True:
+            with self._lock:
+                channel_queue = self._pending[channel_id]
+                if len(channel_queue) == 0:
+                    del self._pending[channel_id]
+                    return
+                fn, args = channel_queue.popleft()
+
+            try:
+                fn(*args)
+            except Exception:
+                log.exception("Dispatched work for channel %s failed", channel_id)
+            finally:
+                with self._lock:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._idle.notify_all()
+                for callback in self._done_callbacks:
+                    callback()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no work is queued or running, including work submitted
+        by work that is already running. Returns False on timeout.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._depth == 0, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+default_async_concurrency = 1000
+default_async_queue_depth = 10000
+
+
+class AsyncChannelDispatcher:
+    """
+    The asyncio counterpart of `ChannelDispatcher`.
+
+    Coroutines submitted for different channels run concurrently, up to
+    `concurrency` at a time. Coroutines submitted for the same channel run
+    one at a time, in the order they were submitted.
+
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = default_async_concurrency,
+        queue_depth: int = default_async_queue_depth,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        if queue_depth < 1:
+            raise ValueError(f"queue_depth must be at least 1, got {queue_depth}")
+
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending: dict[str, deque] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._depth = 0
+        self._done_callbacks: list[Callable[[], None]] = []
+
+    def add_done_callback(self, callback: Callable[[], None]) -> None:
+        self._done_callbacks.append(callback)
+
+    def depth(self) -> int:
+        return self._depth
+
+    def submit(
+        self,
+        channel_id: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+    ) -> bool:
+        """
+        Queue `await fn(*args)` behind any earlier work for `channel_id`.
+        Returns False, without queueing, when the queue is full.
+        """
+
+        if self._depth >= self.queue_depth:
+            log.warning(
+                "Dispatch queue full (%s). Dropping work for channel %s",
+                self._depth,
+                channel_id,
+            )
+            return False
+        self._depth += 1
+
+        channel_queue = self._pending.get(channel_id)
+        if channel_queue is not None:
+            channel_queue.append((fn, args))
+            return True
+        self._pending[channel_id] = deque([(fn, args)])
+
+        task = asyncio.get_running_loop().create_task(self._drain(channel_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _drain(self, channel_id: str) -> None:
+
+        channel_queue = self._pending[channel_id]
+        while len(channel_queue) > 0:
+            fn, args = channel_queue.popleft()
+            try:
+                async with self._semaphore:
+                    await fn(*args)
+            except Exception:
+                log.exception("Dispatched work for channel %s failed", channel_id)
+            finally:
+                self._depth -= 1
+                for callback in self._done_callbacks:
+                    callback()
+        del self._pending[channel_id]
+
+    async def join(self) -> None:
+        """Wait until no work is queued or running."""
+        while len(self._tasks) > 0:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+
+high_priority = 0
+low_priority = 1
+
+admission_accepted = "accepted"
+admission_deferred = "deferred"
+admission_shed = "shed"
+
+default_max_deferred = 100
+
+
+class AdmissionController:
+    """
+    Decides which inbound events reach a `ChannelDispatcher`
+    or `AsyncChannelDispatcher`.
+
+    Once `high_water` items are queued or running, every event is shed.
+    Once `low_priority_high_water` items are queued or running, low-priority
+    events are either shed or, if `defer_low_priority` is set, parked
+    (up to `max_deferred` of them) and re-submitted as load drops back
+    below `low_priority_high_water`.
+
+    Deferred events are re-submitted behind work that arrived after them,
+    so per-channel ordering holds only among admitted events.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Union[ChannelDispatcher, AsyncChannelDispatcher],
+        high_water: Optional[int] = None,
+        low_priority_high_water: Optional[int] = None,
+        defer_low_priority: bool = False,
+        max_deferred: int = default_max_deferred,
+    ):
+        self.dispatcher = dispatcher
+        self.high_water = (
+            high_water if high_water is not None else dispatcher.queue_depth
+        )
+        self.low_priority_high_water = (
+            low_priority_high_water
+            if low_priority_high_water is not None
+            else max(1, (3 * self.high_water) // 4)
+        )
+        if self.low_priority_high_water > self.high_water:
+            raise ValueError(
+                f"low_priority_high_water ({self.low_priority_high_water}) "
+                f"exceeds high_water ({self.high_water})"
+            )
+        self.defer_low_priority = defer_low_priority
+        self.max_deferred = max_deferred
+
+        self._lock = threading.Lock()
+        self._deferred: deque = deque()
+        dispatcher.add_done_callback(self._resubmit_deferred)
+
+        self.counts = {
+            admission_accepted: 0,
+            admission_deferred: 0,
+            admission_shed: 0,
+        }
+
+    def deferred(self) -> int:
+        with self._lock:
+            return len(self._deferred)
+
+    def admit(
+        self, channel_id: str, priority: int, fn: Callable[..., Any], *args: Any
+    ) -> str:
+        """
+        Returns one of `admission_accepted`, `admission_deferred`
+        or `admission_shed`.
+        """
+
+        depth = self.dispatcher.depth()
+
+        if depth >= self.high_water:
+            outcome = admission_shed
+        elif priority == low_priority and depth >= self.low_priority_high_water:
+            outcome = admission_shed
+            if self.defer_low_priority:
+                with self._lock:
+                    if len(self._deferred) < self.max_deferred:
+                        self._deferred.append((channel_id, fn, args))
+                        outcome = admission_deferred
+        elif self.dispatcher.submit(channel_id, fn, *args):
+            outcome = admission_accepted
+        else:
+            outcome = admission_shed
+
+        with self._lock:
+            self.counts[outcome] += 1
+
+        if outcome == admission_deferred:
+            # Work may have finished between the depth check and parking
+            # this event, in which case nothing else would wake it.
+            self._resubmit_deferred()
+
+        log.info("Admission for channel %s: %s (depth %s)", channel_id, outcome, depth)
+
+        return outcome
+
+    def _resubmit_deferred(self) -> None:
+
+        while True:
+            with self._lock:
+                if len(self._deferred) == 0:
+                    return
+                if self.dispatcher.depth() >= self.low_priority_high_water:
+                    return
+                channel_id, fn, args = self._deferred.popleft()
+
+            if not self.dispatcher.submit(channel_id, fn, *args):
+                log.warning("Dropping deferred work for channel %s", channel_id)
+
+
+default_dedup_max_entries = 10000
+default_dedup_ttl_seconds = 600.0
+
+
+class DedupCache:
+    """
+    Remembers recently seen event keys so redelivered events can be dropped.
+
+    Entries expire after `ttl_seconds`, and the least recently seen entries
+    are evicted beyond `max_entries`. `hits` counts duplicates caught and
+    `misses` counts events seen for the first time.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = default_dedup_max_entries,
+        ttl_seconds: float = default_dedup_ttl_seconds,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._seen: OrderedDict[str, float] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._seen)
+
+    def seen(self, keys: list[str]) -> bool:
+        """
+        True if any of `keys` was seen within the TTL.
+        Otherwise records all of them and returns False.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+
+            while len(self._seen) > 0:
+                oldest_key, oldest_time = next(iter(self._seen.items()))
+                if now - oldest_time < self.ttl_seconds:
+                    break
+                del self._seen[oldest_key]
+
+            if any(key in self._seen for key in keys):
+                for key in keys:
+                    if key in self._seen:
+                        self._seen.move_to_end(key)
+                        self._seen[key] = now
+                self.hits += 1
+                return True
+
+            for key in keys:
+                self._seen[key] = now
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+
+            self.misses += 1
+            return False
@@ -1,20 +1,58 @@
+from typing import Any
 from typing import Callable
-from typing import Generator
+from typing import Iterator
 from typing import Optional
+from typing import Union
 
 import logging
 import os
+import threading
+import time
+from concurrent.futures import Future
 from rich.console import Console
 from rich.table import Table
 
 from slack_sdk.web import WebClient
+from slack_sdk.errors import SlackApiError
 from slack_sdk.socket_mode import SocketModeClient
 from slack_sdk.socket_mode.request import SocketModeRequest
 from slack_sdk.socket_mode.response import SocketModeResponse
 
 from proscenium import Production
 from proscenium import Character
+from proscenium import characters_in_place
 from proscenium.admin import Admin
+from proscenium.patterns.routing import CandidateSelector
+from proscenium.patterns.routing import default_candidate_deadline_seconds
+from proscenium.patterns.routing import default_candidate_workers
+from proscenium.patterns.routing import select_first
+from proscenium.metrics import MetricsRegistry
+from proscenium.metrics import default_metrics_registry
+from proscenium.speculation import Speculation
+from proscenium.speculation import SpeculationPool
+from proscenium.speculation import default_speculation_workers
+from proscenium.speculation import set_default_speculation_pool
+from proscenium.tracing import slack_dispatch_span
+from proscenium.tracing import span
+from proscenium.interfaces.dispatch import ChannelDispatcher
+from proscenium.interfaces.dispatch import AdmissionController
+from proscenium.interfaces.dispatch import admission_shed
+from proscenium.interfaces.dispatch import high_priority
+from proscenium.interfaces.dispatch import low_priority
+from proscenium.interfaces.dispatch import default_workers
+from proscenium.interfaces.dispatch import default_queue_depth
+from proscenium.interfaces.dispatch import default_max_deferred
+from proscenium.interfaces.dispatch import DedupCache
+from proscenium.interfaces.dispatch import default_dedup_max_entries
+from proscenium.interfaces.dispatch import default_dedup_ttl_seconds
+from proscenium.interfaces.slack_outbound import SlackSender
+from proscenium.interfaces.slack_outbound import AdminDigest
+from proscenium.interfaces.slack_outbound import default_digest_interval_seconds
+from proscenium.interfaces.slack_outbound import default_digest_max_batch
+from proscenium.interfaces.slack_outbound import default_outbound_workers
+from proscenium.interfaces.slack_outbound import default_outbound_queue_depth
+from proscenium.interfaces.slack_outbound import default_max_retries
+from proscenium.interfaces.slack_outbound import default_backoff_seconds
 
 log = logging.getLogger(__name__)
 
@@ -48,14 +86,758 @@ def connect(app_token: str, bot_token: str) -> SocketModeClient:
     return socket_mode_client
 
 
+# Slack allows up to 10 Socket Mode connections per app
+max_connections = 10
+default_connections = 2
+default_health_check_seconds = 30.0
+default_reconnect_stagger_seconds = 5.0
+
+
+class SocketModePool:
+    """
+    Several Socket Mode connections for one app, sharing one `WebClient`.
+
+    Slack spreads events across an app's open connections, so a pool raises
+    the throughput ceiling of a single websocket, and events keep flowing
+    over the other connections while one reconnects. Reconnects happen one
+    connection at a time, `reconnect_stagger_seconds` apart, both when the
+    periodic health check finds a dead connection and in `restart()`.
+
+    `client_factory` makes each connection's client; by default a
+    `SocketModeClient` for `app_token` and `web_client`.
+    """
+
+    def __init__(
+        self,
+        app_token: str,
+        web_client: WebClient,
+        size: int = default_connections,
+        health_check_seconds: Optional[float] = default_health_check_seconds,
+        reconnect_stagger_seconds: float = default_reconnect_stagger_seconds,
+        client_factory: Optional[Callable[[], SocketModeClient]] = None,
+    ):
+        if size < 1 or size > max_connections:
+            raise ValueError(
+                f"Socket Mode connection count must be 1 to {max_connections}, "
+                f"got {size}"
+            )
+
+        self.web_client = web_client
+        self.health_check_seconds = health_check_seconds
+        self.reconnect_stagger_seconds = reconnect_stagger_seconds
+
+        if client_factory is None:
+
+            def client_factory() -> SocketModeClient:
+                return SocketModeClient(app_token=app_token, web_client=web_client)
+
+        self.clients = [client_factory() for _ in range(size)]
+
+        self._reconnect_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+
+    def connect(self) -> None:
+        for client in self.clients:
+            client.connect()
+        log.info("Connected to Slack with %s connections.", len(self.clients))
+
+    def add_listener(self, listener: Callable) -> None:
+        for client in self.clients:
+            client.socket_mode_request_listeners.append(listener)
+
+    def remove_listener(self, listener: Callable) -> None:
+        for client in self.clients:
+            client.socket_mode_request_listeners.remove(listener)
+
+    def connected(self) -> int:
+        return sum(1 for client in self.clients if client.is_connected())
+
+    def _reconnect(
+        self, clients: list[SocketModeClient], unhealthy_only: bool = False
+    ) -> None:
+
+        with self._reconnect_lock:
+            reconnected = 0
+            for client in clients:
+                # Another reconnect may have fixed it while this one waited
+                if unhealthy_only and client.is_connected():
+                    continue
+                if reconnected > 0 and self._stop.wait(self.reconnect_stagger_seconds):
+                    return
+                reconnected += 1
+                try:
+                    # Opens the new websocket before closing the old one
+                    client.connect_to_new_endpoint(force=True)
+                except Exception:
+                    log.exception("Socket Mode reconnect failed")
+
+    def check_health(self) -> None:
+
+        unhealthy = [client for client in self.clients if not client.is_connected()]
+        if len(unhealthy) > 0:
+            log.warning(
+                "%s of %s Socket Mode connections are down. Reconnecting.",
+                len(unhealthy),
+                len(self.clients),
+            )
+            self._reconnect(unhealthy, unhealthy_only=True)
+
+    def restart(self) -> None:
+        """Reconnect every connection, one at a time, without an event gap."""
+        self._reconnect(self.clients)
+
+    def start_health_checks(self) -> None:
+
+        if self.health_check_seconds is None or self._checker is not None:
+            return
+
+        def check_periodically():
+            while not self._stop.wait(self.health_check_seconds):
+                self.check_health()
+
+        self._checker = threading.Thread(
+            target=check_periodically,
+            name="proscenium-socket-mode-health",
+            daemon=True,
+        )
+        self._checker.start()
+
+    def disconnect(self) -> None:
+        self._stop.set()
+        if self._checker is not None:
+            self._checker.join()
+            self._checker = None
+        for client in self.clients:
+            client.disconnect()
+            client.close()
+
+
+channel_types = "public_channel,private_channel,mpim,im"
+
+default_channel_page_size = 200
+default_channel_refresh_seconds = 3600.0
+
+
+def subscribed_channels(
+    web_client: WebClient,
+    page_size: int = default_channel_page_size,
+) -> list[dict]:
+    """
+    All channels the bot is a member of, following `users_conversations`
+    cursor pagination to the end.
+    """
+
+    channels = []
+    cursor = None
+    while True:
+        response = web_client.users_conversations(
+            types=channel_types,
+            limit=page_size,
+            cursor=cursor,
+        )
+        channels.extend(response["channels"])
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+
+    log.info("Subscribed channels count: %s", len(channels))
+
+    return channels
+
+
+def channel_maps(
+    socket_mode_client: SocketModeClient,
+) -> tuple[dict[str, dict], dict[str, str]]:
+
+    channels_by_id = {
+        channel["id"]: channel
+        for channel in subscribed_channels(socket_mode_client.web_client)
+    }
+
+    channel_name_to_id = {
+        channel["name"]: channel["id"]
+        for channel in channels_by_id.values()
+        if channel.get("name")
+    }
+
+    return channels_by_id, channel_name_to_id
+
+
+def channel_names(channels_by_id: dict[str, dict]) -> dict[str, Optional[str]]:
+    return {
+        channel_id: channel.get("name")
+        for channel_id, channel in channels_by_id.items()
+    }
+
+
+class ChannelDirectory:
+    """
+    The channels the bot is a member of, keyed by channel id.
+
+    The directory is loaded in full at startup, kept current by
+    channel events from Slack, and reloaded every `refresh_seconds`
+    to catch anything the events missed. Callbacks added with `on_change`
+    are called whenever a channel is added, removed or renamed.
+
+    Channels the bot joins are looked up with `conversations_info` through
+    `sender`, off the thread that applies the event. A failed lookup
+    leaves the channel to the next refresh.
+    """
+
+    def __init__(
+        self,
+        web_client: WebClient,
+        bot_user_id: str,
+        page_size: int = default_channel_page_size,
+        refresh_seconds: Optional[float] = default_channel_refresh_seconds,
+        sender: Optional[SlackSender] = None,
+    ):
+        self.web_client = web_client
+        self.bot_user_id = bot_user_id
+        self.sender = sender
+        self.page_size = page_size
+        self.refresh_seconds = refresh_seconds
+
+        self._lock = threading.Lock()
+        self._channels_by_id: dict[str, dict] = {}
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self._change_callbacks: list[Callable[[], None]] = []
+
+    def on_change(self, callback: Callable[[], None]) -> None:
+        self._change_callbacks.append(callback)
+
+    def _changed(self) -> None:
+        for callback in self._change_callbacks:
+            try:
+                callback()
+            except Exception:
+                log.exception("Channel directory change callback failed")
+
+    def load(self) -> None:
+        channels = subscribed_channels(self.web_client, self.page_size)
+        channels_by_id = {channel["id"]: channel for channel in channels}
+        with self._lock:
+            names_before = channel_names(self._channels_by_id)
+            self._channels_by_id = channels_by_id
+        if channel_names(channels_by_id) != names_before:
+            self._changed()
+
+    def get(self, channel_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._channels_by_id.get(channel_id, None)
+
+    def channels_by_id(self) -> dict[str, dict]:
+        with self._lock:
+            return dict(self._channels_by_id)
+
+    def channel_name_to_id(self) -> dict[str, str]:
+        with self._lock:
+            return {
+                channel["name"]: channel["id"]
+                for channel in self._channels_by_id.values()
+                if channel.get("name")
+            }
+
+    def apply_event(self, event: dict) -> bool:
+        """
+        Update the directory from a channel event.
+        Returns True if the event was a channel event.
+        """
+
+        event_type = event.get("type")
+
+        if event_type in ["channel_created", "channel_rename", "group_rename"]:
+            channel = event["channel"]
+            with self._lock:
+                known = self._channels_by_id.get(channel["id"], None)
+                if known is None and not channel.get("is_member", False):
+                    return True
+                self._channels_by_id[channel["id"]] = {**(known or {}), **channel}
+            log.info("Channel %s is now named %s", channel["id"], channel["name"])
+
+        elif event_type == "member_joined_channel":
+            if event.get("user") == self.bot_user_id:
+                self._look_up_joined(event["channel"])
+            return True
+
+        elif event_type == "member_left_channel":
+            if event.get("user") != self.bot_user_id:
+                return True
+            with self._lock:
+                self._channels_by_id.pop(event["channel"], None)
+            log.info("Left channel %s", event["channel"])
+
+        elif event_type in ["channel_left", "group_left"]:
+            with self._lock:
+                self._channels_by_id.pop(event["channel"], None)
+            log.info("Left channel %s", event["channel"])
+
+        elif event_type in ["channel_deleted", "group_deleted"]:
+            with self._lock:
+                self._channels_by_id.pop(event["channel"], None)
+            log.info("Channel %s deleted", event["channel"])
+
+        else:
+            return False
+
+        self._changed()
+        return True
+
+    def _look_up_joined(self, channel_id: str) -> None:
+
+        if self.sender is None:
+            try:
+                response = self.web_client.conversations_info(channel=channel_id)
+            except SlackApiError as e:
+                self._lookup_failed(channel_id, e)
+                return
+            self._joined(response["channel"])
+            return
+
+        def looked_up(response: Future) -> None:
+            if response.exception() is not None:
+                self._lookup_failed(channel_id, response.exception())
+                return
+            self._joined(response.result()["channel"])
+
+        self.sender.send("conversations_info", channel=channel_id).add_done_callback(
+            looked_up
+        )
+
+    def _lookup_failed(self, channel_id: str, error: Exception) -> None:
+        log.warning(
+            "Looking up joined channel %s failed (%s); "
+            "it will be added at the next refresh",
+            channel_id,
+            error,
+        )
+
+    def _joined(self, channel: dict) -> None:
+        with self._lock:
+            self._channels_by_id[channel["id"]] = channel
+        log.info("Joined channel %s %s", channel["id"], channel.get("name"))
+        self._changed()
+
+    def start_refresh(self) -> None:
+
+        if self.refresh_seconds is None or self._refresher is not None:
+            return
+
+        def refresh():
+            while not self._stop.wait(self.refresh_seconds):
+                try:
+                    self.load()
+                except Exception:
+                    log.exception("Channel directory refresh failed")
+
+        self._refresher = threading.Thread(
+            target=refresh, name="proscenium-channel-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+
+class Places:
+    """
+    The characters placed in each channel, by channel id, with the admin
+    in the admin channel.
+
+    Productions place characters by channel name, so the places are
+    rebuilt from the channel directory whenever it changes. Channels the
+    bot joins, or that are renamed, after startup get their characters.
+    """
+
+    def __init__(
+        self,
+        production: Production,
+        channel_directory: ChannelDirectory,
+        admin: Admin,
+    ):
+        self.production = production
+        self.channel_directory = channel_directory
+        self.admin = admin
+
+        self._lock = threading.Lock()
+        self._places = self._build()
+        channel_directory.on_change(self.rebuild)
+
+    def _build(self) -> dict[str, Union[Character, list[Character]]]:
+        places = self.production.places(self.channel_directory.channel_name_to_id())
+        places[self.admin.channel_id] = self.admin
+        return places
+
+    def rebuild(self) -> None:
+        try:
+            places = self._build()
+        except Exception:
+            log.exception("Placing characters failed; keeping the previous places")
+            return
+        with self._lock:
+            self._places = places
+        log.info("Characters placed in %s channels", len(places))
+
+    def get(self, channel_id: str) -> Optional[Union[Character, list[Character]]]:
+        with self._lock:
+            return self._places.get(channel_id, None)
+
+    def places(self) -> dict[str, Union[Character, list[Character]]]:
+        with self._lock:
+            return dict(self._places)
+
+
+def link_in_digest(
+    sender: SlackSender,
+    admin_digest: AdminDigest,
+    receiving_channel_id: str,
+    posted: Future,
+) -> None:
+    """
+    Once `posted` resolves to a posted message, add the message's
+    permalink to the admin digest.
+    """
+
+    if receiving_channel_id == admin_digest.admin_channel_id:
+        return
+
+    def add_to_digest(permalink_response: Future) -> None:
+        if permalink_response.exception() is not None:
+            return
+        permalink = permalink_response.result()["permalink"]
+        log.info(
+            "Response sent to channel %s link %s",
+            receiving_channel_id,
+            permalink,
+        )
+        admin_digest.add(receiving_channel_id, permalink)
+
+    def get_permalink(posted: Future) -> None:
+        if posted.exception() is not None:
+            return
+        log.info("Response sent to channel %s", receiving_channel_id)
+        sender.send(
+            "chat_getPermalink",
+            channel=receiving_channel_id,
+            message_ts=posted.result()["ts"],
+        ).add_done_callback(add_to_digest)
+
+    posted.add_done_callback(get_permalink)
+
+
+def post_response(
+    sender: SlackSender,
+    admin_digest: AdminDigest,
+    receiving_channel_id: str,
+    response: str,
+) -> Future:
+    """
+    Post a response, then add its permalink to the admin digest.
+    Returns without waiting on Slack.
+    """
+
+    posted = sender.send(
+        "chat_postMessage", channel=receiving_channel_id, text=response
+    )
+    link_in_digest(sender, admin_digest, receiving_channel_id, posted)
+
+    return posted
+
+
+streaming_placeholder = "…"
+stream_error_note = "(The response was cut short by an error.)"
+default_stream_update_seconds = 1.5
+
+
+def final_stream_text(text: str, completed: bool) -> str:
+    """The text of the last edit to a streamed message."""
+
+    if not completed:
+        return (text.rstrip() + "\n\n" + stream_error_note).lstrip()
+    return text if text.strip() != "" else "(no response)"
+
+
+def stream_response(
+    sender: SlackSender,
+    admin_digest: AdminDigest,
+    receiving_channel_id: str,
+    chunks: Iterator[str],
+    update_seconds: float = default_stream_update_seconds,
+) -> Future:
+    """
+    Post a placeholder message, then edit it with `chat_update` as chunks
+    of the response arrive. Edits are sent at most every `update_seconds`,
+    and skipped while an earlier edit is still in flight. If `chunks`
+    raises, the message is finalized with the partial text and a note
+    before the error is re-raised.
+    """
+
+    placeholder = sender.call(
+        "chat_postMessage", channel=receiving_channel_id, text=streaming_placeholder
+    )
+    ts = placeholder["ts"]
+
+    text = ""
+    last_update = time.monotonic()
+    in_flight = None
+    completed = False
+
+    try:
+        for chunk in chunks:
+            text += chunk
+            now = time.monotonic()
+            if now - last_update < update_seconds:
+                continue
+            if in_flight is not None and not in_flight.done():
+                continue
+            in_flight = sender.send(
+                "chat_update",
+                channel=receiving_channel_id,
+                ts=ts,
+                text=text + " " + streaming_placeholder,
+            )
+            last_update = now
+        completed = True
+    finally:
+        if not completed:
+            log.warning("Streaming to channel %s failed", receiving_channel_id)
+        final = sender.send(
+            "chat_update",
+            channel=receiving_channel_id,
+            ts=ts,
+            text=final_stream_text(text, completed),
+        )
+        link_in_digest(sender, admin_digest, receiving_channel_id, final)
+
+    return final
+
+
+def speculative_responses(
+    character: Character, channel_id: str, speaker_id: str, text: str
+) -> Optional[Iterator[tuple[str, Any]]]:
+    """
+    The character's responses, or None if it does not want to handle the text.
+    Speculating characters start on the response while they decide.
+    """
+
+    speculation = None
+    try:
+        wants_to_handle = character.quick_decision(text)
+        if wants_to_handle is None:
+            if character.speculate:
+                speculation = Speculation.start(character, channel_id, speaker_id, text)
+            wants_to_handle = character.ask_wants_to_handle(
+                channel_id, speaker_id, text
+            )
+    except BaseException:
+        if speculation is not None:
+            speculation.discard()
+        raise
+
+    if not wants_to_handle:
+        if speculation is not None:
+            speculation.discard()
+        return None
+
+    if speculation is not None:
+        return speculation.responses()
+    return character.handle(channel_id, speaker_id, text)
+
+
+def handle_utterance(
+    sender: SlackSender,
+    admin_digest: AdminDigest,
+    character: Union[Character, list[Character]],
+    channel_id: str,
+    speaker_id: str,
+    text: str,
+    stream_update_seconds: float = default_stream_update_seconds,
+    selector: Optional[CandidateSelector] = None,
+) -> None:
+
+    with span(slack_dispatch_span, channel_id=channel_id) as s:
+
+        # TODO determine whether the handler has a good chance of being useful
+
+        characters = characters_in_place(character)
+        s.set(candidates=len(characters))
+
+        if len(characters) == 1:
+            character = characters[0]
+            responses = speculative_responses(character, channel_id, speaker_id, text)
+        else:
+            if selector is not None:
+                character = selector.select(characters, channel_id, speaker_id, text)
+            else:
+                character = next(
+                    (
+                        c
+                        for c in characters
+                        if c.decide_to_handle(channel_id, speaker_id, text)
+                    ),
+                    None,
+                )
+            responses = None
+            if character is not None:
+                responses = character.handle(channel_id, speaker_id, text)
+
+        if responses is None:
+            log.info(
+                "No handler in channel %s wants to handle it (%s)",
+                channel_id,
+                ", ".join([c.name() for c in characters]),
+            )
+            return
+
+        log.info(
+            "Handler %s in channel %s wants to handle it",
+            character.name(),
+            channel_id,
+        )
+        s.set(character=character.name())
+
+        for receiving_channel_id, response in responses:
+            if isinstance(response, str):
+                post_response(sender, admin_digest, receiving_channel_id, response)
+            else:
+                stream_response(
+                    sender,
+                    admin_digest,
+                    receiving_channel_id,
+                    response,
+                    stream_update_seconds,
+                )
+
+
+def speculating_characters(
+    channel_id_to_character: dict[str, Union[Character, list[Character]]],
+) -> list[Character]:
+
+    characters = {
+        id(c): c
+        for place in channel_id_to_character.values()
+        for c in characters_in_place(place)
+    }
+    return [c for c in characters.values() if c.speculate]
+
+
+def log_speculation_stats(
+    channel_id_to_character: dict[str, Union[Character, list[Character]]],
+) -> None:
+
+    for character in speculating_characters(channel_id_to_character):
+        log.info(
+            "Speculative responses by %s: %s",
+            character.name(),
+            character.speculation_stats,
+        )
+
+
+speculation_metrics = [
+    ("started", "proscenium_speculations_started_total", "Speculations started"),
+    ("used", "proscenium_speculations_used_total", "Speculations used"),
+    ("wasted", "proscenium_speculations_wasted_total", "Speculations discarded"),
+    (
+        "skipped",
+        "proscenium_speculations_skipped_total",
+        "Speculations not started because the pool was busy",
+    ),
+    (
+        "wasted_seconds",
+        "proscenium_speculation_wasted_seconds_total",
+        "Time spent on discarded speculations",
+    ),
+    (
+        "saved_seconds",
+        "proscenium_speculation_saved_seconds_total",
+        "Head start gained by used speculations",
+    ),
+]
+
+
+def register_slack_metrics(
+    registry: MetricsRegistry, dedup: DedupCache, places: "Places"
+) -> None:
+    """
+    Export the duplicate event counts of `dedup`, and the speculation
+    counts of the characters in `places`, to `registry`.
+    """
+
+    registry.callback_counter(
+        "proscenium_slack_duplicate_events_total",
+        "Slack events dropped as duplicates",
+        (),
+        lambda: {(): dedup.hits},
+    )
+    registry.callback_counter(
+        "proscenium_slack_events_total",
+        "Slack events seen for the first time",
+        (),
+        lambda: {(): dedup.misses},
+    )
+
+    def collect(attribute: str) -> Callable[[], dict[tuple[str, ...], float]]:
+        def values() -> dict[tuple[str, ...], float]:
+            totals = {}
+            for character in speculating_characters(places.places()):
+                label = (character.name(),)
+                value = getattr(character.speculation_stats, attribute)
+                totals[label] = totals.get(label, 0.0) + value
+            return totals
+
+        return values
+
+    for attribute, name, help in speculation_metrics:
+        registry.callback_counter(name, help, ("character",), collect(attribute))
+
+
+def event_keys(payload: dict, event: dict) -> list[str]:
+    """
+    Keys identifying an event for duplicate suppression. Slack redelivers
+    an event with the same event_id, and a message that mentions the bot
+    arrives both as `message` and `app_mention` with the same channel and ts.
+    """
+
+    keys = []
+    if payload.get("event_id"):
+        keys.append(f"event:{payload['event_id']}")
+    if event.get("client_msg_id"):
+        keys.append(f"msg:{event['client_msg_id']}")
+    channel = event.get("channel")
+    if isinstance(channel, str) and event.get("ts"):
+        keys.append(f"ts:{channel}:{event['ts']}")
+    return keys
+
+
+def event_priority(event: dict) -> int:
+    """
+    Mentions of the bot and direct messages are high priority.
+    Other channel chatter is low priority and is shed first under load.
+    """
+
+    if event.get("type") == "app_mention" or event.get("channel_type") == "im":
+        return high_priority
+    return low_priority
+
+
 def make_slack_listener(
     proscenium_user_id: str,
     admin_channel_id: str,
-    channels_by_id: dict,
-    channel_id_to_handler: dict[
-        str, Callable[[str, str, str], Generator[tuple[str, str], None, None]]
-    ],
+    channel_directory: ChannelDirectory,
+    places: Places,
+    admission: AdmissionController,
+    dedup: DedupCache,
+    sender: SlackSender,
+    admin_digest: AdminDigest,
     console: Console,
+    busy_reply: Optional[str] = None,
+    stream_update_seconds: float = default_stream_update_seconds,
+    selector: Optional[CandidateSelector] = None,
 ):
 
     def process(client: SocketModeClient, req: SocketModeRequest):
@@ -67,6 +849,17 @@ def make_slack_listener(
             response = SocketModeResponse(envelope_id=req.envelope_id)
             client.send_socket_mode_response(response)
 
+            if dedup.seen(event_keys(req.payload, event)):
+                log.info(
+                    "Dropping duplicate %s event (retry %s)",
+                    event.get("type"),
+                    req.retry_attempt,
+                )
+                return
+
+            if channel_directory.apply_event(event):
+                return
+
             if event.get("type") in [
                 "message",
                 "app_mention",
@@ -79,59 +872,43 @@ def make_slack_listener(
                 channel_id = event.get("channel")
                 console.print(f"{speaker_id} in {channel_id} said something")
 
-                channel = channels_by_id.get(channel_id, None)
+                character = places.get(channel_id)
 
-                if channel is None:
+                if channel_directory.get(channel_id) is None or character is None:
 
-                    # TODO: channels_by_id will get stale
                     log.info("No handler for channel id %s", channel_id)
 
                 else:
 
-                    character = channel_id_to_handler[channel_id]
                     log.info("Handler defined for channel id %s", channel_id)
 
-                    # TODO determine whether the handler has a good chance of being useful
-
-                    if character.wants_to_handle(channel_id, speaker_id, text):
-
-                        log.info(
-                            "Handler %s in channel %s wants to handle it",
-                            character.name(),
-                            channel_id,
-                        )
-
-                        for receiving_channel_id, response in character.handle(
-                            channel_id, speaker_id, text
-                        ):
-                            response_response = client.web_client.chat_postMessage(
-                                channel=receiving_channel_id, text=response
-                            )
-                            log.info(
-                                "Response sent to channel %s",
-                                receiving_channel_id,
-                            )
-                            if receiving_channel_id == admin_channel_id:
-                                continue
-
-                            permalink = client.web_client.chat_getPermalink(
-                                channel=receiving_channel_id,
-                                message_ts=response_response["ts"],
-                            )["permalink"]
-                            log.info(
-                                "Response sent to channel %s link %s",
-                                receiving_channel_id,
-                                permalink,
-                            )
-                            client.web_client.chat_postMessage(
-                                channel=admin_channel_id,
-                                text=permalink,
-                            )
-                    else:
-                        log.info(
-                            "Handler %s in channel %s does not want to handle it",
-                            character.name(),
-                            channel_id,
+                    # Characters may take a long time to respond (LLM calls),
+                    # so the work runs off the Socket Mode listener thread.
+                    priority = event_priority(event)
+                    outcome = admission.admit(
+                        channel_id,
+                        priority,
+                        handle_utterance,
+                        sender,
+                        admin_digest,
+                        character,
+                        channel_id,
+                        speaker_id,
+                        text,
+                        stream_update_seconds,
+                        selector,
+                    )
+
+                    if (
+                        outcome == admission_shed
+                        and priority == high_priority
+                        and busy_reply is not None
+                    ):
+                        sender.send(
+                            "chat_postMessage",
+                            channel=channel_id,
+                            thread_ts=event.get("ts"),
+                            text=busy_reply,
                         )
 
         elif req.type == "interactive":
@@ -148,32 +925,6 @@ def make_slack_listener(
     return process
 
 
-def channel_maps(
-    socket_mode_client: SocketModeClient,
-) -> tuple[dict[str, dict], dict[str, str]]:
-
-    subscribed_channels = socket_mode_client.web_client.users_conversations(
-        types="public_channel,private_channel,mpim,im",
-        limit=100,
-    )
-    log.info(
-        "Subscribed channels count: %s",
-        len(subscribed_channels["channels"]),
-    )
-
-    channels_by_id = {
-        channel["id"]: channel for channel in subscribed_channels["channels"]
-    }
-
-    channel_name_to_id = {
-        channel["name"]: channel["id"]
-        for channel in channels_by_id.values()
-        if channel.get("name")
-    }
-
-    return channels_by_id, channel_name_to_id
-
-
 def channel_table(channels_by_id) -> Table:
     channel_table = Table(title="Subscribed channels")
     channel_table.add_column("Channel ID", justify="left")
@@ -190,6 +941,11 @@ def bot_user_id(socket_mode_client: SocketModeClient, console: Console) -> str:
 
     auth_response = socket_mode_client.web_client.auth_test()
 
+    return print_bot_identity(auth_response, console)
+
+
+def print_bot_identity(auth_response: dict, console: Console) -> str:
+
     console.print(auth_response["url"])
     console.print()
     console.print("Team", auth_response["team"], auth_response["team_id"])
@@ -202,27 +958,25 @@ def bot_user_id(socket_mode_client: SocketModeClient, console: Console) -> str:
 
 
 def places_table(
-    channel_id_to_character: dict[str, Character], channels_by_id: dict[str, dict]
+    channel_id_to_character: dict[str, Union[Character, list[Character]]],
+    channels_by_id: dict[str, dict],
 ) -> Table:
 
     table = Table(title="Characters in place")
     table.add_column("Channel ID", justify="left")
     table.add_column("Channel Name", justify="left")
     table.add_column("Character", justify="left")
-    for channel_id, character in channel_id_to_character.items():
+    for channel_id, place in channel_id_to_character.items():
         channel = channels_by_id[channel_id]
-        table.add_row(channel_id, channel["name"], character.name())
+        names = ", ".join([c.name() for c in characters_in_place(place)])
+        table.add_row(channel_id, channel["name"], names)
 
     return table
 
 
-def send_curtain_up(
-    socket_mode_client: SocketModeClient,
-    production: Production,
-    slack_admin_channel_id: str,
-) -> None:
+def curtain_up_message(production: Production) -> str:
 
-    curtain_up_message = f"""
+    return f"""
 Proscenium 🎭 https://the-ai-alliance.github.io/proscenium/
 
 ```
@@ -232,9 +986,36 @@ Proscenium 🎭 https://the-ai-alliance.github.io/proscenium/
 Curtain up.
 """
 
+
+curtain_down_message = """Curtain down. We hope you enjoyed the show!"""
+
+
+def send_curtain_up(
+    socket_mode_client: SocketModeClient,
+    production: Production,
+    slack_admin_channel_id: str,
+) -> None:
+
     socket_mode_client.web_client.chat_postMessage(
         channel=slack_admin_channel_id,
-        text=curtain_up_message,
+        text=curtain_up_message(production),
+    )
+
+
+def candidate_selector(production: Production, slack_config: dict) -> CandidateSelector:
+    """
+    How channels with several characters choose one, from the `candidates`
+    section of the Slack configuration and the production's router.
+    """
+
+    candidates_config = slack_config.get("candidates", {})
+    return CandidateSelector(
+        router=production.router(),
+        deadline_seconds=candidates_config.get(
+            "deadline_seconds", default_candidate_deadline_seconds
+        ),
+        selection=candidates_config.get("selection", select_first),
+        workers=candidates_config.get("workers", default_candidate_workers),
     )
 
 
@@ -246,19 +1027,93 @@ class SlackProductionProcessor:
         slack_admin_channel: str,
         console: Optional[Console] = None,
         event_log: Optional[list[tuple[str, str]]] = None,
+        slack_config: Optional[dict] = None,
     ):
         self.production = production
         self.console = console
         self.event_log = event_log
 
-        slack_app_token, slack_bot_token = get_slack_auth()
+        slack_config = slack_config or {}
+        dispatch_config = slack_config.get("dispatch", {})
+        self.dispatcher = ChannelDispatcher(
+            workers=dispatch_config.get("workers", default_workers),
+            queue_depth=dispatch_config.get("queue_depth", default_queue_depth),
+        )
+
+        admission_config = slack_config.get("admission", {})
+        self.admission = AdmissionController(
+            self.dispatcher,
+            high_water=admission_config.get("high_water", None),
+            low_priority_high_water=admission_config.get(
+                "low_priority_high_water", None
+            ),
+            defer_low_priority=admission_config.get("defer_low_priority", False),
+            max_deferred=admission_config.get("max_deferred", default_max_deferred),
+        )
+        busy_reply = admission_config.get("busy_reply", None)
+
+        speculation_config = slack_config.get("speculation", {})
+        set_default_speculation_pool(
+            SpeculationPool(
+                workers=speculation_config.get("workers", default_speculation_workers)
+            )
+        )
+
+        dedup_config = slack_config.get("dedup", {})
+        self.dedup = DedupCache(
+            max_entries=dedup_config.get("max_entries", default_dedup_max_entries),
+            ttl_seconds=dedup_config.get("ttl_seconds", default_dedup_ttl_seconds),
+        )
 
-        self.socket_mode_client = connect(slack_app_token, slack_bot_token)
+        slack_app_token, slack_bot_token = get_slack_auth()
+        # Pointing base_url elsewhere, eg at a local stand-in, is for testing
+        base_url = slack_config.get("base_url", WebClient.BASE_URL)
+
+        connections_config = slack_config.get("connections", {})
+        self.socket_mode_pool = SocketModePool(
+            slack_app_token,
+            WebClient(token=slack_bot_token, base_url=base_url),
+            size=connections_config.get("count", default_connections),
+            health_check_seconds=connections_config.get(
+                "health_check_seconds", default_health_check_seconds
+            ),
+            reconnect_stagger_seconds=connections_config.get(
+                "reconnect_stagger_seconds", default_reconnect_stagger_seconds
+            ),
+        )
+        self.socket_mode_pool.connect()
+        self.socket_mode_client = self.socket_mode_pool.clients[0]
 
         user_id = bot_user_id(self.socket_mode_client, console)
         console.print()
 
-        channels_by_id, channel_name_to_id = channel_maps(self.socket_mode_client)
+        outbound_config = slack_config.get("outbound", {})
+        self.sender = SlackSender(
+            self.socket_mode_client.web_client,
+            workers=outbound_config.get("workers", default_outbound_workers),
+            queue_depth=outbound_config.get(
+                "queue_depth", default_outbound_queue_depth
+            ),
+            max_retries=outbound_config.get("max_retries", default_max_retries),
+            backoff_seconds=outbound_config.get(
+                "backoff_seconds", default_backoff_seconds
+            ),
+            rates_per_minute=outbound_config.get("rates_per_minute", None),
+        )
+
+        channel_config = slack_config.get("channels", {})
+        self.channel_directory = ChannelDirectory(
+            self.socket_mode_client.web_client,
+            user_id,
+            page_size=channel_config.get("page_size", default_channel_page_size),
+            refresh_seconds=channel_config.get(
+                "refresh_seconds", default_channel_refresh_seconds
+            ),
+            sender=self.sender,
+        )
+        self.channel_directory.load()
+        channels_by_id = self.channel_directory.channels_by_id()
+        channel_name_to_id = self.channel_directory.channel_name_to_id()
         console.print(channel_table(channels_by_id))
         console.print()
 
@@ -275,43 +1130,77 @@ class SlackProductionProcessor:
 
         self.admin = Admin(slack_admin_channel_id, slack_admin_channel)
 
+        digest_config = slack_config.get("admin_digest", {})
+        self.admin_digest = AdminDigest(
+            self.sender,
+            slack_admin_channel_id,
+            interval_seconds=digest_config.get(
+                "interval_seconds", default_digest_interval_seconds
+            ),
+            max_batch=digest_config.get("max_batch", default_digest_max_batch),
+        )
+
         log.info("Places, please!")
-        channel_id_to_character = production.places(channel_name_to_id)
-        channel_id_to_character[slack_admin_channel_id] = self.admin
+        self.places = Places(production, self.channel_directory, self.admin)
+        register_slack_metrics(default_metrics_registry(), self.dedup, self.places)
 
-        console.print(places_table(channel_id_to_character, channels_by_id))
+        console.print(places_table(self.places.places(), channels_by_id))
         console.print()
 
+        self.selector = candidate_selector(production, slack_config)
+
         self.slack_listener = make_slack_listener(
             user_id,
             slack_admin_channel_id,
-            channels_by_id,
-            channel_id_to_character,
+            self.channel_directory,
+            self.places,
+            self.admission,
+            self.dedup,
+            self.sender,
+            self.admin_digest,
             console,
+            busy_reply,
+            slack_config.get("streaming", {}).get(
+                "update_seconds", default_stream_update_seconds
+            ),
+            self.selector,
         )
 
         send_curtain_up(self.socket_mode_client, production, slack_admin_channel_id)
 
+        self.channel_directory.start_refresh()
+        self.admin_digest.start()
+
         console.print("Starting the show. Listening for events...")
-        self.socket_mode_client.socket_mode_request_listeners.append(
-            self.slack_listener
-        )
+        self.socket_mode_pool.add_listener(self.slack_listener)
+        self.socket_mode_pool.start_health_checks()
 
     def shutdown(
         self,
     ):
         self.socket_mode_client.web_client.chat_postMessage(
             channel=self.admin.channel_id,
-            text="""Curtain down. We hope you enjoyed the show!""",
+            text=curtain_down_message,
         )
 
-        self.socket_mode_client.socket_mode_request_listeners.remove(
-            self.slack_listener
-        )
-        self.socket_mode_client.disconnect()
+        self.socket_mode_pool.remove_listener(self.slack_listener)
+        self.dispatcher.shutdown()
+        self.selector.shutdown()
+        self.sender.join()
+        self.admin_digest.stop()
+        self.sender.shutdown()
+        self.channel_directory.stop()
+        self.socket_mode_pool.disconnect()
         if self.console is not None:
             self.console.print("Disconnected from Slack.")
 
+        log.info(
+            "Duplicate events dropped: %s of %s",
+            self.dedup.hits,
+            self.dedup.hits + self.dedup.misses,
+        )
+        log_speculation_stats(self.places.places())
+
         self.production.curtain()
 
         if self.console is not None:
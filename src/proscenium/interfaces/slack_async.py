@@ -0,0 +1,624 @@
+"""
+An asyncio alternative to `proscenium.interfaces.slack.SlackProductionProcessor`.
+
+Events arrive over the aiohttp Socket Mode client and are handled as
+coroutines on one event loop, so a slow LLM call in one conversation
+holds no thread. Characters are driven through `Character.awants_to_handle`
+and `Character.ahandle`, which characters can override with native
+async implementations.
+"""
+
+from typing import Any
+from typing import AsyncIterator
+from typing import Optional
+from typing import Union
+
+import asyncio
+import logging
+import time
+from rich.console import Console
+
+from slack_sdk.web import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.socket_mode.aiohttp import SocketModeClient as AsyncSocketModeClient
+from slack_sdk.socket_mode.request import SocketModeRequest
+from slack_sdk.socket_mode.response import SocketModeResponse
+from slack_sdk.http_retry.builtin_async_handlers import (
+    AsyncConnectionErrorRetryHandler,
+    AsyncRateLimitErrorRetryHandler,
+    AsyncServerErrorRetryHandler,
+)
+
+from proscenium import Production
+from proscenium import Character
+from proscenium import characters_in_place
+from proscenium.admin import Admin
+from proscenium.patterns.routing import CandidateSelector
+from proscenium.metrics import default_metrics_registry
+from proscenium.speculation import AsyncSpeculation
+from proscenium.speculation import SpeculationPool
+from proscenium.speculation import default_speculation_workers
+from proscenium.speculation import set_default_speculation_pool
+from proscenium.tracing import slack_dispatch_span
+from proscenium.tracing import span
+from proscenium.interfaces.dispatch import AsyncChannelDispatcher
+from proscenium.interfaces.dispatch import AdmissionController
+from proscenium.interfaces.dispatch import DedupCache
+from proscenium.interfaces.dispatch import admission_shed
+from proscenium.interfaces.dispatch import high_priority
+from proscenium.interfaces.dispatch import default_async_concurrency
+from proscenium.interfaces.dispatch import default_async_queue_depth
+from proscenium.interfaces.dispatch import default_max_deferred
+from proscenium.interfaces.dispatch import default_dedup_max_entries
+from proscenium.interfaces.dispatch import default_dedup_ttl_seconds
+from proscenium.interfaces.slack import get_slack_auth
+from proscenium.interfaces.slack import max_connections
+from proscenium.interfaces.slack import default_connections
+from proscenium.interfaces.slack import ChannelDirectory
+from proscenium.interfaces.slack import Places
+from proscenium.interfaces.slack import default_channel_page_size
+from proscenium.interfaces.slack import default_channel_refresh_seconds
+from proscenium.interfaces.slack import channel_table
+from proscenium.interfaces.slack import places_table
+from proscenium.interfaces.slack import print_bot_identity
+from proscenium.interfaces.slack import curtain_up_message
+from proscenium.interfaces.slack import curtain_down_message
+from proscenium.interfaces.slack import event_keys
+from proscenium.interfaces.slack import event_priority
+from proscenium.interfaces.slack import streaming_placeholder
+from proscenium.interfaces.slack import final_stream_text
+from proscenium.interfaces.slack import default_stream_update_seconds
+from proscenium.interfaces.slack import log_speculation_stats
+from proscenium.interfaces.slack import register_slack_metrics
+from proscenium.interfaces.slack import candidate_selector
+from proscenium.interfaces.slack_outbound import SlackSender
+from proscenium.interfaces.slack_outbound import TokenBuckets
+from proscenium.interfaces.slack_outbound import digest_text
+from proscenium.interfaces.slack_outbound import default_max_retries
+from proscenium.interfaces.slack_outbound import default_digest_interval_seconds
+from proscenium.interfaces.slack_outbound import default_digest_max_batch
+
+log = logging.getLogger(__name__)
+
+
+class AsyncSlackSender:
+    """
+    Awaits Slack Web API calls under the same per-method token buckets
+    as `SlackSender`. Retries, including `Retry-After` on rate limited
+    responses, are left to the `AsyncWebClient` retry handlers.
+    """
+
+    def __init__(
+        self,
+        web_client: AsyncWebClient,
+        rates_per_minute: Optional[dict[str, float]] = None,
+    ):
+        self.web_client = web_client
+        self.buckets = TokenBuckets(rates_per_minute)
+
+    async def call(self, method: str, **kwargs: Any) -> Any:
+        wait = self.buckets.get(method, kwargs.get("channel", None)).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return await getattr(self.web_client, method)(**kwargs)
+
+
+class AsyncAdminDigest:
+    """The asyncio counterpart of `AdminDigest`."""
+
+    def __init__(
+        self,
+        sender: AsyncSlackSender,
+        admin_channel_id: str,
+        interval_seconds: Optional[float] = default_digest_interval_seconds,
+        max_batch: int = default_digest_max_batch,
+    ):
+        self.sender = sender
+        self.admin_channel_id = admin_channel_id
+        self.interval_seconds = interval_seconds
+        self.max_batch = max_batch
+
+        self._links: list[tuple[str, str]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def add(self, channel_id: str, permalink: str) -> None:
+        self._links.append((channel_id, permalink))
+        if len(self._links) >= self.max_batch:
+            await self.flush()
+
+    async def flush(self) -> None:
+        links = self._links
+        self._links = []
+        if len(links) == 0:
+            return
+        log.info("Posting admin digest of %s responses", len(links))
+        await self.sender.call(
+            "chat_postMessage", channel=self.admin_channel_id, text=digest_text(links)
+        )
+
+    def start(self) -> None:
+
+        if self.interval_seconds is None or self._flusher is not None:
+            return
+
+        async def flush_periodically():
+            while True:
+                await asyncio.sleep(self.interval_seconds)
+                try:
+                    await self.flush()
+                except Exception:
+                    log.exception("Admin digest failed")
+
+        self._flusher = asyncio.get_running_loop().create_task(flush_periodically())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+
+async def post_response(
+    sender: AsyncSlackSender,
+    admin_digest: AsyncAdminDigest,
+    receiving_channel_id: str,
+    response: str,
+) -> None:
+
+    posted = await sender.call(
+        "chat_postMessage", channel=receiving_channel_id, text=response
+    )
+    await link_in_digest(sender, admin_digest, receiving_channel_id, posted["ts"])
+
+
+async def stream_response(
+    sender: AsyncSlackSender,
+    admin_digest: AsyncAdminDigest,
+    receiving_channel_id: str,
+    chunks: Any,
+    update_seconds: float = default_stream_update_seconds,
+) -> None:
+    """
+    Post a placeholder and edit it as chunks arrive, at most every
+    `update_seconds`. `chunks` may be a sync or async iterator. If it
+    raises, the message is finalized before the error is re-raised.
+    """
+
+    placeholder = await sender.call(
+        "chat_postMessage", channel=receiving_channel_id, text=streaming_placeholder
+    )
+    ts = placeholder["ts"]
+
+    text = ""
+    last_update = time.monotonic()
+    completed = False
+
+    try:
+        async for chunk in as_async_iterator(chunks):
+            text += chunk
+            now = time.monotonic()
+            if now - last_update < update_seconds:
+                continue
+            await sender.call(
+                "chat_update",
+                channel=receiving_channel_id,
+                ts=ts,
+                text=text + " " + streaming_placeholder,
+            )
+            last_update = now
+        completed = True
+    finally:
+        if not completed:
+            log.warning("Streaming to channel %s failed", receiving_channel_id)
+        await sender.call(
+            "chat_update",
+            channel=receiving_channel_id,
+            ts=ts,
+            text=final_stream_text(text, completed),
+        )
+        await link_in_digest(sender, admin_digest, receiving_channel_id, ts)
+
+
+async def as_async_iterator(chunks: Any):
+
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    # A sync iterator may block on the network between chunks
+    iterator = iter(chunks)
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def link_in_digest(
+    sender: AsyncSlackSender,
+    admin_digest: AsyncAdminDigest,
+    receiving_channel_id: str,
+    ts: str,
+) -> None:
+
+    if receiving_channel_id == admin_digest.admin_channel_id:
+        return
+
+    permalink = (
+        await sender.call(
+            "chat_getPermalink", channel=receiving_channel_id, message_ts=ts
+        )
+    )["permalink"]
+    log.info("Response sent to channel %s link %s", receiving_channel_id, permalink)
+    await admin_digest.add(receiving_channel_id, permalink)
+
+
+async def speculative_responses(
+    character: Character, channel_id: str, speaker_id: str, text: str
+) -> Optional[AsyncIterator[tuple[str, Any]]]:
+    """Async variant of `proscenium.interfaces.slack.speculative_responses`."""
+
+    speculation = None
+    try:
+        wants_to_handle = character.quick_decision(text)
+        if wants_to_handle is None:
+            if character.speculate:
+                speculation = AsyncSpeculation.start(
+                    character, channel_id, speaker_id, text
+                )
+            wants_to_handle = await character.aask_wants_to_handle(
+                channel_id, speaker_id, text
+            )
+    except BaseException:
+        if speculation is not None:
+            speculation.discard()
+        raise
+
+    if not wants_to_handle:
+        if speculation is not None:
+            speculation.discard()
+        return None
+
+    if speculation is not None:
+        return speculation.responses()
+    return character.ahandle(channel_id, speaker_id, text)
+
+
+async def handle_utterance(
+    sender: AsyncSlackSender,
+    admin_digest: AsyncAdminDigest,
+    character: Union[Character, list[Character]],
+    channel_id: str,
+    speaker_id: str,
+    text: str,
+    stream_update_seconds: float = default_stream_update_seconds,
+    selector: Optional[CandidateSelector] = None,
+) -> None:
+
+    with span(slack_dispatch_span, channel_id=channel_id) as s:
+
+        characters = characters_in_place(character)
+        s.set(candidates=len(characters))
+
+        if len(characters) == 1:
+            character = characters[0]
+            responses = await speculative_responses(
+                character, channel_id, speaker_id, text
+            )
+        else:
+            character = None
+            if selector is not None:
+                character = await selector.aselect(
+                    characters, channel_id, speaker_id, text
+                )
+            else:
+                for candidate in characters:
+                    if await candidate.adecide_to_handle(channel_id, speaker_id, text):
+                        character = candidate
+                        break
+            responses = None
+            if character is not None:
+                responses = character.ahandle(channel_id, speaker_id, text)
+
+        if responses is None:
+            log.info(
+                "No handler in channel %s wants to handle it (%s)",
+                channel_id,
+                ", ".join([c.name() for c in characters]),
+            )
+            return
+
+        log.info(
+            "Handler %s in channel %s wants to handle it",
+            character.name(),
+            channel_id,
+        )
+        s.set(character=character.name())
+
+        async for receiving_channel_id, response in responses:
+            if isinstance(response, str):
+                await post_response(
+                    sender, admin_digest, receiving_channel_id, response
+                )
+            else:
+                await stream_response(
+                    sender,
+                    admin_digest,
+                    receiving_channel_id,
+                    response,
+                    stream_update_seconds,
+                )
+
+
+class AsyncSlackProductionProcessor:
+    """
+    Runs a `Production` in Slack on an asyncio event loop.
+
+    Construct it, then `await start()`. `run_forever()` does both and
+    shuts down when cancelled.
+    """
+
+    def __init__(
+        self,
+        production: Production,
+        slack_admin_channel: str,
+        console: Optional[Console] = None,
+        slack_config: Optional[dict] = None,
+    ):
+        if slack_admin_channel is None:
+            raise ValueError(
+                "slack.admin_channel is not set. "
+                "Please set it to the channel name of the Proscenium admin channel."
+            )
+
+        self.production = production
+        self.slack_admin_channel = slack_admin_channel
+        self.console = console or Console()
+        self.slack_config = slack_config or {}
+
+    async def start(self) -> None:
+
+        console = self.console
+        slack_config = self.slack_config
+
+        asyncio_config = slack_config.get("asyncio", {})
+        self.dispatcher = AsyncChannelDispatcher(
+            concurrency=asyncio_config.get("concurrency", default_async_concurrency),
+            queue_depth=asyncio_config.get("queue_depth", default_async_queue_depth),
+        )
+
+        admission_config = slack_config.get("admission", {})
+        self.admission = AdmissionController(
+            self.dispatcher,
+            high_water=admission_config.get("high_water", None),
+            low_priority_high_water=admission_config.get(
+                "low_priority_high_water", None
+            ),
+            defer_low_priority=admission_config.get("defer_low_priority", False),
+            max_deferred=admission_config.get("max_deferred", default_max_deferred),
+        )
+        self.busy_reply = admission_config.get("busy_reply", None)
+
+        speculation_config = slack_config.get("speculation", {})
+        set_default_speculation_pool(
+            SpeculationPool(
+                workers=speculation_config.get("workers", default_speculation_workers)
+            )
+        )
+
+        dedup_config = slack_config.get("dedup", {})
+        self.dedup = DedupCache(
+            max_entries=dedup_config.get("max_entries", default_dedup_max_entries),
+            ttl_seconds=dedup_config.get("ttl_seconds", default_dedup_ttl_seconds),
+        )
+
+        self.stream_update_seconds = slack_config.get("streaming", {}).get(
+            "update_seconds", default_stream_update_seconds
+        )
+
+        slack_app_token, slack_bot_token = get_slack_auth()
+        base_url = slack_config.get("base_url", AsyncWebClient.BASE_URL)
+
+        outbound_config = slack_config.get("outbound", {})
+        max_retries = outbound_config.get("max_retries", default_max_retries)
+        web_client = AsyncWebClient(
+            token=slack_bot_token,
+            base_url=base_url,
+            retry_handlers=[
+                AsyncConnectionErrorRetryHandler(max_retry_count=max_retries),
+                AsyncRateLimitErrorRetryHandler(max_retry_count=max_retries),
+                AsyncServerErrorRetryHandler(max_retry_count=max_retries),
+            ],
+        )
+        self.sender = AsyncSlackSender(
+            web_client,
+            rates_per_minute=outbound_config.get("rates_per_minute", None),
+        )
+
+        # The aiohttp clients monitor and reconnect their own sessions,
+        # so the pool here needs no separate health check.
+        connections_config = slack_config.get("connections", {})
+        connection_count = connections_config.get("count", default_connections)
+        if connection_count < 1 or connection_count > max_connections:
+            raise ValueError(
+                f"Socket Mode connection count must be 1 to {max_connections}, "
+                f"got {connection_count}"
+            )
+        self.socket_mode_clients = [
+            AsyncSocketModeClient(app_token=slack_app_token, web_client=web_client)
+            for _ in range(connection_count)
+        ]
+
+        self.user_id = print_bot_identity(await web_client.auth_test(), console)
+        console.print()
+
+        # The directory is refreshed rarely, so it keeps a blocking client
+        # and does its network calls in worker threads.
+        channel_config = slack_config.get("channels", {})
+        directory_web_client = WebClient(token=slack_bot_token, base_url=base_url)
+        self.directory_sender = SlackSender(
+            directory_web_client,
+            workers=1,
+            max_retries=max_retries,
+            rates_per_minute=outbound_config.get("rates_per_minute", None),
+        )
+        self.channel_directory = ChannelDirectory(
+            directory_web_client,
+            self.user_id,
+            page_size=channel_config.get("page_size", default_channel_page_size),
+            refresh_seconds=channel_config.get(
+                "refresh_seconds", default_channel_refresh_seconds
+            ),
+            sender=self.directory_sender,
+        )
+        await asyncio.to_thread(self.channel_directory.load)
+        channels_by_id = self.channel_directory.channels_by_id()
+        channel_name_to_id = self.channel_directory.channel_name_to_id()
+        console.print(channel_table(channels_by_id))
+        console.print()
+
+        slack_admin_channel_id = channel_name_to_id.get(self.slack_admin_channel, None)
+        if slack_admin_channel_id is None:
+            raise ValueError(
+                f"Admin channel {self.slack_admin_channel} not found in subscribed channels."
+            )
+
+        self.admin = Admin(slack_admin_channel_id, self.slack_admin_channel)
+
+        digest_config = slack_config.get("admin_digest", {})
+        self.admin_digest = AsyncAdminDigest(
+            self.sender,
+            slack_admin_channel_id,
+            interval_seconds=digest_config.get(
+                "interval_seconds", default_digest_interval_seconds
+            ),
+            max_batch=digest_config.get("max_batch", default_digest_max_batch),
+        )
+
+        log.info("Places, please!")
+        self.places = Places(self.production, self.channel_directory, self.admin)
+        register_slack_metrics(default_metrics_registry(), self.dedup, self.places)
+
+        console.print(places_table(self.places.places(), channels_by_id))
+        console.print()
+
+        self.selector = candidate_selector(self.production, slack_config)
+
+        await self.sender.call(
+            "chat_postMessage",
+            channel=slack_admin_channel_id,
+            text=curtain_up_message(self.production),
+        )
+
+        self.channel_directory.start_refresh()
+        self.admin_digest.start()
+
+        console.print("Starting the show. Listening for events...")
+        for client in self.socket_mode_clients:
+            client.socket_mode_request_listeners.append(self.process)
+            await client.connect()
+        log.info("Connected to Slack with %s connections.", connection_count)
+
+    async def process(
+        self, client: AsyncSocketModeClient, req: SocketModeRequest
+    ) -> None:
+
+        if req.type != "events_api":
+            return
+
+        event = req.payload["event"]
+
+        await client.send_socket_mode_response(
+            SocketModeResponse(envelope_id=req.envelope_id)
+        )
+
+        if self.dedup.seen(event_keys(req.payload, event)):
+            log.info(
+                "Dropping duplicate %s event (retry %s)",
+                event.get("type"),
+                req.retry_attempt,
+            )
+            return
+
+        if event.get("type") not in ["message", "app_mention"]:
+            self.channel_directory.apply_event(event)
+            return
+
+        speaker_id = event.get("user")
+        if speaker_id == self.user_id:
+            return
+
+        text = event.get("text")
+        channel_id = event.get("channel")
+        self.console.print(f"{speaker_id} in {channel_id} said something")
+
+        character = self.places.get(channel_id)
+        if self.channel_directory.get(channel_id) is None or character is None:
+            log.info("No handler for channel id %s", channel_id)
+            return
+
+        priority = event_priority(event)
+        outcome = self.admission.admit(
+            channel_id,
+            priority,
+            handle_utterance,
+            self.sender,
+            self.admin_digest,
+            character,
+            channel_id,
+            speaker_id,
+            text,
+            self.stream_update_seconds,
+            self.selector,
+        )
+
+        if (
+            outcome == admission_shed
+            and priority == high_priority
+            and self.busy_reply is not None
+        ):
+            await self.sender.call(
+                "chat_postMessage",
+                channel=channel_id,
+                thread_ts=event.get("ts"),
+                text=self.busy_reply,
+            )
+
+    async def shutdown(self) -> None:
+
+        await self.sender.call(
+            "chat_postMessage",
+            channel=self.admin.channel_id,
+            text=curtain_down_message,
+        )
+
+        for client in self.socket_mode_clients:
+            client.socket_mode_request_listeners.remove(self.process)
+        await self.dispatcher.join()
+        self.selector.shutdown()
+        await self.admin_digest.stop()
+        self.channel_directory.stop()
+        self.directory_sender.shutdown()
+        for client in self.socket_mode_clients:
+            await client.close()
+        self.console.print("Disconnected from Slack.")
+
+        log.info(
+            "Duplicate events dropped: %s of %s",
+            self.dedup.hits,
+            self.dedup.hits + self.dedup.misses,
+        )
+        log_speculation_stats(self.places.places())
+
+        self.production.curtain()
+
+        self.console.print("Handlers stopped.")
+
+    async def run_forever(self) -> None:
+
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await asyncio.shield(self.shutdown())
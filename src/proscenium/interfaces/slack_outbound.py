@@ -0,0 +1,319 @@
+from typing import Any
+from typing import Optional
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from urllib.error import URLError
+
+from slack_sdk.web import WebClient
+from slack_sdk.errors import SlackApiError
+
+from proscenium.interfaces.dispatch import ChannelDispatcher
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+# Requests per minute, from https://api.slack.com/apis/rate-limits
+tier_1 = 1
+tier_2 = 20
+tier_3 = 50
+tier_4 = 100
+
+default_rates_per_minute = {
+    # chat.postMessage is limited to about one message per second per channel
+    "chat_postMessage": 60,
+    "chat_update": tier_3,
+    "chat_getPermalink": tier_4,
+    "conversations_info": tier_3,
+    "users_conversations": tier_3,
+}
+
+# Methods whose limit applies to each channel separately
+per_channel_methods = ["chat_postMessage"]
+
+default_outbound_workers = 4
+default_outbound_queue_depth = 1000
+default_max_retries = 3
+default_backoff_seconds = 1.0
+
+
+class TokenBucket:
+    """
+    Admits `per_minute` calls per minute, with bursts of up to `burst`.
+
+    Callers reserve a token up front and then sleep until it is theirs,
+    so waiting callers are served in the order they arrived.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[int] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, int(per_minute) // 20)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token. Returns the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+            self._tokens -= 1
+            # _updated is in the future while the bucket is paused
+            wait = max(0.0, self._updated - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return wait
+
+    def acquire(self) -> float:
+        """Block until a call is allowed. Returns the seconds waited."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Admit nothing for `seconds`, as after a `Retry-After` response."""
+        with self._lock:
+            self._tokens = min(self._tokens, 1.0)
+            self._updated = max(self._updated, time.monotonic() + seconds)
+
+
+class TokenBuckets:
+    """
+    One `TokenBucket` per Web API method, or per method and channel
+    for `per_channel_methods`, created on first use.
+    """
+
+    def __init__(self, rates_per_minute: Optional[dict[str, float]] = None):
+        self.rates_per_minute = {
+            **default_rates_per_minute,
+            **(rates_per_minute or {}),
+        }
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, method: str, channel: Optional[str]) -> TokenBucket:
+
+        key = method
+        if method in per_channel_methods and channel is not None:
+            key = f"{method}:{channel}"
+
+        with self._lock:
+            bucket = self._buckets.get(key, None)
+            if bucket is None:
+                bucket = TokenBucket(self.rates_per_minute.get(method, tier_3))
+                self._buckets[key] = bucket
+            return bucket
+
+
+def retry_after_seconds(error: SlackApiError) -> Optional[float]:
+    """The `Retry-After` of a rate limited response, or None otherwise."""
+
+    response = error.response
+    if response is None or response.status_code != 429:
+        return None
+    retry_after = response.headers.get(
+        "Retry-After", response.headers.get("retry-after")
+    )
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return default_backoff_seconds
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, SlackApiError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (URLError, ConnectionError, TimeoutError))
+
+
+class SlackSender:
+    """
+    Sends Slack Web API calls from a pool of worker threads.
+
+    Each call waits on a token bucket for its method (and, for
+    `chat_postMessage`, its channel), honors `Retry-After` on rate limited
+    responses, and retries transient failures with jittered exponential
+    backoff. Calls to the same channel are sent in the order they were made.
+    """
+
+    def __init__(
+        self,
+        web_client: WebClient,
+        workers: int = default_outbound_workers,
+        queue_depth: int = default_outbound_queue_depth,
+        max_retries: int = default_max_retries,
+        backoff_seconds: float = default_backoff_seconds,
+        rates_per_minute: Optional[dict[str, float]] = None,
+    ):
+        self.web_client = web_client
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.buckets = TokenBuckets(rates_per_minute)
+
+        self.dispatcher = ChannelDispatcher(workers=workers, queue_depth=queue_depth)
+
+    def bucket(self, method: str, channel: Optional[str]) -> TokenBucket:
+        return self.buckets.get(method, channel)
+
+    def send(self, method: str, **kwargs: Any) -> Future:
+        """
+        Queue a call to the `WebClient` method `method`, eg `chat_postMessage`.
+        The returned future resolves to the `SlackResponse`.
+        """
+
+        future = Future()
+        channel = kwargs.get("channel", None)
+
+        if not self.dispatcher.submit(
+            channel or method, self._call, future, method, kwargs
+        ):
+            # The queue is full. Push back on the caller by sending inline.
+            self._call(future, method, kwargs)
+
+        return future
+
+    def call(self, method: str, **kwargs: Any) -> Any:
+        """Send a call with the same rate limiting and retries, and wait for it."""
+        return self.send(method, **kwargs).result()
+
+    def _call(self, future: Future, method: str, kwargs: dict) -> None:
+
+        if not future.set_running_or_notify_cancel():
+            return
+
+        bucket = self.bucket(method, kwargs.get("channel", None))
+        attempt = 0
+
+        while True:
+            bucket.acquire()
+            try:
+                response = getattr(self.web_client, method)(**kwargs)
+                future.set_result(response)
+                return
+            except Exception as e:
+                retry_after = None
+                if isinstance(e, SlackApiError):
+                    retry_after = retry_after_seconds(e)
+
+                if attempt >= self.max_retries or (
+                    retry_after is None and not is_transient(e)
+                ):
+                    log.error(
+                        "Slack %s failed after %s attempts: %s", method, attempt + 1, e
+                    )
+                    future.set_exception(e)
+                    return
+
+                if retry_after is not None:
+                    # The paused bucket holds the next attempt back until
+                    # Retry-After has passed. The jitter spreads out callers.
+                    bucket.pause(retry_after)
+                    delay = random.uniform(0, self.backoff_seconds)
+                else:
+                    delay = self.backoff_seconds * (2**attempt)
+                    delay = random.uniform(delay / 2, delay)
+
+                attempt += 1
+                log.warning(
+                    "Slack %s failed (%s). Retry %s in %.2f seconds",
+                    method,
+                    e,
+                    attempt,
+                    delay,
+                )
+                time.sleep(delay)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued calls, and any calls they chain, to be sent."""
+        return self.dispatcher.join(timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.dispatcher.shutdown(wait=wait)
+
+
+default_digest_interval_seconds = 60.0
+default_digest_max_batch = 20
+
+
+def digest_text(links: list[tuple[str, str]]) -> str:
+    lines = [f"<#{channel_id}> {permalink}" for channel_id, permalink in links]
+    return f"{len(links)} response(s):\n" + "\n".join(lines)
+
+
+class AdminDigest:
+    """
+    Collects permalinks to responses and posts them to the admin channel
+    as one digest message, every `interval_seconds` or whenever
+    `max_batch` permalinks have accumulated, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        sender: SlackSender,
+        admin_channel_id: str,
+        interval_seconds: Optional[float] = default_digest_interval_seconds,
+        max_batch: int = default_digest_max_batch,
+    ):
+        self.sender = sender
+        self.admin_channel_id = admin_channel_id
+        self.interval_seconds = interval_seconds
+        self.max_batch = max_batch
+
+        self._lock = threading.Lock()
+        self._links: list[tuple[str, str]] = []
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def add(self, channel_id: str, permalink: str) -> None:
+        with self._lock:
+            self._links.append((channel_id, permalink))
+            full = len(self._links) >= self.max_batch
+        if full:
+            self.flush()
+
+    def flush(self) -> Optional[Future]:
+
+        with self._lock:
+            links = self._links
+            self._links = []
+
+        if len(links) == 0:
+            return None
+
+        text = digest_text(links)
+
+        log.info("Posting admin digest of %s responses", len(links))
+
+        return self.sender.send(
+            "chat_postMessage", channel=self.admin_channel_id, text=text
+        )
+
+    def start(self) -> None:
+
+        if self.interval_seconds is None or self._flusher is not None:
+            return
+
+        def flush_periodically():
+            while not self._stop.wait(self.interval_seconds):
+                self.flush()
+
+        self._flusher = threading.Thread(
+            target=flush_periodically, name="proscenium-admin-digest", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
@@ -0,0 +1,358 @@
+"""
+Per-model inference metrics in the Prometheus text format.
+
+`MetricsSubscriber` turns `proscenium.tracing` spans into request counts,
+error counts, latency histograms and token counts, labelled by model id and
+call site (`complete_simple`, `complete_for_tool_applications`,
+`complete_with_tool_results`), plus latency histograms for every span.
+The model id is the model that served the call, which may be a
+`proscenium.failover` fallback rather than the one requested.
+
+Counts kept elsewhere, such as the Slack duplicate event and speculation
+counts, are exported with `MetricsRegistry.callback_counter`, which reads
+them when the registry is scraped.
+
+`MetricsServer` serves the registry on a local `/metrics` endpoint.
+`proscenium-bot` starts both from the `metrics` configuration section.
+"""
+
+from typing import Callable
+from typing import Optional
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from proscenium.tracing import Span
+from proscenium.tracing import Subscriber
+from proscenium.tracing import add_subscriber
+from proscenium.tracing import completion_span
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_metrics_host = "127.0.0.1"
+default_metrics_port = 9464
+
+default_latency_buckets = [
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+]
+
+
+def _labels_text(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if len(names) == 0:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = (
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = _labels_text(self.label_names, label_values)
+                lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+class CallbackCounter:
+    """A counter whose values, by label values, are read from `collect`."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...],
+        collect: Callable[[], dict[tuple[str, ...], float]],
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.collect = collect
+
+    def value(self, *label_values: str) -> float:
+        return self.collect().get(label_values, 0.0)
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        try:
+            values = self.collect()
+        except Exception:
+            log.exception("Collecting %s failed", self.name)
+            return lines
+        for label_values, value in sorted(values.items()):
+            labels = _labels_text(self.label_names, label_values)
+            lines.append(f"{self.name}{labels} {float(value)}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...] = (),
+        buckets: Optional[list[float]] = None,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = sorted(buckets or default_latency_buckets)
+        # Per label values: counts per bucket, sum, count
+        self._values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            counts, total, count = self._values.get(
+                label_values, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[label_values] = (counts, total + value, count + 1)
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            return self._values.get(label_values, ([], 0.0, 0))[2]
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _labels_text(names, label_values + (str(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _labels_text(names, label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _labels_text(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(
+        self, name: str, help: str, label_names: tuple[str, ...] = ()
+    ) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help, label_names)
+            return self._metrics[name]
+
+    def callback_counter(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...],
+        collect: Callable[[], dict[tuple[str, ...], float]],
+    ) -> CallbackCounter:
+        """
+        A counter read from `collect` at each scrape. Registering the name
+        again replaces the earlier callback.
+        """
+        with self._lock:
+            self._metrics[name] = CallbackCounter(name, help, label_names, collect)
+            return self._metrics[name]
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...] = (),
+        buckets: Optional[list[float]] = None,
+    ) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help, label_names, buckets)
+            return self._metrics[name]
+
+    def exposition(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsSubscriber(Subscriber):
+    """Records spans into `registry`."""
+
+    def __init__(self, registry: "MetricsRegistry"):
+
+        labels = ("model_id", "call_site")
+
+        self.requests = registry.counter(
+            "proscenium_completion_requests_total", "Completion requests", labels
+        )
+        self.errors = registry.counter(
+            "proscenium_completion_errors_total", "Failed completion requests", labels
+        )
+        self.cache_hits = registry.counter(
+            "proscenium_completion_cache_hits_total",
+            "Completions answered from the response cache",
+            labels,
+        )
+        self.latency = registry.histogram(
+            "proscenium_completion_latency_seconds", "Completion latency", labels
+        )
+        self.prompt_tokens = registry.counter(
+            "proscenium_completion_prompt_tokens_total", "Prompt tokens sent", labels
+        )
+        self.cached_prompt_tokens = registry.counter(
+            "proscenium_completion_cached_prompt_tokens_total",
+            "Prompt tokens read from the provider's prompt cache",
+            labels,
+        )
+        self.completion_tokens = registry.counter(
+            "proscenium_completion_tokens_total", "Completion tokens received", labels
+        )
+        self.spans = registry.histogram(
+            "proscenium_span_seconds", "Duration of traced spans", ("span",)
+        )
+
+    def span_ended(self, span: Span) -> None:
+
+        self.spans.observe(span.duration_seconds, span.name)
+
+        if span.name != completion_span:
+            return
+
+        attributes = span.attributes
+        labels = (
+            attributes.get("served_model_id", attributes.get("model_id", "unknown")),
+            attributes.get("call_site", "unknown"),
+        )
+
+        self.requests.inc(*labels)
+        if span.error is not None:
+            self.errors.inc(*labels)
+            return
+        if attributes.get("cached", False):
+            self.cache_hits.inc(*labels)
+            return
+
+        self.latency.observe(span.duration_seconds, *labels)
+        self.prompt_tokens.inc(*labels, amount=attributes.get("input_tokens", 0))
+        self.completion_tokens.inc(*labels, amount=attributes.get("output_tokens", 0))
+        self.cached_prompt_tokens.inc(
+            *labels, amount=attributes.get("cached_tokens", 0)
+        )
+
+
+class MetricsServer:
+    """Serves `registry` at http://host:port/metrics from a daemon thread."""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        host: str = default_metrics_host,
+        port: int = default_metrics_port,
+    ):
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.exposition().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug(format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="proscenium-metrics", daemon=True
+        )
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+        log.info("Serving metrics at http://%s:%s/metrics", *self.server.server_address)
+
+    def shutdown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+_default_registry = MetricsRegistry()
+
+
+def default_metrics_registry() -> MetricsRegistry:
+    return _default_registry
+
+
+def start_metrics(metrics_config: dict) -> Optional[MetricsServer]:
+    """
+    Records spans into the default registry and serves it, as the
+    `metrics` configuration section asks, or returns None unless it sets
+    `enabled: true`. If the port cannot be bound, eg because another bot
+    on the host is using it, a warning is logged and None is returned.
+    """
+
+    if not metrics_config.get("enabled", False):
+        return None
+
+    host = metrics_config.get("host", default_metrics_host)
+    port = metrics_config.get("port", default_metrics_port)
+    try:
+        server = MetricsServer(_default_registry, host=host, port=port)
+    except OSError as e:
+        log.warning("Not serving metrics: cannot listen on %s:%s (%s)", host, port, e)
+        return None
+
+    add_subscriber(MetricsSubscriber(_default_registry))
+    server.start()
+    return server
@@ -1,4 +1,8 @@
 from typing import List, Dict
+from typing import Generator
+from typing import Optional
+from typing import Sequence
+from typing import Union
 
 import logging
 from rich.table import Table
@@ -6,7 +10,17 @@ from rich.table import Table
 from pymilvus import MilvusClient
 from pymilvus import model
 
+from aisuite import Client as AISuiteClient
+
+from proscenium.answer_cache import SemanticAnswerCache
+from proscenium.answer_cache import resolve_answer_cache
 from proscenium.complete import complete_simple
+from proscenium.complete import complete_simple_stream
+from proscenium.tokens import ApproximateTokenizer
+from proscenium.tokens import Tokenizer
+from proscenium.tokens import default_token_accounting
+from proscenium.tracing import retrieval_span
+from proscenium.tracing import span
 
 log = logging.getLogger(__name__)
 
@@ -25,16 +39,56 @@ Answer:
 """
 
 
-def rag_prompt(chunks: List[Dict], query: str) -> str:
+def rag_prompt(
+    chunks: List[Dict],
+    query: str,
+    max_tokens: Optional[int] = None,
+    tokenizer: Optional[Tokenizer] = None,
+) -> str:
+    """
+    The prompt for `query` with as many of `chunks` as fit in `max_tokens`.
+    Chunks are given most similar first, so the least similar are dropped
+    first; if even the first does not fit, it is truncated.
+    """
+
+    texts = [f"CHUNK {chunk['id']}. {chunk['entity']['text']}" for chunk in chunks]
 
-    context = "\n\n".join(
-        [
-            f"CHUNK {chunk['id']}. {chunk['entity']['text']}"
-            for i, chunk in enumerate(chunks)
-        ]
+    if max_tokens is None:
+        return rag_prompt_template.format(context="\n\n".join(texts), query=query)
+
+    tokenizer = tokenizer or ApproximateTokenizer()
+    available = max_tokens - tokenizer.count(
+        rag_prompt_template.format(context="", query=query)
     )
 
-    return rag_prompt_template.format(context=context, query=query)
+    kept = []
+    for text in texts:
+        tokens = tokenizer.count(text + "\n\n")
+        if tokens > available:
+            if len(kept) == 0 and available > 0:
+                kept.append(tokenizer.truncate(text, available))
+            break
+        kept.append(text)
+        available -= tokens
+
+    if len(kept) < len(texts):
+        log.info(
+            "Kept %s of %s chunks within %s tokens", len(kept), len(texts), max_tokens
+        )
+
+    return rag_prompt_template.format(context="\n\n".join(kept), query=query)
+
+
+def budgeted_rag_prompt(chunks: List[Dict], query: str, model_id: str) -> str:
+    """`rag_prompt` within what the token budget of `model_id` allows."""
+
+    accounting = default_token_accounting()
+    return rag_prompt(
+        chunks,
+        query,
+        accounting.prompt_budget(model_id, rag_system_prompt),
+        accounting.tokenizer(model_id),
+    )
 
 
 def closest_chunks(
@@ -43,20 +97,31 @@ def closest_chunks(
     query: str,
     collection_name: str,
     k: int = 4,
+    query_vector: Optional[Sequence[float]] = None,
 ) -> List[Dict]:
+    """
+    The `k` chunks closest to `query`. Pass `query_vector` if the query
+    has already been embedded with `embedding_fn`.
+    """
 
-    client.load_collection(collection_name)
+    with span(retrieval_span, collection_name=collection_name, k=k) as s:
 
-    result = client.search(
-        collection_name=collection_name,
-        data=embedding_fn.encode_queries([query]),
-        anns_field="vector",
-        search_params={"metric": "IP", "offset": 0},
-        output_fields=["text"],
-        limit=k,
-    )
+        client.load_collection(collection_name)
 
-    hits = result[0]
+        if query_vector is None:
+            query_vector = embedding_fn.encode_queries([query])[0]
+
+        result = client.search(
+            collection_name=collection_name,
+            data=[query_vector],
+            anns_field="vector",
+            search_params={"metric": "IP", "offset": 0},
+            output_fields=["text"],
+            limit=k,
+        )
+
+        hits = result[0]
+        s.set(chunks=hits, hits=len(hits))
 
     return hits
 
@@ -78,15 +143,90 @@ def answer_question(
     vector_db_client: MilvusClient,
     embedding_fn: model.dense.SentenceTransformerEmbeddingFunction,
     collection_name: str,
+    chat_completion_client: Optional[AISuiteClient] = None,
+    answer_cache: Union[SemanticAnswerCache, bool, None] = None,
 ) -> str:
-
-    chunks = closest_chunks(vector_db_client, embedding_fn, query, collection_name)
+    """
+    Answers `query` from the closest chunks in `collection_name`. With an
+    `answer_cache` (see `proscenium.answer_cache`; False opts out of the
+    default), a question similar enough to one already answered gets the
+    same answer without retrieval or generation.
+    """
+
+    answer_cache = resolve_answer_cache(answer_cache)
+    query_vector = None
+    if answer_cache is not None:
+        query_vector = embedding_fn.encode_queries([query])[0]
+        answer = answer_cache.get(collection_name, model_id, query_vector)
+        if answer is not None:
+            return answer
+
+    chunks = closest_chunks(
+        vector_db_client,
+        embedding_fn,
+        query,
+        collection_name,
+        query_vector=query_vector,
+    )
     log.info("Found %s closest chunks", len(chunks))
-    log.info(chunk_hits_table(chunks))
 
-    prompt = rag_prompt(chunks, query)
+    prompt = budgeted_rag_prompt(chunks, query, model_id)
     log.info("RAG prompt created. Calling inference at %s", model_id)
 
-    answer = complete_simple(model_id, rag_system_prompt, prompt)
+    answer = complete_simple(
+        chat_completion_client, model_id, rag_system_prompt, prompt
+    )
+
+    if answer_cache is not None:
+        answer_cache.put(collection_name, model_id, query, query_vector, answer)
 
     return answer
+
+
+def answer_question_stream(
+    query: str,
+    model_id: str,
+    vector_db_client: MilvusClient,
+    embedding_fn: model.dense.SentenceTransformerEmbeddingFunction,
+    collection_name: str,
+    chat_completion_client: Optional[AISuiteClient] = None,
+    answer_cache: Union[SemanticAnswerCache, bool, None] = None,
+) -> Generator[str, None, None]:
+    """
+    Like `answer_question`, but yields the answer in pieces as it is
+    generated. A cached answer is yielded whole; a streamed answer is
+    cached once it is complete.
+    """
+
+    answer_cache = resolve_answer_cache(answer_cache)
+    query_vector = None
+    if answer_cache is not None:
+        query_vector = embedding_fn.encode_queries([query])[0]
+        answer = answer_cache.get(collection_name, model_id, query_vector)
+        if answer is not None:
+            yield answer
+            return
+
+    chunks = closest_chunks(
+        vector_db_client,
+        embedding_fn,
+        query,
+        collection_name,
+        query_vector=query_vector,
+    )
+    log.info("Found %s closest chunks", len(chunks))
+
+    prompt = budgeted_rag_prompt(chunks, query, model_id)
+    log.info("RAG prompt created. Streaming inference at %s", model_id)
+
+    pieces = []
+    for piece in complete_simple_stream(
+        chat_completion_client, model_id, rag_system_prompt, prompt
+    ):
+        pieces.append(piece)
+        yield piece
+
+    if answer_cache is not None:
+        answer_cache.put(
+            collection_name, model_id, query, query_vector, "".join(pieces)
+        )
@@ -0,0 +1,319 @@
+from typing import Optional
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+
+from aisuite import Client as AISuiteClient
+
+from proscenium import Character
+from proscenium import WantsToHandleBatchResponse
+from proscenium import control_flow_system_prompt
+from proscenium.complete import complete_simple
+
+log = logging.getLogger(__name__)
+
+batch_wants_to_handle_template = """\
+The text below is a user-posted message to a chat channel.
+For each of the AI assistants listed below, determine if that assistant,
+given its description, would be able to handle the message.
+More than one assistant, or none, may want to handle it.
+State a boolean value for each assistant, using its name exactly as listed,
+expressed in the specified JSON response format.
+Only answer in JSON.
+
+The assistants are:
+
+{characters}
+
+The user-posted message is:
+
+{text}
+"""
+
+
+def character_labels(characters: list[Character]) -> list[str]:
+    """
+    The names the characters are listed under. Several instances of one
+    Character class are told apart by number, eg "Poet" and "Poet #2".
+    """
+
+    counts = {}
+    labels = []
+    for character in characters:
+        name = character.name()
+        counts[name] = counts.get(name, 0) + 1
+        labels.append(name if counts[name] == 1 else f"{name} #{counts[name]}")
+    return labels
+
+
+def characters_list(characters: list[Character]) -> str:
+    return "\n".join(
+        [
+            f"- {label}: {' '.join(character.description().split())}"
+            for label, character in zip(character_labels(characters), characters)
+        ]
+    )
+
+
+class BatchRouter:
+    """
+    Decides which of several candidate `Character`s want an utterance with
+    one structured output call to `control_flow_model`, rather than one
+    `wants_to_handle` call per character. Without a `chat_completion_client`
+    the provider's shared client is used.
+
+    Characters whose pre-routers or routing cache already know the answer
+    are left out of the call, and the batch decisions are added to each
+    character's routing cache. A lone undecided character is asked through
+    its own `wants_to_handle`, as is every character if the batch answer
+    cannot be parsed.
+    """
+
+    def __init__(
+        self,
+        chat_completion_client: Optional[AISuiteClient],
+        control_flow_model: str,
+    ):
+        self.chat_completion_client = chat_completion_client
+        self.control_flow_model = control_flow_model
+
+    def batch_decisions(
+        self, characters: list[Character], utterance: str
+    ) -> Optional[list[Optional[bool]]]:
+        """
+        The decision for each of `characters` from one LLM call, None for
+        any the response left out, or None if the response could not be used.
+        """
+
+        response = complete_simple(
+            self.chat_completion_client,
+            self.control_flow_model,
+            control_flow_system_prompt,
+            batch_wants_to_handle_template.format(
+                characters=characters_list(characters), text=utterance
+            ),
+            temperature=0,
+            response_format={
+                "type": "json_object",
+                "schema": WantsToHandleBatchResponse.model_json_schema(),
+            },
+        )
+
+        try:
+            result = WantsToHandleBatchResponse(**json.loads(response))
+        except Exception as e:
+            log.error("Batch routing response not understood: %s", e)
+            return None
+
+        by_label = {d.character: d.wants_to_handle for d in result.decisions}
+        log.info("Batch routing decisions: %s", by_label)
+        return [by_label.get(label, None) for label in character_labels(characters)]
+
+    def route(
+        self,
+        characters: list[Character],
+        channel_id: str,
+        speaker_id: str,
+        utterance: str,
+    ) -> list[Character]:
+        """The candidates that want to handle `utterance`, in their given order."""
+
+        decided = {}
+        undecided = []
+        for character in characters:
+            decision = character.quick_decision(utterance)
+            if decision is None:
+                undecided.append(character)
+            else:
+                decided[character] = decision
+
+        batch = None
+        if len(undecided) > 1:
+            batch = self.batch_decisions(undecided, utterance)
+
+        for i, character in enumerate(undecided):
+            if batch is not None and batch[i] is not None:
+                decided[character] = batch[i]
+                character.routing_cache.put(
+                    character.routing_key(utterance), decided[character]
+                )
+            else:
+                decided[character] = character.decide_to_handle(
+                    channel_id, speaker_id, utterance
+                )
+
+        return [character for character in characters if decided[character]]
+
+
+default_candidate_deadline_seconds = 10.0
+default_candidate_workers = 16
+
+# Which of several accepting candidates gets the utterance
+select_first = "first"  # the first to accept
+select_best = "best"  # the earliest listed of those that accept by the deadline
+
+
+class CandidateSelector:
+    """
+    Chooses which of the characters placed in one channel handles an
+    utterance, asking all undecided candidates at once so that adding
+    characters does not add their `wants_to_handle` latencies together.
+
+    With a `router`, one batched call decides for all candidates. Otherwise
+    each candidate's `wants_to_handle` runs in its own worker thread, and
+    candidates still deciding after `deadline_seconds` are passed over.
+    """
+
+    def __init__(
+        self,
+        router: Optional[BatchRouter] = None,
+        deadline_seconds: float = default_candidate_deadline_seconds,
+        selection: str = select_first,
+        workers: int = default_candidate_workers,
+    ):
+        if selection not in [select_first, select_best]:
+            raise ValueError(f"Unknown candidate selection {selection}")
+
+        self.router = router
+        self.deadline_seconds = deadline_seconds
+        self.selection = selection
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="proscenium-candidate"
+        )
+
+    def _quick_decisions(
+        self, characters: list[Character], utterance: str
+    ) -> tuple[Optional[Character], dict[Character, bool], list[Character]]:
+        """
+        The winner if quick decisions already settle it, the quick decisions,
+        and the candidates that still need to be asked.
+        """
+
+        decisions = {}
+        to_ask = []
+        for character in characters:
+            decision = character.quick_decision(utterance)
+            if decision:
+                # Anything listed later cannot beat this one
+                if self.selection == select_first or len(to_ask) == 0:
+                    return character, decisions, []
+                decisions[character] = True
+                return None, decisions, to_ask
+            if decision is None:
+                to_ask.append(character)
+            else:
+                decisions[character] = False
+
+        return None, decisions, to_ask
+
+    def _chosen(
+        self, characters: list[Character], decisions: dict[Character, bool]
+    ) -> Optional[Character]:
+        for character in characters:
+            if decisions.get(character, False):
+                return character
+        return None
+
+    def select(
+        self,
+        characters: list[Character],
+        channel_id: str,
+        speaker_id: str,
+        utterance: str,
+    ) -> Optional[Character]:
+
+        if self.router is not None:
+            chosen = self.router.route(characters, channel_id, speaker_id, utterance)
+            return chosen[0] if len(chosen) > 0 else None
+
+        chosen, decisions, to_ask = self._quick_decisions(characters, utterance)
+        if chosen is not None or len(to_ask) == 0:
+            return chosen or self._chosen(characters, decisions)
+
+        futures = {
+            self.executor.submit(
+                character.ask_wants_to_handle, channel_id, speaker_id, utterance
+            ): character
+            for character in to_ask
+        }
+
+        try:
+            for future in as_completed(futures, timeout=self.deadline_seconds):
+                character = futures[future]
+                try:
+                    decisions[character] = future.result()
+                except Exception as e:
+                    log.error("%s wants_to_handle failed: %s", character.name(), e)
+                    decisions[character] = False
+                if decisions[character] and self.selection == select_first:
+                    return character
+        except TimeoutError:
+            late = [c.name() for c in to_ask if c not in decisions]
+            log.warning("Candidates %s passed over at the deadline", late)
+
+        return self._chosen(characters, decisions)
+
+    async def aselect(
+        self,
+        characters: list[Character],
+        channel_id: str,
+        speaker_id: str,
+        utterance: str,
+    ) -> Optional[Character]:
+        """Async variant of `select`, with candidates decided as tasks."""
+
+        if self.router is not None:
+            chosen = await asyncio.to_thread(
+                self.router.route, characters, channel_id, speaker_id, utterance
+            )
+            return chosen[0] if len(chosen) > 0 else None
+
+        chosen, decisions, to_ask = self._quick_decisions(characters, utterance)
+        if chosen is not None or len(to_ask) == 0:
+            return chosen or self._chosen(characters, decisions)
+
+        tasks = {
+            asyncio.create_task(
+                character.aask_wants_to_handle(channel_id, speaker_id, utterance)
+            ): character
+            for character in to_ask
+        }
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline_seconds
+        pending = set(tasks)
+        try:
+            while len(pending) > 0:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if len(done) == 0:
+                    late = [tasks[task].name() for task in pending]
+                    log.warning("Candidates %s passed over at the deadline", late)
+                    break
+                for task in done:
+                    character = tasks[task]
+                    if task.exception() is not None:
+                        log.error(
+                            "%s wants_to_handle failed: %s",
+                            character.name(),
+                            task.exception(),
+                        )
+                        decisions[character] = False
+                    else:
+                        decisions[character] = task.result()
+                    if decisions[character] and self.selection == select_first:
+                        return character
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return self._chosen(characters, decisions)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
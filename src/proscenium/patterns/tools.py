@@ -1,5 +1,6 @@
 from typing import Optional
 from typing import Any
+import asyncio
 import logging
 import json
 
@@ -14,7 +15,17 @@ from aisuite.framework.message import ChatCompletionMessageToolCall
 
 from gofannon.base import BaseTool
 
+from proscenium.clients import resolve_client
+from proscenium.concurrency import default_limiter
 from proscenium.history import messages_table
+from proscenium.prompt_cache import cacheable_prefix
+from proscenium.tokens import default_token_accounting
+from proscenium.tracing import Span
+from proscenium.tracing import completion_span
+from proscenium.tracing import event
+from proscenium.tracing import span
+from proscenium.tracing import tool_evaluation_span
+from proscenium.tracing_console import ensure_console_subscriber
 
 log = logging.getLogger(__name__)
 
@@ -27,7 +38,9 @@ def evaluate_tool_call(tool_map: dict, tool_call: ChatCompletionMessageToolCall)
 
     log.info(f"Evaluating tool call: {function_name} with args {function_args}")
 
-    function_response = tool_map[function_name](**function_args)
+    with span(tool_evaluation_span, tool=function_name, args=function_args) as s:
+        function_response = tool_map[function_name](**function_args)
+        s.set(result=function_response)
 
     log.info(f"   Response: {function_response}")
 
@@ -64,7 +77,7 @@ def evaluate_tool_calls(tool_call_message, tool_map: dict) -> list[dict]:
 
 
 def complete_for_tool_applications(
-    chat_completion_client: AISuiteClient,
+    chat_completion_client: Optional[AISuiteClient],
     model_id: str,
     messages: list,
     tool_desc_list: list,
@@ -72,28 +85,66 @@ def complete_for_tool_applications(
     console: Optional[Console] = None,
 ):
 
-    if console is not None:
-        panel = complete_with_tools_panel(
-            "complete for tool applications",
-            model_id,
-            tool_desc_list,
-            messages,
-            temperature,
+    with span(
+        completion_span,
+        call_site="complete_for_tool_applications",
+        model_id=model_id,
+    ) as s:
+
+        fitted, tokens = _traced_request(
+            s, model_id, messages, tool_desc_list, temperature, console
         )
-        console.print(panel)
 
-    response = chat_completion_client.chat.completions.create(
-        model=model_id,
-        messages=messages,
-        temperature=temperature,
-        tools=tool_desc_list,  # tool_choice="auto",
-    )
+        client = resolve_client(chat_completion_client, model_id)
+        fitted, request = cacheable_prefix(
+            model_id, fitted, {"temperature": temperature, "tools": tool_desc_list}
+        )
+        with default_limiter().limit(model_id):
+            response = client.chat.completions.create(
+                model=model_id, messages=fitted, **request  # tool_choice="auto",
+            )
+
+        default_token_accounting().record(model_id, *tokens, response=response)
+
+    return response
+
+
+async def acomplete_for_tool_applications(
+    chat_completion_client: Optional[AISuiteClient],
+    model_id: str,
+    messages: list,
+    tool_desc_list: list,
+    temperature: float,
+    console: Optional[Console] = None,
+):
+    """Async variant of `complete_for_tool_applications`."""
+
+    with span(
+        completion_span,
+        call_site="complete_for_tool_applications",
+        model_id=model_id,
+    ) as s:
+
+        fitted, tokens = _traced_request(
+            s, model_id, messages, tool_desc_list, temperature, console
+        )
+
+        client = resolve_client(chat_completion_client, model_id)
+        fitted, request = cacheable_prefix(
+            model_id, fitted, {"temperature": temperature, "tools": tool_desc_list}
+        )
+        async with default_limiter().alimit(model_id):
+            response = await client.chat.completions.acreate(
+                model=model_id, messages=fitted, **request
+            )
+
+        default_token_accounting().record(model_id, *tokens, response=response)
 
     return response
 
 
 def complete_with_tool_results(
-    chat_completion_client: AISuiteClient,
+    chat_completion_client: Optional[AISuiteClient],
     model_id: str,
     messages: list,
     tool_call_message: dict,
@@ -106,24 +157,101 @@ def complete_with_tool_results(
     messages.append(tool_call_message)
     messages.extend(tool_evaluation_messages)
 
-    if console is not None:
-        panel = complete_with_tools_panel(
-            "complete call with tool results",
-            model_id,
-            tool_desc_list,
-            messages,
-            temperature,
+    with span(
+        completion_span, call_site="complete_with_tool_results", model_id=model_id
+    ) as s:
+
+        fitted, tokens = _traced_request(
+            s, model_id, messages, tool_desc_list, temperature, console, False
         )
-        console.print(panel)
 
-    response = chat_completion_client.chat.completions.create(
-        model=model_id,
-        messages=messages,
-    )
+        client = resolve_client(chat_completion_client, model_id)
+        fitted, request = cacheable_prefix(model_id, fitted, {})
+        with default_limiter().limit(model_id):
+            response = client.chat.completions.create(
+                model=model_id, messages=fitted, **request
+            )
+
+        default_token_accounting().record(model_id, *tokens, response=response)
+
+        s.set(response=response.choices[0].message.content)
 
     return response.choices[0].message.content
 
 
+async def acomplete_with_tool_results(
+    chat_completion_client: Optional[AISuiteClient],
+    model_id: str,
+    messages: list,
+    tool_call_message: dict,
+    tool_evaluation_messages: list[dict],
+    tool_desc_list: list,
+    temperature: float,
+    console: Optional[Console] = None,
+):
+    """Async variant of `complete_with_tool_results`."""
+
+    messages.append(tool_call_message)
+    messages.extend(tool_evaluation_messages)
+
+    with span(
+        completion_span, call_site="complete_with_tool_results", model_id=model_id
+    ) as s:
+
+        fitted, tokens = _traced_request(
+            s, model_id, messages, tool_desc_list, temperature, console, False
+        )
+
+        client = resolve_client(chat_completion_client, model_id)
+        fitted, request = cacheable_prefix(model_id, fitted, {})
+        async with default_limiter().alimit(model_id):
+            response = await client.chat.completions.acreate(
+                model=model_id, messages=fitted, **request
+            )
+
+        default_token_accounting().record(model_id, *tokens, response=response)
+
+        s.set(response=response.choices[0].message.content)
+
+    return response.choices[0].message.content
+
+
+def _traced_request(
+    s: Span,
+    model_id: str,
+    messages: list,
+    tool_desc_list: list,
+    temperature: float,
+    console: Optional[Console],
+    sends_tools: bool = True,
+) -> tuple[list, tuple[int, int]]:
+    """
+    `messages` trimmed to the model's token budget, leaving room for the tool
+    descriptions if they are sent, and the input and trimmed token counts.
+    Records the request on span `s`.
+    """
+
+    accounting = default_token_accounting()
+    tool_tokens = 0
+    if sends_tools:
+        tool_tokens = accounting.count(model_id, json.dumps(tool_desc_list))
+    fitted, input_tokens, trimmed_tokens = accounting.fit_messages(
+        model_id, messages, reserved_tokens=tool_tokens
+    )
+
+    if console is not None:
+        ensure_console_subscriber()
+        s.set(console=console)
+    s.set(
+        messages=list(fitted),
+        tool_desc_list=tool_desc_list,
+        temperature=temperature,
+        input_tokens=input_tokens + tool_tokens,
+    )
+
+    return fitted, (input_tokens + tool_tokens, trimmed_tokens)
+
+
 def process_tools(tools: list[BaseTool]) -> tuple[dict, list]:
     applied_tools = [F() for F in tools]
     tool_map = {f.name: f.fn for f in applied_tools}
@@ -197,6 +325,7 @@ def apply_tools(
     tool_map: dict,
     temperature: float = 0.75,
     console: Optional[Console] = None,
+    chat_completion_client: Optional[AISuiteClient] = None,
 ) -> str:
 
     messages = [
@@ -205,42 +334,102 @@ def apply_tools(
     ]
 
     response = complete_for_tool_applications(
-        model_id, messages, tool_desc_list, temperature, console
+        chat_completion_client,
+        model_id,
+        messages,
+        tool_desc_list,
+        temperature,
+        console,
     )
 
     tool_call_message = response.choices[0].message
 
-    if tool_call_message.tool_calls is None or len(tool_call_message.tool_calls) == 0:
+    if not _applies_tools(tool_call_message, console):
+        return tool_call_message.content
 
-        if console is not None:
-            console.print(
-                Panel(
-                    Text(str(tool_call_message.content)),
-                    title="Tool Application Response",
-                )
-            )
+    tool_evaluation_messages = evaluate_tool_calls(tool_call_message, tool_map)
+
+    result = complete_with_tool_results(
+        chat_completion_client,
+        model_id,
+        messages,
+        tool_call_message,
+        tool_evaluation_messages,
+        tool_desc_list,
+        temperature,
+        console,
+    )
 
-        log.info("No tool applications detected")
+    return result
+
+
+async def aapply_tools(
+    model_id: str,
+    system_message: str,
+    message: str,
+    tool_desc_list: list,
+    tool_map: dict,
+    temperature: float = 0.75,
+    console: Optional[Console] = None,
+    chat_completion_client: Optional[AISuiteClient] = None,
+) -> str:
+    """
+    Async variant of `apply_tools`. The tools themselves are evaluated
+    in a worker thread.
+    """
+
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": message},
+    ]
+
+    response = await acomplete_for_tool_applications(
+        chat_completion_client,
+        model_id,
+        messages,
+        tool_desc_list,
+        temperature,
+        console,
+    )
 
+    tool_call_message = response.choices[0].message
+
+    if not _applies_tools(tool_call_message, console):
         return tool_call_message.content
 
-    else:
+    tool_evaluation_messages = await asyncio.to_thread(
+        evaluate_tool_calls, tool_call_message, tool_map
+    )
+
+    result = await acomplete_with_tool_results(
+        chat_completion_client,
+        model_id,
+        messages,
+        tool_call_message,
+        tool_evaluation_messages,
+        tool_desc_list,
+        temperature,
+        console,
+    )
 
-        if console is not None:
-            console.print(
-                Panel(Text(str(tool_call_message)), title="Tool Application Response")
-            )
+    return result
 
-        tool_evaluation_messages = evaluate_tool_calls(tool_call_message, tool_map)
 
-        result = complete_with_tool_results(
-            model_id,
-            messages,
-            tool_call_message,
-            tool_evaluation_messages,
-            tool_desc_list,
-            temperature,
-            console,
+def _applies_tools(tool_call_message, console: Optional[Console]) -> bool:
+
+    applies = not (
+        tool_call_message.tool_calls is None or len(tool_call_message.tool_calls) == 0
+    )
+
+    if console is not None:
+        event(
+            "tool_application_response",
+            console=console,
+            title="Tool Application Response",
+            panel=tool_call_message if applies else tool_call_message.content,
         )
 
-        return result
+    if not applies:
+        log.info("No tool applications detected")
+
+    return applies
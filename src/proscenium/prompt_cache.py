@@ -0,0 +1,120 @@
+"""
+Provider-side caching of static prompt prefixes.
+
+System prompts such as `control_flow_system_prompt` and `rag_system_prompt`,
+and the tool descriptions sent with them, are the same on every call.
+Providers that cache prompt prefixes can skip re-reading them, which cuts
+input latency and cost, provided the static portion comes first and, for
+some providers, is marked as cacheable:
+
+- Anthropic caches up to a `cache_control` breakpoint; the system prompt
+  is marked, which covers the tool descriptions that precede it.
+- OpenAI caches long prefixes automatically; a `prompt_cache_key` derived
+  from the static prefix routes calls that share it to the same cache.
+
+Proscenium's prompts put their variable text (the user's utterance, the
+retrieved chunks, tool results) after the system prompt, so the prefix is
+stable. Cached prompt tokens reported by the provider are counted by
+`proscenium.tokens.TokenAccounting`.
+
+`proscenium.bin.production_from_config` configures this from the
+`inference.prompt_caching` configuration section.
+"""
+
+from typing import Optional
+
+import hashlib
+import json
+import logging
+
+from proscenium.concurrency import provider_of
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+cache_control_providers = ["anthropic"]
+automatic_prefix_providers = ["openai"]
+
+default_prompt_caching_providers = cache_control_providers + automatic_prefix_providers
+
+
+class PromptCaching:
+
+    def __init__(self, providers: Optional[list[str]] = None, enabled: bool = True):
+        self.providers = (
+            default_prompt_caching_providers if providers is None else providers
+        )
+        self.enabled = enabled
+
+    def prepare(self, model_id: str, messages: list, kwargs: dict) -> tuple[list, dict]:
+        """
+        The messages and keyword arguments to send to `model_id`, with the
+        static prefix marked for its provider's prompt cache. The arguments
+        themselves are left unchanged.
+        """
+
+        provider = provider_of(model_id)
+        if not self.enabled or provider not in self.providers:
+            return messages, kwargs
+
+        if len(messages) == 0 or not isinstance(messages[0], dict):
+            return messages, kwargs
+        if messages[0].get("role", None) != "system":
+            return messages, kwargs
+
+        system_prompt = messages[0]["content"]
+        if not isinstance(system_prompt, str):
+            return messages, kwargs
+
+        if provider in cache_control_providers:
+            marked = {
+                **messages[0],
+                "content": [
+                    {
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+            }
+            return [marked] + list(messages[1:]), kwargs
+
+        if provider in automatic_prefix_providers and "prompt_cache_key" not in kwargs:
+            return messages, {
+                **kwargs,
+                "prompt_cache_key": prefix_key(system_prompt, kwargs.get("tools")),
+            }
+
+        return messages, kwargs
+
+
+def prefix_key(system_prompt: str, tools: Optional[list] = None) -> str:
+    text = json.dumps([tools or [], system_prompt], sort_keys=True, default=str)
+    return "proscenium-" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+_default_prompt_caching = PromptCaching()
+
+
+def set_default_prompt_caching(prompt_caching: PromptCaching) -> None:
+    global _default_prompt_caching
+    _default_prompt_caching = prompt_caching
+
+
+def default_prompt_caching() -> PromptCaching:
+    return _default_prompt_caching
+
+
+def cacheable_prefix(model_id: str, messages: list, kwargs: dict) -> tuple[list, dict]:
+    """`PromptCaching.prepare` with the default settings."""
+    return _default_prompt_caching.prepare(model_id, messages, kwargs)
+
+
+def prompt_caching_from_config(prompt_caching_config: dict) -> PromptCaching:
+    """Settings from the `inference.prompt_caching` configuration section."""
+
+    return PromptCaching(
+        providers=prompt_caching_config.get("providers", None),
+        enabled=prompt_caching_config.get("enabled", True),
+    )
@@ -0,0 +1,136 @@
+"""
+Provider batch endpoints for `proscenium.complete.complete_batch`.
+
+Some providers accept a file of chat completion requests and answer all of
+them asynchronously, typically within 24 hours and at a lower price. This
+suits evaluation and pre-warming runs that do not need answers right away.
+
+Only OpenAI's Batch API is supported so far. It is reached through an
+OpenAI SDK client built from the same provider settings as the `aisuite`
+client, which needs the optional `openai` package.
+"""
+
+from typing import Any
+from typing import Optional
+
+import io
+import json
+import logging
+import time
+
+from aisuite import Client as AISuiteClient
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_poll_seconds = 30.0
+default_batch_timeout_seconds = 86400.0
+
+batch_completion_window = "24h"
+
+
+def provider_batch_client(
+    chat_completion_client: AISuiteClient, model_id: str
+) -> Optional[Any]:
+    """
+    The provider SDK client to submit a batch of `model_id` requests to,
+    or None if its provider has no batch endpoint we support. The client
+    is configured like `chat_completion_client`'s provider.
+    """
+
+    if not model_id.startswith("openai:"):
+        return None
+
+    try:
+        import openai
+    except ImportError:
+        log.warning("Batches for %s need the openai package", model_id)
+        return None
+
+    provider_configs = getattr(chat_completion_client, "provider_configs", None)
+    config = (provider_configs or {}).get("openai", None) or {}
+    try:
+        return openai.OpenAI(**config)
+    except Exception as e:
+        log.warning("No batch endpoint for %s: %s", model_id, e)
+        return None
+
+
+def openai_batch(
+    sdk_client: Any,
+    model_id: str,
+    requests: dict[int, list[dict]],
+    poll_seconds: float = default_poll_seconds,
+    timeout_seconds: float = default_batch_timeout_seconds,
+    **kwargs,
+) -> dict[int, str]:
+    """
+    Submits the messages in `requests` as one OpenAI batch and waits for it.
+    Returns the response text by request index. Requests that the batch did
+    not answer are missing from the result.
+    """
+
+    model_name = model_id.split(":", 1)[1]
+
+    lines = [
+        json.dumps(
+            {
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": model_name, "messages": messages, **kwargs},
+            }
+        )
+        for index, messages in requests.items()
+    ]
+
+    input_file = sdk_client.files.create(
+        file=("batch.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))),
+        purpose="batch",
+    )
+    batch = sdk_client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=batch_completion_window,
+    )
+    log.info("Submitted batch %s of %s requests to %s", batch.id, len(lines), model_id)
+
+    deadline = time.monotonic() + timeout_seconds
+    while batch.status not in ["completed", "failed", "expired", "cancelled"]:
+        if time.monotonic() > deadline:
+            sdk_client.batches.cancel(batch.id)
+            raise TimeoutError(f"Batch {batch.id} not finished in {timeout_seconds}s")
+        time.sleep(poll_seconds)
+        batch = sdk_client.batches.retrieve(batch.id)
+        log.info("Batch %s is %s", batch.id, batch.status)
+
+    responses = {}
+    if batch.output_file_id is not None:
+        output = sdk_client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if len(line.strip()) == 0:
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if response.get("status_code", None) != 200:
+                log.error(
+                    "Batch request %s failed: %s",
+                    result["custom_id"],
+                    result.get("error", None),
+                )
+                continue
+            body = response["body"]
+            responses[int(result["custom_id"])] = body["choices"][0]["message"][
+                "content"
+            ]
+
+    log.info(
+        "Batch %s %s with %s of %s responses",
+        batch.id,
+        batch.status,
+        len(responses),
+        len(lines),
+    )
+
+    return responses
@@ -0,0 +1,215 @@
+from typing import Callable
+from typing import Optional
+from typing import Sequence
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+default_routing_cache_max_entries = 1000
+default_routing_cache_ttl_seconds = 3600.0
+
+_mention = re.compile(r"<[@#!][^>]*>")
+_space = re.compile(r"\s+")
+
+
+def normalize_utterance(utterance: str) -> str:
+    """
+    Reduce an utterance to the form used for routing cache keys, so that
+    trivially different messages (case, spacing, mentions, trailing
+    punctuation) share a decision.
+    """
+    text = _mention.sub(" ", utterance or "")
+    text = _space.sub(" ", text).strip().casefold()
+    return text.rstrip("?!. ")
+
+
+class RoutingCache:
+    """
+    Remembers `Character.wants_to_handle` decisions, keyed on the character,
+    its control flow model and the normalized utterance.
+
+    Decisions expire after `ttl_seconds`, and the least recently used are
+    evicted beyond `max_entries`. A `max_entries` of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = default_routing_cache_max_entries,
+        ttl_seconds: float = default_routing_cache_ttl_seconds,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._decisions: OrderedDict[tuple, tuple[float, bool]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        character_name: str, control_flow_model: Optional[str], utterance: str
+    ) -> tuple:
+        return (character_name, control_flow_model, normalize_utterance(utterance))
+
+    def get(self, key: tuple) -> Optional[bool]:
+
+        with self._lock:
+            entry = self._decisions.get(key, None)
+            if entry is not None and entry[0] > time.monotonic():
+                self._decisions.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._decisions[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, decision: bool) -> None:
+
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._decisions[key] = (time.monotonic() + self.ttl_seconds, decision)
+            self._decisions.move_to_end(key)
+            while len(self._decisions) > self.max_entries:
+                self._decisions.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._decisions.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._decisions)
+
+
+class PreRouter:
+    """
+    A cheap, local first pass over utterances ahead of `wants_to_handle`.
+
+    `route` returns True to accept, False to reject, or None when it is not
+    confident, in which case the character asks its control flow model.
+    `counts` tallies the decisions of every thread that routes through it.
+    """
+
+    def __init__(self):
+        self.counts = {True: 0, False: 0, None: 0}
+        self._lock = threading.Lock()
+
+    def route(self, utterance: str) -> Optional[bool]:
+        decision = self.decide(utterance)
+        with self._lock:
+            self.counts[decision] += 1
+        return decision
+
+    def decide(self, utterance: str) -> Optional[bool]:
+        return None
+
+
+def accept_or_reject(accepted: bool, rejected: bool) -> Optional[bool]:
+    """A decision when exactly one side matched, otherwise None."""
+    if accepted == rejected:
+        return None
+    return accepted
+
+
+class KeywordPreRouter(PreRouter):
+    """
+    Accepts utterances containing any of `accept` and rejects those containing
+    any of `reject`, as whole words or phrases of the normalized utterance.
+    """
+
+    def __init__(self, accept: Sequence[str] = (), reject: Sequence[str] = ()):
+        super().__init__()
+        self.accept = [self._phrase(keyword) for keyword in accept]
+        self.reject = [self._phrase(keyword) for keyword in reject]
+
+    @staticmethod
+    def _phrase(keyword: str) -> re.Pattern:
+        return re.compile(r"\b" + re.escape(normalize_utterance(keyword)) + r"\b")
+
+    def decide(self, utterance: str) -> Optional[bool]:
+        text = normalize_utterance(utterance)
+        return accept_or_reject(
+            any(p.search(text) for p in self.accept),
+            any(p.search(text) for p in self.reject),
+        )
+
+
+class RegexPreRouter(PreRouter):
+    """
+    Accepts utterances matching any of `accept` and rejects those matching
+    any of `reject`. Patterns are searched in the raw utterance.
+    """
+
+    def __init__(self, accept: Sequence[str] = (), reject: Sequence[str] = ()):
+        super().__init__()
+        self.accept = [re.compile(pattern, re.IGNORECASE) for pattern in accept]
+        self.reject = [re.compile(pattern, re.IGNORECASE) for pattern in reject]
+
+    def decide(self, utterance: str) -> Optional[bool]:
+        return accept_or_reject(
+            any(p.search(utterance) for p in self.accept),
+            any(p.search(utterance) for p in self.reject),
+        )
+
+
+default_exemplar_threshold = 0.8
+default_exemplar_margin = 0.1
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm > 0 else 0.0
+
+
+class ExemplarPreRouter(PreRouter):
+    """
+    Compares the utterance embedding with embeddings of example utterances
+    the character should (`accept`) and should not (`reject`) handle.
+
+    It decides when the closest exemplar is at least `threshold` similar
+    and beats the closest exemplar on the other side by `margin`.
+    `embed` maps a list of texts to a list of vectors, eg the
+    `encode_queries` method of a pymilvus embedding function.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[list[str]], Sequence[Sequence[float]]],
+        accept: Sequence[str] = (),
+        reject: Sequence[str] = (),
+        threshold: float = default_exemplar_threshold,
+        margin: float = default_exemplar_margin,
+    ):
+        super().__init__()
+        self.embed = embed
+        self.threshold = threshold
+        self.margin = margin
+        self.accept = list(embed(list(accept))) if len(accept) > 0 else []
+        self.reject = list(embed(list(reject))) if len(reject) > 0 else []
+
+    def decide(self, utterance: str) -> Optional[bool]:
+
+        vector = self.embed([utterance])[0]
+        best_accept = max(
+            (cosine_similarity(vector, e) for e in self.accept), default=0.0
+        )
+        best_reject = max(
+            (cosine_similarity(vector, e) for e in self.reject), default=0.0
+        )
+
+        if best_accept >= self.threshold and best_accept - best_reject >= self.margin:
+            return True
+        if best_reject >= self.threshold and best_reject - best_accept >= self.margin:
+            return False
+        return None
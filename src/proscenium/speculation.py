@@ -0,0 +1,391 @@
+"""
+Speculative execution of `Character.handle`.
+
+A character that opts in with `speculate=True` starts producing its
+response while its `wants_to_handle` decision is still being made. When it
+accepts, the response is already underway; when it declines, the work is
+discarded and counted as waste in the character's `SpeculationStats`.
+
+Speculations share a `SpeculationPool` of `workers` slots, so a burst of
+messages cannot start an unbounded amount of speculative work. When every
+slot is busy, the character decides first and responds afterwards, and the
+skipped speculation is counted in its stats.
+"""
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+
+if TYPE_CHECKING:
+    from proscenium import Character
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+_done = object()
+
+default_speculation_workers = 8
+
+
+class SpeculationStats:
+    """
+    `started` speculations end up either `used` or `wasted`. `skipped`
+    counts speculations not started because the pool was saturated.
+    `wasted_seconds` is how long discarded responses had been running when
+    they were discarded, and `saved_seconds` the head start gained on those
+    that were used.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.skipped = 0
+        self.wasted_seconds = 0.0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.started += 1
+
+    def skip(self) -> None:
+        with self._lock:
+            self.skipped += 1
+
+    def use(self, head_start_seconds: float) -> None:
+        with self._lock:
+            self.used += 1
+            self.saved_seconds += head_start_seconds
+
+    def waste(self, seconds: float) -> None:
+        with self._lock:
+            self.wasted += 1
+            self.wasted_seconds += seconds
+
+    def __repr__(self) -> str:
+        return (
+            f"started={self.started} used={self.used} wasted={self.wasted} "
+            f"skipped={self.skipped} "
+            f"wasted_seconds={self.wasted_seconds:.2f} "
+            f"saved_seconds={self.saved_seconds:.2f}"
+        )
+
+
+def close_iterator(iterator: Any) -> None:
+    """Closes a generator, or other iterator with `close`, left unfinished."""
+
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+async def iterate_in_threads(iterator: Iterator) -> AsyncIterator:
+    """
+    Steps through a sync iterator in worker threads. If the caller stops
+    early or is cancelled, the iterator is closed once the step in flight
+    has returned.
+    """
+
+    loop = asyncio.get_running_loop()
+    step = None
+
+    def close_after(step: asyncio.Future) -> None:
+        if not step.cancelled():
+            step.exception()
+        close_iterator(iterator)
+
+    try:
+        while True:
+            step = loop.run_in_executor(None, next, iterator, _done)
+            item = await asyncio.shield(step)
+            if item is _done:
+                return
+            yield item
+    finally:
+        if step is None or step.done():
+            close_iterator(iterator)
+        else:
+            step.add_done_callback(close_after)
+
+
+class BufferedChunks:
+    """An iterator over chunks that another thread is still producing."""
+
+    def __init__(self):
+        self._chunks = queue.Queue()
+
+    def put(self, chunk: Any) -> None:
+        self._chunks.put(chunk)
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            chunk = self._chunks.get()
+            if chunk is _done:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+
+class SpeculationPool:
+    """
+    At most `workers` speculations at once, sync ones running on a pool of
+    as many threads. A slot is held until the speculation's `handle` ends.
+    """
+
+    def __init__(self, workers: int = default_speculation_workers):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="proscenium-speculation"
+        )
+
+    def acquire(self) -> bool:
+        """Take a slot if one is free, without waiting."""
+        return self._slots.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def submit(self, fn: Callable, *args: Any) -> bool:
+        """Run `fn(*args)` in a free slot. False if every slot is busy."""
+
+        if not self.acquire():
+            return False
+
+        def run() -> None:
+            try:
+                fn(*args)
+            finally:
+                self.release()
+
+        try:
+            self._executor.submit(run)
+        except RuntimeError:
+            # Shut down
+            self.release()
+            return False
+        return True
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_speculation_pool = SpeculationPool()
+
+
+def set_default_speculation_pool(pool: SpeculationPool) -> None:
+    global _default_speculation_pool
+    if _default_speculation_pool is not pool:
+        _default_speculation_pool.shutdown()
+    _default_speculation_pool = pool
+
+
+def default_speculation_pool() -> SpeculationPool:
+    return _default_speculation_pool
+
+
+class Speculation:
+    """
+    Runs `character.handle` on a `SpeculationPool` thread.
+    Streamed responses are read ahead into `BufferedChunks`.
+
+    Start one with `Speculation.start`, then call `responses()` once the
+    character has accepted, or `discard()` once it has declined.
+    """
+
+    def __init__(self, character: "Character"):
+        self.stats = character.speculation_stats
+        self._started = time.monotonic()
+        self._finished = None
+        self._discarded = threading.Event()
+        self._responses = queue.Queue()
+
+    @classmethod
+    def start(
+        cls,
+        character: "Character",
+        channel_id: str,
+        speaker_id: str,
+        utterance: str,
+        pool: Optional[SpeculationPool] = None,
+    ) -> Optional["Speculation"]:
+        """A running speculation, or None if `pool` has no free slot."""
+
+        speculation = cls(character)
+        pool = pool or _default_speculation_pool
+        if not pool.submit(
+            speculation._run, character, channel_id, speaker_id, utterance
+        ):
+            log.info("Speculation pool is busy; %s decides first", character.name())
+            speculation.stats.skip()
+            return None
+        speculation.stats.start()
+        return speculation
+
+    def _run(
+        self, character: "Character", channel_id: str, speaker_id: str, utterance: str
+    ) -> None:
+        handled = character.handle(channel_id, speaker_id, utterance)
+        try:
+            for receiving_channel_id, response in handled:
+                if self._discarded.is_set():
+                    break
+                if isinstance(response, str):
+                    self._responses.put((receiving_channel_id, response))
+                    continue
+                chunks = BufferedChunks()
+                self._responses.put((receiving_channel_id, chunks))
+                try:
+                    for chunk in response:
+                        if self._discarded.is_set():
+                            break
+                        chunks.put(chunk)
+                except Exception as e:
+                    chunks.put(e)
+                finally:
+                    close_iterator(response)
+                chunks.put(_done)
+        except Exception as e:
+            self._responses.put(e)
+        finally:
+            close_iterator(handled)
+            self._finished = time.monotonic()
+            self._responses.put(_done)
+
+    def responses(self) -> Iterator[tuple[str, Any]]:
+        """The (channel_id, response) pairs `handle` yields, as they are ready."""
+
+        self.stats.use(time.monotonic() - self._started)
+        while True:
+            response = self._responses.get()
+            if response is _done:
+                return
+            if isinstance(response, BaseException):
+                raise response
+            yield response
+
+    def discard(self) -> None:
+        """
+        Stop reading the response. A call already in flight runs to completion
+        in the background, then `handle` and any streamed response are closed;
+        the time is counted as wasted.
+        """
+        self._discarded.set()
+        self.stats.waste((self._finished or time.monotonic()) - self._started)
+
+
+class AsyncSpeculation:
+    """
+    The asyncio counterpart of `Speculation`. Runs `character.ahandle` in a
+    task holding a `SpeculationPool` slot, reading streamed responses ahead
+    into async iterators.
+    """
+
+    def __init__(self, character: "Character"):
+        self.stats = character.speculation_stats
+        self._started = time.monotonic()
+        self._finished = None
+        self._responses = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(
+        cls,
+        character: "Character",
+        channel_id: str,
+        speaker_id: str,
+        utterance: str,
+        pool: Optional[SpeculationPool] = None,
+    ) -> Optional["AsyncSpeculation"]:
+        """A running speculation, or None if `pool` has no free slot."""
+
+        pool = pool or _default_speculation_pool
+        if not pool.acquire():
+            log.info("Speculation pool is busy; %s decides first", character.name())
+            character.speculation_stats.skip()
+            return None
+
+        speculation = cls(character)
+        speculation.stats.start()
+        speculation._task = asyncio.create_task(
+            speculation._run(character, channel_id, speaker_id, utterance)
+        )
+        speculation._task.add_done_callback(lambda _: pool.release())
+        return speculation
+
+    async def _run(
+        self, character: "Character", channel_id: str, speaker_id: str, utterance: str
+    ) -> None:
+        try:
+            async with aclosing(
+                character.ahandle(channel_id, speaker_id, utterance)
+            ) as handled:
+                async for receiving_channel_id, response in handled:
+                    if isinstance(response, str):
+                        await self._responses.put((receiving_channel_id, response))
+                        continue
+                    chunks = asyncio.Queue()
+                    await self._responses.put(
+                        (receiving_channel_id, self._drain(chunks))
+                    )
+                    await self._read_ahead(response, chunks)
+        except Exception as e:
+            await self._responses.put(e)
+        finally:
+            self._finished = time.monotonic()
+            self._responses.put_nowait(_done)
+
+    @staticmethod
+    async def _read_ahead(response: Any, chunks: asyncio.Queue) -> None:
+
+        if not hasattr(response, "__aiter__"):
+            response = iterate_in_threads(iter(response))
+        try:
+            async for chunk in response:
+                await chunks.put(chunk)
+        except Exception as e:
+            await chunks.put(e)
+        finally:
+            if hasattr(response, "aclose"):
+                await response.aclose()
+        await chunks.put(_done)
+
+    @staticmethod
+    async def _drain(chunks: asyncio.Queue) -> AsyncIterator[str]:
+        while True:
+            chunk = await chunks.get()
+            if chunk is _done:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+    async def responses(self) -> AsyncIterator[tuple[str, Any]]:
+
+        self.stats.use(time.monotonic() - self._started)
+        while True:
+            response = await self._responses.get()
+            if response is _done:
+                return
+            if isinstance(response, BaseException):
+                raise response
+            yield response
+
+    def discard(self) -> None:
+        """Cancel the task, closing `ahandle` and any streamed response."""
+        self._task.cancel()
+        self.stats.waste((self._finished or time.monotonic()) - self._started)
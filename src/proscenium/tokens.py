@@ -0,0 +1,360 @@
+"""
+Token counting and per-call input budgets.
+
+A `Tokenizer` is chosen for each model id by the longest matching prefix
+in `TokenAccounting.tokenizers`; models without one are estimated at about
+four characters per token. Accurate counts need the optional `tiktoken`
+or `tokenizers` packages.
+
+When a call's messages exceed the model's budget, the lowest-value content
+is trimmed first: tool results, then earlier conversation turns, then the
+final user message. System prompts are never trimmed. `rag_prompt` drops
+its least similar chunks before that happens.
+
+Input tokens, and output tokens and prompt tokens served from the
+provider's prompt cache (see `proscenium.prompt_cache`) where the provider
+reports them, are logged for every call and summed per model in
+`TokenAccounting.usage`.
+
+`proscenium.bin.production_from_config` installs the default accounting
+from the `inference.tokens` configuration section.
+"""
+
+from typing import Any
+from typing import Optional
+
+import logging
+import math
+import threading
+
+from proscenium.tracing import current_span
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+# Per-message framing tokens added by chat templates
+message_overhead_tokens = 4
+
+truncation_marker = " [truncated]"
+
+
+class Tokenizer:
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError()
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of `text` with at most `max_tokens` tokens."""
+
+        if self.count(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+
+
+class ApproximateTokenizer(Tokenizer):
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return text[: int(max(0, max_tokens) * self.chars_per_token)]
+
+
+class TiktokenTokenizer(Tokenizer):
+
+    def __init__(self, encoding_name: str = "o200k_base"):
+        try:
+            import tiktoken
+        except ImportError as e:
+            raise ImportError(
+                "TiktokenTokenizer requires the tiktoken package. "
+                "Install it with `pip install tiktoken`."
+            ) from e
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return self.encoding.decode(tokens[: max(0, max_tokens)])
+
+
+class HuggingFaceTokenizer(Tokenizer):
+
+    def __init__(self, name: str):
+        try:
+            from tokenizers import Tokenizer as HFTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "HuggingFaceTokenizer requires the tokenizers package. "
+                "Install it with `pip install tokenizers`."
+            ) from e
+        self.tokenizer = HFTokenizer.from_pretrained(name)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        encoding = self.tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        return text[: encoding.offsets[max_tokens - 1][1]]
+
+
+def tokenizer_from_spec(spec: str) -> Tokenizer:
+    """
+    A tokenizer from "approximate", "tiktoken:<encoding>" or
+    "huggingface:<repository>".
+    """
+
+    kind, _, name = spec.partition(":")
+    if kind == "approximate":
+        return ApproximateTokenizer()
+    if kind == "tiktoken":
+        return TiktokenTokenizer(name or "o200k_base")
+    if kind == "huggingface":
+        return HuggingFaceTokenizer(name)
+    raise ValueError(f"Unknown tokenizer {spec}")
+
+
+def message_text(message: Any) -> str:
+    """The text of a message dict or of a provider's tool call message."""
+
+    if isinstance(message, dict):
+        return str(message.get("content", None) or "")
+
+    text = str(getattr(message, "content", None) or "")
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        text += tool_call.function.name + tool_call.function.arguments
+    return text
+
+
+class TokenUsage:
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.trimmed_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"calls={self.calls} input_tokens={self.input_tokens} "
+            f"trimmed_tokens={self.trimmed_tokens} output_tokens={self.output_tokens} "
+            f"cached_tokens={self.cached_tokens}"
+        )
+
+
+class TokenAccounting:
+    """
+    Counts tokens with `tokenizers[prefix]` and enforces `budgets[model_id]`
+    (or the budget of the model's provider, or `default_budget`) on input.
+    """
+
+    def __init__(
+        self,
+        tokenizers: Optional[dict[str, Tokenizer]] = None,
+        budgets: Optional[dict[str, int]] = None,
+        default_budget: Optional[int] = None,
+    ):
+        self.tokenizers = tokenizers or {}
+        self.budgets = budgets or {}
+        self.default_budget = default_budget
+        self.fallback_tokenizer = ApproximateTokenizer()
+
+        self.usage: dict[str, TokenUsage] = {}
+        self._lock = threading.Lock()
+
+    def tokenizer(self, model_id: str) -> Tokenizer:
+        prefixes = [p for p in self.tokenizers if model_id.startswith(p)]
+        if len(prefixes) == 0:
+            return self.fallback_tokenizer
+        return self.tokenizers[max(prefixes, key=len)]
+
+    def budget(self, model_id: str) -> Optional[int]:
+        provider = model_id.split(":", 1)[0]
+        return self.budgets.get(
+            model_id, self.budgets.get(provider, self.default_budget)
+        )
+
+    def count(self, model_id: str, text: str) -> int:
+        return self.tokenizer(model_id).count(text)
+
+    def count_messages(self, model_id: str, messages: list) -> int:
+        tokenizer = self.tokenizer(model_id)
+        return sum(
+            [
+                tokenizer.count(message_text(message)) + message_overhead_tokens
+                for message in messages
+            ]
+        )
+
+    def prompt_budget(self, model_id: str, system_prompt: str) -> Optional[int]:
+        """What the budget leaves for a user prompt after `system_prompt`."""
+
+        budget = self.budget(model_id)
+        if budget is None:
+            return None
+        return (
+            budget - self.count(model_id, system_prompt) - 2 * message_overhead_tokens
+        )
+
+    def fit_messages(
+        self, model_id: str, messages: list, reserved_tokens: int = 0
+    ) -> tuple[list, int, int]:
+        """
+        `messages`, trimmed if need be to what the model's budget leaves
+        after `reserved_tokens` (such as tool definitions), with their token
+        count and the number of tokens trimmed. `messages` itself is left
+        unchanged.
+        """
+
+        tokenizer = self.tokenizer(model_id)
+        counts = [
+            tokenizer.count(message_text(message)) + message_overhead_tokens
+            for message in messages
+        ]
+        total = sum(counts)
+        budget = self.budget(model_id)
+        if budget is None or total + reserved_tokens <= budget:
+            return messages, total, 0
+        budget -= reserved_tokens
+
+        fitted = list(messages)
+        excess = total - budget
+        for i in trim_order(messages):
+            if excess <= 0:
+                break
+            content = message_text(messages[i])
+            tokens = counts[i] - message_overhead_tokens
+            if tokens <= tokenizer.count(truncation_marker):
+                continue
+            keep = max(0, tokens - excess - tokenizer.count(truncation_marker))
+            trimmed = tokenizer.truncate(content, keep) + truncation_marker
+            fitted[i] = {**messages[i], "content": trimmed}
+            saved = counts[i] - tokenizer.count(trimmed) - message_overhead_tokens
+            excess -= saved
+            total -= saved
+
+        if excess > 0:
+            log.warning(
+                "Input for %s is %s tokens over its budget of %s after trimming",
+                model_id,
+                excess,
+                budget,
+            )
+        else:
+            log.warning(
+                "Trimmed input for %s to %s tokens to fit its budget of %s",
+                model_id,
+                total,
+                budget,
+            )
+
+        return fitted, total, sum(counts) - total
+
+    def record(
+        self,
+        model_id: str,
+        input_tokens: int,
+        trimmed_tokens: int = 0,
+        response: Any = None,
+    ) -> None:
+        """
+        Adds a call to the usage of `model_id`. Prefers the provider's own
+        input count, and takes the output count and the count of input
+        tokens read from the provider's prompt cache, from `response.usage`.
+        """
+
+        provider_usage = getattr(response, "usage", None)
+        output_tokens = 0
+        cached_tokens = 0
+        if provider_usage is not None:
+            input_tokens = getattr(provider_usage, "prompt_tokens", None) or (
+                input_tokens
+            )
+            output_tokens = getattr(provider_usage, "completion_tokens", None) or 0
+            details = getattr(provider_usage, "prompt_tokens_details", None)
+            cached_tokens = getattr(details, "cached_tokens", None) or 0
+
+        s = current_span()
+        if s is not None:
+            s.set(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cached_tokens=cached_tokens,
+            )
+
+        log.info(
+            "%s: %s input tokens (%s trimmed, %s cached), %s output tokens",
+            model_id,
+            input_tokens,
+            trimmed_tokens,
+            cached_tokens,
+            output_tokens,
+        )
+
+        with self._lock:
+            usage = self.usage.setdefault(model_id, TokenUsage())
+            usage.calls += 1
+            usage.input_tokens += input_tokens
+            usage.trimmed_tokens += trimmed_tokens
+            usage.output_tokens += output_tokens
+            usage.cached_tokens += cached_tokens
+
+
+def trim_order(messages: list) -> list[int]:
+    """
+    Indices of the messages that may be trimmed, lowest value first:
+    tool results, then earlier turns, then the final message.
+    System prompts and tool call messages are kept.
+    """
+
+    roles = [
+        message.get("role", None) if isinstance(message, dict) else None
+        for message in messages
+    ]
+    tools = [i for i, role in enumerate(roles) if role == "tool"]
+    turns = [i for i, role in enumerate(roles) if role in ["user", "assistant"]]
+    last = turns[-1:] if len(turns) > 0 else []
+    return tools + turns[:-1] + last
+
+
+_default_accounting = TokenAccounting()
+
+
+def set_default_token_accounting(accounting: TokenAccounting) -> None:
+    global _default_accounting
+    _default_accounting = accounting
+
+
+def default_token_accounting() -> TokenAccounting:
+    return _default_accounting
+
+
+def token_accounting_from_config(tokens_config: dict) -> TokenAccounting:
+    """Accounting from the `inference.tokens` configuration section."""
+
+    return TokenAccounting(
+        tokenizers={
+            prefix: tokenizer_from_spec(spec)
+            for prefix, spec in tokens_config.get("tokenizers", {}).items()
+        },
+        budgets=tokens_config.get("budgets", {}),
+        default_budget=tokens_config.get("default_budget", None),
+    )
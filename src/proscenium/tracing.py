@@ -0,0 +1,134 @@
+"""
+Lightweight spans and events for completions, tool evaluation, retrieval
+and Slack dispatch.
+
+Instrumented code opens a `span` around a unit of work and attaches
+attributes to it; the span records its own timing. Attributes hold
+references, such as the messages sent, rather than renderings of them, so
+a span costs little more than a couple of clock reads when nobody is
+listening.
+
+Subscribers receive spans as they start and end, and events as they are
+emitted. `proscenium.tracing_console.RichConsoleSubscriber` renders them
+to a rich console; register any object with the `Subscriber` methods
+through `add_subscriber` to export them elsewhere.
+"""
+
+from typing import Any
+from typing import Iterator
+from typing import Optional
+
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+# Span names used by Proscenium
+completion_span = "completion"
+tool_evaluation_span = "tool_evaluation"
+retrieval_span = "retrieval"
+slack_dispatch_span = "slack_dispatch"
+
+
+class Span:
+
+    __slots__ = ["name", "attributes", "parent", "start", "end", "error"]
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"]):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.end or time.monotonic()) - self.start
+
+    def __repr__(self) -> str:
+        return f"Span({self.name}, {self.duration_seconds:.3f}s)"
+
+
+class Subscriber:
+    """Receives spans and events. Methods are called on the traced thread."""
+
+    def span_started(self, span: Span) -> None:
+        pass
+
+    def span_ended(self, span: Span) -> None:
+        pass
+
+    def event(self, span: Optional[Span], name: str, attributes: dict) -> None:
+        pass
+
+
+_subscribers: tuple[Subscriber, ...] = ()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "proscenium_span", default=None
+)
+
+
+def add_subscriber(subscriber: Subscriber) -> None:
+    global _subscribers
+    _subscribers = _subscribers + (subscriber,)
+
+
+def remove_subscriber(subscriber: Subscriber) -> None:
+    global _subscribers
+    _subscribers = tuple(s for s in _subscribers if s is not subscriber)
+
+
+def subscribers() -> tuple[Subscriber, ...]:
+    return _subscribers
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _notify(method: str, *args) -> None:
+    for subscriber in _subscribers:
+        try:
+            getattr(subscriber, method)(*args)
+        except Exception as e:
+            log.error("Tracing subscriber %s failed: %s", subscriber, e)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """A span around the enclosed block, nested in the current one."""
+
+    s = Span(name, attributes, _current_span.get())
+    token = _current_span.set(s)
+    if len(_subscribers) > 0:
+        _notify("span_started", s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = e
+        raise
+    finally:
+        s.end = time.monotonic()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # A generator's span that ended in another context
+            pass
+        if len(_subscribers) > 0:
+            _notify("span_ended", s)
+
+
+def event(name: str, **attributes: Any) -> None:
+    """A point-in-time event within the current span."""
+
+    if len(_subscribers) > 0:
+        _notify("event", _current_span.get(), name, attributes)
@@ -0,0 +1,142 @@
+"""
+Renders Proscenium spans to a rich console.
+
+Rendering happens on a background thread, so traced calls only pay for
+handing a finished span to a queue. Spans are rendered to the console
+passed to the traced call, if any, or else to the subscriber's own.
+"""
+
+from typing import Optional
+
+import logging
+import queue
+import threading
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.text import Text
+
+from proscenium.tracing import Span
+from proscenium.tracing import Subscriber
+from proscenium.tracing import add_subscriber
+from proscenium.tracing import completion_span
+from proscenium.tracing import retrieval_span
+from proscenium.tracing import slack_dispatch_span
+from proscenium.tracing import subscribers
+from proscenium.tracing import tool_evaluation_span
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+
+class RichConsoleSubscriber(Subscriber):
+
+    def __init__(self, console: Optional[Console] = None):
+        self.console = console
+        self._spans = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._render_spans, name="proscenium-trace-console", daemon=True
+        )
+        self._thread.start()
+
+    def span_ended(self, span: Span) -> None:
+        if span.attributes.get("console", None) or self.console:
+            self._spans.put(span)
+
+    def event(self, span: Optional[Span], name: str, attributes: dict) -> None:
+        if attributes.get("console", None) or self.console:
+            self._spans.put((name, attributes))
+
+    def join(self) -> None:
+        """Wait until everything received so far is rendered."""
+        self._spans.join()
+
+    def _render_spans(self) -> None:
+        while True:
+            item = self._spans.get()
+            try:
+                if isinstance(item, Span):
+                    self.render(item)
+                else:
+                    self.render_event(*item)
+            except Exception as e:
+                log.error("Could not render %s: %s", item, e)
+            finally:
+                self._spans.task_done()
+
+    def render(self, span: Span) -> None:
+
+        attributes = span.attributes
+        console = attributes.get("console", None) or self.console
+        timing = f"{span.name} took {span.duration_seconds:.3f}s"
+
+        if span.name == completion_span:
+            call_site = attributes.get("call_site", "complete_simple")
+            if call_site == "complete_simple":
+                from proscenium.complete import complete_simple_panel
+
+                console.print(
+                    complete_simple_panel(
+                        attributes["model_id"],
+                        attributes["messages"],
+                        attributes.get("kwargs", {}),
+                    )
+                )
+            else:
+                from proscenium.patterns.tools import complete_with_tools_panel
+
+                console.print(
+                    complete_with_tools_panel(
+                        call_site.replace("_", " "),
+                        attributes["model_id"],
+                        attributes.get("tool_desc_list", []),
+                        attributes["messages"],
+                        attributes.get("temperature", None),
+                    )
+                )
+            if "response" in attributes:
+                console.print(Panel(str(attributes["response"]), title="Response"))
+
+        elif span.name == retrieval_span:
+            from proscenium.patterns.rag import chunk_hits_table
+
+            console.print(chunk_hits_table(attributes.get("chunks", [])))
+
+        elif span.name == tool_evaluation_span:
+            timing = (
+                f"{attributes['tool']}({attributes.get('args', {})}) = "
+                f"{attributes.get('result', None)} in {span.duration_seconds:.3f}s"
+            )
+
+        elif span.name == slack_dispatch_span:
+            timing = (
+                f"{attributes.get('character', 'No character')} in "
+                f"{attributes.get('channel_id', None)} took "
+                f"{span.duration_seconds:.3f}s"
+            )
+
+        if span.error is not None:
+            timing += f" and failed: {span.error}"
+
+        console.print(Text(timing, style="dim"))
+
+    def render_event(self, name: str, attributes: dict) -> None:
+
+        console = attributes.get("console", None) or self.console
+        if "panel" in attributes:
+            console.print(
+                Panel(Text(str(attributes["panel"])), title=attributes.get("title"))
+            )
+        else:
+            console.print(Text(f"{name}: {attributes}", style="dim"))
+
+
+def ensure_console_subscriber() -> None:
+    """
+    Registers a `RichConsoleSubscriber` unless there is one already,
+    for calls that pass their own console.
+    """
+
+    if not any(isinstance(s, RichConsoleSubscriber) for s in subscribers()):
+        add_subscriber(RichConsoleSubscriber())
@@ -0,0 +1,54 @@
+from pathlib import Path
+from typing import Optional
+import logging
+
+import typer
+import yaml
+from rich import print
+
+from benchmark.harness import result_table
+from benchmark.harness import run_benchmark
+
+log = logging.getLogger(__name__)
+
+logging.getLogger("proscenium").setLevel(logging.WARNING)
+
+app = typer.Typer(
+    help="Benchmark the Slack production processor against a local Slack stand-in."
+)
+
+
+@app.command(help="Replay synthetic messages and report reply throughput and latency.")
+def run(
+    events: int = typer.Option(1000, help="Number of messages to send."),
+    channels: int = typer.Option(10, help="Number of channels to spread them across."),
+    llm_seconds: float = typer.Option(
+        0.0,
+        help="Latency of each mock LLM call. 0 uses an echo character instead.",
+    ),
+    events_per_second: Optional[float] = typer.Option(
+        None, help="Send rate. By default messages are sent as fast as possible."
+    ),
+    config_file: Optional[Path] = typer.Option(
+        None, help="A production configuration whose slack section is used."
+    ),
+):
+
+    slack_config = {}
+    if config_file is not None:
+        with open(config_file) as f:
+            slack_config = yaml.safe_load(f).get("slack", {})
+
+    result = run_benchmark(
+        events=events,
+        channels=channels,
+        llm_seconds=llm_seconds,
+        events_per_second=events_per_second,
+        slack_config=slack_config,
+    )
+
+    print(result_table(result))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,226 @@
+"""
+A local stand-in for the parts of Slack that Proscenium talks to:
+the Web API methods it calls and the Socket Mode websocket.
+
+It lets `SlackProductionProcessor` run, and be load tested, with no
+workspace or tokens. Point the processor at it with the `slack.base_url`
+configuration setting.
+"""
+
+from typing import Callable
+from typing import Optional
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+
+from aiohttp import web
+from aiohttp import WSMsgType
+
+log = logging.getLogger(__name__)
+
+
+class FakeSlack:
+    """
+    Serves the Web API under `base_url` and Socket Mode websockets on the
+    same port. Events pushed with `send_event` go to one open websocket,
+    round robin, as Slack does. Every Web API call is recorded in `calls`
+    with its arrival time.
+    """
+
+    def __init__(
+        self,
+        channels: list[dict],
+        bot_user_id: str = "UBOT",
+        page_size: int = 100,
+        host: str = "127.0.0.1",
+    ):
+        self.channels = channels
+        self.bot_user_id = bot_user_id
+        self.page_size = page_size
+        self.host = host
+        self.port: Optional[int] = None
+
+        self.calls: list[tuple[float, str, dict]] = []
+        self.acks: set[str] = set()
+        self._calls_changed = threading.Condition()
+
+        self._ts = itertools.count(1)
+        self._sockets: list[web.WebSocketResponse] = []
+        self._next_socket = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/"
+
+    def start(self) -> str:
+        """Start serving on a free port in a background thread."""
+
+        self._thread = threading.Thread(
+            target=self._serve, name="fake-slack", daemon=True
+        )
+        self._thread.start()
+        self._started.wait()
+        return self.base_url
+
+    def _serve(self) -> None:
+
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        app = web.Application()
+        app.router.add_route("*", "/api/{method}", self._web_api)
+        app.router.add_get("/link", self._socket_mode)
+
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, 0)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+
+        self._loop.run_forever()
+
+    def stop(self) -> None:
+
+        async def close():
+            for socket in list(self._sockets):
+                await socket.close()
+            await self._runner.cleanup()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def connections(self) -> int:
+        return len(self._sockets)
+
+    def send_event(self, event: dict) -> str:
+        """Deliver an Events API event over Socket Mode. Returns the envelope id."""
+
+        envelope_id = str(uuid.uuid4())
+        envelope = {
+            "envelope_id": envelope_id,
+            "type": "events_api",
+            "accepts_response_payload": False,
+            "payload": {
+                "type": "event_callback",
+                "event_id": f"Ev{uuid.uuid4().hex[:10]}",
+                "event": event,
+            },
+        }
+
+        async def send():
+            socket = self._sockets[next(self._next_socket) % len(self._sockets)]
+            await socket.send_str(json.dumps(envelope))
+
+        asyncio.run_coroutine_threadsafe(send(), self._loop).result(timeout=10)
+        return envelope_id
+
+    def wait_for_calls(
+        self,
+        method: str,
+        count: int,
+        timeout: float = 30.0,
+        where: Optional[Callable[[dict], bool]] = None,
+    ) -> list[tuple[float, str, dict]]:
+        """
+        Wait until `count` calls to `method`, with arguments matching
+        `where` if given, have been recorded. Returns the matching calls.
+        """
+
+        deadline = time.monotonic() + timeout
+        with self._calls_changed:
+            while True:
+                matching = [
+                    call
+                    for call in self.calls
+                    if call[1] == method and (where is None or where(call[2]))
+                ]
+                remaining = deadline - time.monotonic()
+                if len(matching) >= count or remaining <= 0:
+                    return matching
+                self._calls_changed.wait(remaining)
+
+    async def _socket_mode(self, request: web.Request) -> web.WebSocketResponse:
+
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        self._sockets.append(socket)
+        await socket.send_str(json.dumps({"type": "hello", "num_connections": 1}))
+
+        try:
+            async for message in socket:
+                if message.type == WSMsgType.TEXT:
+                    ack = json.loads(message.data)
+                    if "envelope_id" in ack:
+                        self.acks.add(ack["envelope_id"])
+        finally:
+            self._sockets.remove(socket)
+
+        return socket
+
+    async def _web_api(self, request: web.Request) -> web.Response:
+
+        method = request.match_info["method"]
+        args = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                args.update(await request.json())
+            else:
+                args.update(await request.post())
+
+        with self._calls_changed:
+            self.calls.append((time.monotonic(), method, args))
+            self._calls_changed.notify_all()
+
+        handler = getattr(self, "_" + method.replace(".", "_"), None)
+        if handler is None:
+            return web.json_response({"ok": True})
+        return web.json_response({"ok": True, **handler(args)})
+
+    def _apps_connections_open(self, args: dict) -> dict:
+        return {"url": f"ws://{self.host}:{self.port}/link"}
+
+    def _auth_test(self, args: dict) -> dict:
+        return {
+            "url": "https://fake.slack.com/",
+            "team": "Fake",
+            "team_id": "T0",
+            "user": "proscenium",
+            "user_id": self.bot_user_id,
+            "bot_id": "B0",
+        }
+
+    def _users_conversations(self, args: dict) -> dict:
+        start = int(args.get("cursor") or 0)
+        end = start + self.page_size
+        next_cursor = str(end) if end < len(self.channels) else ""
+        return {
+            "channels": self.channels[start:end],
+            "response_metadata": {"next_cursor": next_cursor},
+        }
+
+    def _conversations_info(self, args: dict) -> dict:
+        for channel in self.channels:
+            if channel["id"] == args["channel"]:
+                return {"channel": channel}
+        return {"channel": {"id": args["channel"]}}
+
+    def _chat_postMessage(self, args: dict) -> dict:
+        return {"channel": args["channel"], "ts": f"{next(self._ts)}.000000"}
+
+    def _chat_update(self, args: dict) -> dict:
+        return {"channel": args["channel"], "ts": args["ts"]}
+
+    def _chat_getPermalink(self, args: dict) -> dict:
+        ts = args["message_ts"].replace(".", "")
+        return {"permalink": f"https://fake.slack.com/archives/{args['channel']}/p{ts}"}
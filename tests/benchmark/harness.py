@@ -0,0 +1,198 @@
+"""
+Replays synthetic Slack traffic through `SlackProductionProcessor`
+against `FakeSlack`, and measures how long each event takes to be
+answered.
+"""
+
+from typing import Optional
+
+import logging
+import os
+import re
+import statistics
+import time
+import uuid
+from dataclasses import dataclass
+
+from rich.console import Console
+from rich.table import Table
+
+from proscenium.interfaces.dispatch import admission_shed
+from proscenium.interfaces.slack import SlackProductionProcessor
+
+from benchmark.fake_slack import FakeSlack
+from benchmark.production import Benchmark
+
+log = logging.getLogger(__name__)
+
+admin_channel = "benchmark-admin"
+
+# Effectively no client side rate limiting, so the processor itself is measured
+unlimited_rates_per_minute = {
+    "chat_postMessage": 1_000_000,
+    "chat_update": 1_000_000,
+    "chat_getPermalink": 1_000_000,
+    "conversations_info": 1_000_000,
+    "users_conversations": 1_000_000,
+}
+
+
+@dataclass
+class BenchmarkResult:
+    events: int
+    replies: int
+    shed: int
+    elapsed_seconds: float
+    latencies_seconds: list[float]
+
+    @property
+    def throughput(self) -> float:
+        """Replies per second."""
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.replies / self.elapsed_seconds
+
+    def percentile(self, p: int) -> float:
+        if len(self.latencies_seconds) == 0:
+            return float("nan")
+        if len(self.latencies_seconds) == 1:
+            return self.latencies_seconds[0]
+        return statistics.quantiles(self.latencies_seconds, n=100)[p - 1]
+
+
+def result_table(result: BenchmarkResult) -> Table:
+
+    table = Table(title="Event to Reply", show_lines=False)
+    table.add_column("Events", justify="right")
+    table.add_column("Replies", justify="right")
+    table.add_column("Shed", justify="right")
+    table.add_column("Replies / s", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("p99 ms", justify="right")
+    table.add_row(
+        str(result.events),
+        str(result.replies),
+        str(result.shed),
+        f"{result.throughput:.1f}",
+        f"{result.percentile(50) * 1000:.1f}",
+        f"{result.percentile(95) * 1000:.1f}",
+        f"{result.percentile(99) * 1000:.1f}",
+    )
+    return table
+
+
+message_number = re.compile(r"Benchmark message (\d+)")
+
+
+def message_event(channel_id: str, i: int) -> dict:
+    return {
+        "type": "message",
+        "channel": channel_id,
+        "user": f"U{i % 50:04d}",
+        "text": f"Benchmark message {i}",
+        "ts": f"{1700000000 + i}.000100",
+        "client_msg_id": str(uuid.uuid4()),
+    }
+
+
+def run_benchmark(
+    events: int = 1000,
+    channels: int = 10,
+    llm_seconds: float = 0.0,
+    events_per_second: Optional[float] = None,
+    slack_config: Optional[dict] = None,
+    timeout_seconds: float = 120.0,
+) -> BenchmarkResult:
+    """
+    Send `events` messages round robin across `channels` channels, each
+    with a character that echoes (`llm_seconds` 0) or waits `llm_seconds`
+    for each of its two mock LLM calls. Messages are sent as fast as
+    possible unless `events_per_second` is given.
+
+    `slack_config` is the `slack` section of a production configuration.
+    Client side rate limits are lifted unless it sets its own.
+    """
+
+    channel_names = [f"benchmark-{i}" for i in range(channels)]
+    fake = FakeSlack(
+        [
+            {"id": f"C{i:08d}", "name": name, "is_member": True}
+            for i, name in enumerate([admin_channel] + channel_names)
+        ]
+    )
+    base_url = fake.start()
+
+    slack_config = dict(slack_config or {})
+    slack_config["base_url"] = base_url
+    outbound_config = dict(slack_config.get("outbound", {}))
+    outbound_config.setdefault("rates_per_minute", unlimited_rates_per_minute)
+    slack_config["outbound"] = outbound_config
+
+    os.environ.setdefault("SLACK_APP_TOKEN", "xapp-benchmark")
+    os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+
+    admin_channel_id = "C00000000"
+    channel_ids = [f"C{i + 1:08d}" for i in range(channels)]
+
+    processor = SlackProductionProcessor(
+        Benchmark(admin_channel_id, channel_names, llm_seconds),
+        admin_channel,
+        Console(quiet=True),
+        slack_config=slack_config,
+    )
+
+    try:
+        fake.wait_for_calls("chat.postMessage", 1)  # curtain up
+        start_calls = len(fake.calls)
+
+        sent: list[float] = []
+        start = time.monotonic()
+        for i in range(events):
+            if events_per_second is not None:
+                delay = start + i / events_per_second - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            channel_id = channel_ids[i % channels]
+            sent.append(time.monotonic())
+            fake.send_event(message_event(channel_id, i))
+
+        # Wait for every event to be admitted (or shed), then for the
+        # admitted ones to be handled and their replies sent
+        deadline = time.monotonic() + timeout_seconds
+        while (
+            sum(processor.admission.counts.values()) < events
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.01)
+        processor.dispatcher.join(max(0.0, deadline - time.monotonic()))
+        processor.sender.join(max(0.0, deadline - time.monotonic()))
+
+        posts = fake.wait_for_calls(
+            "chat.postMessage",
+            0,
+            where=lambda args: args.get("channel") != admin_channel_id,
+        )
+        admission_counts = dict(processor.admission.counts)
+    finally:
+        processor.shutdown()
+        fake.stop()
+
+    # Both characters quote the message they reply to
+    latencies = []
+    last_reply = start
+    for replied_at, _, args in posts:
+        match = message_number.search(args.get("text", ""))
+        if match is not None:
+            latencies.append(replied_at - sent[int(match.group(1))])
+            last_reply = max(last_reply, replied_at)
+
+    log.info("%s Web API calls during the benchmark", len(fake.calls) - start_calls)
+
+    return BenchmarkResult(
+        events=events,
+        replies=len(latencies),
+        shed=admission_counts[admission_shed],
+        elapsed_seconds=last_reply - start,
+        latencies_seconds=latencies,
+    )
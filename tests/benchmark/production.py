@@ -0,0 +1,91 @@
+from typing import Generator
+from typing import List
+import logging
+import time
+
+from proscenium import Production
+from proscenium import Character
+from proscenium import Scene
+from proscenium import Prop
+
+from demo.test_production import EchoCharacter
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+log = logging.getLogger(__name__)
+
+
+class MockLLMCharacter(Character):
+    """
+    Stands in for an LLM backed character. `wants_to_handle` takes as long
+    as a control flow model call, and `handle` as long as a generator call,
+    without calling either.
+    """
+
+    def __init__(
+        self,
+        admin_channel_id: str,
+        control_flow_seconds: float,
+        generator_seconds: float,
+    ):
+        super().__init__(admin_channel_id=admin_channel_id)
+        self.control_flow_seconds = control_flow_seconds
+        self.generator_seconds = generator_seconds
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        time.sleep(self.control_flow_seconds)
+        return True
+
+    def handle(
+        self, channel_id: str, speaker_id: str, utterance: str
+    ) -> Generator[tuple[str, str], None, None]:
+        time.sleep(self.generator_seconds)
+        yield channel_id, f"Considered answer to: {utterance}"
+
+
+class BenchmarkScene(Scene):
+
+    def __init__(self, channel_names: list[str], character: Character):
+        super().__init__()
+        self.channel_names = channel_names
+        self.character = character
+
+    def props(self) -> List[Prop]:
+        return []
+
+    def characters(self) -> List[Character]:
+        return [self.character]
+
+    def places(self, channel_name_to_id: dict) -> dict[str, Character]:
+        return {
+            channel_name_to_id[name]: self.character
+            for name in self.channel_names
+            if name in channel_name_to_id
+        }
+
+
+class Benchmark(Production):
+    """
+    One character, either `EchoCharacter` or `MockLLMCharacter`,
+    placed in every benchmark channel.
+    """
+
+    def __init__(
+        self,
+        admin_channel_id: str,
+        channel_names: list[str],
+        llm_seconds: float = 0.0,
+    ) -> None:
+
+        if llm_seconds > 0:
+            character = MockLLMCharacter(admin_channel_id, llm_seconds, llm_seconds)
+        else:
+            character = EchoCharacter(admin_channel_id)
+
+        self.scene = BenchmarkScene(channel_names, character)
+
+    def scenes(self) -> list[Scene]:
+        return [self.scene]
+
+    def places(self, channel_name_to_id: dict) -> dict[str, Character]:
+        return self.scene.places(channel_name_to_id)
@@ -28,6 +28,7 @@ class Demo(Production):
         generator_model: str,
         control_flow_model: str,
         console: Console,
+        stream: bool = False,
     ) -> None:
 
         self.elementary_school_math_class = abacus.ElementarySchoolMathClass(
@@ -47,6 +48,7 @@ class Demo(Production):
             generator_model,
             control_flow_model,
             console=console,
+            stream=stream,
         )
 
     def scenes(self) -> list[Scene]:
@@ -91,4 +93,5 @@ def make_production(
         inference_config["generator_model"],
         inference_config["control_flow_model"],
         console,
+        stream=inference_config.get("stream", False),
     )
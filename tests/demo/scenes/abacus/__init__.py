@@ -18,6 +18,7 @@ from proscenium import WantsToHandleResponse
 from proscenium.complete import complete_simple
 from proscenium.patterns.tools import process_tools
 from proscenium.patterns.tools import apply_tools
+from proscenium.routing import RegexPreRouter
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
@@ -45,6 +46,9 @@ The user-posted message is:
 {text}
 """
 
+# Messages that already contain an arithmetic expression need no LLM to route
+arithmetic_expression = r"\d+(\.\d+)?\s*[-+*/x×÷]\s*\d+"
+
 
 class Abacus(Character):
     """
@@ -54,7 +58,10 @@ class Abacus(Character):
     def __init__(
         self, admin_channel_id: str, generator_model: str, control_flow_model: str
     ):
-        super().__init__(admin_channel_id=admin_channel_id)
+        super().__init__(
+            admin_channel_id=admin_channel_id,
+            pre_routers=[RegexPreRouter(accept=[arithmetic_expression])],
+        )
         self.generator_model = generator_model
         self.control_flow_model = control_flow_model
 
@@ -63,9 +70,11 @@ class Abacus(Character):
         log.info("handle? channel_id = %s, speaker_id = %s", channel_id, speaker_id)
 
         response = complete_simple(
+            chat_completion_client=None,
             model_id=self.control_flow_model,
             system_prompt=control_flow_system_prompt,
             user_prompt=wants_to_handle_template.format(text=utterance),
+            temperature=0,
             response_format={
                 "type": "json_object",
                 "schema": WantsToHandleResponse.model_json_schema(),
@@ -124,4 +133,7 @@ class ElementarySchoolMathClass(Scene):
         channel_name_to_id: dict,
     ) -> dict[str, Character]:
 
+        if self.channel_abacus not in channel_name_to_id:
+            return {}
+
         return {channel_name_to_id[self.channel_abacus]: self.abacus}
@@ -31,6 +31,7 @@ class HighSchoolEnglishClass(Scene):
         generator_model: str,
         control_flow_model: str,
         console: Optional[Console] = None,
+        stream: bool = False,
     ):
         super().__init__()
 
@@ -50,6 +51,7 @@ class HighSchoolEnglishClass(Scene):
             embedding_model,
             collection_name,
             admin_channel_id,
+            stream=stream,
         )
 
     def props(self) -> List[Prop]:
@@ -65,4 +67,7 @@ class HighSchoolEnglishClass(Scene):
         channel_name_to_id: dict,
     ) -> dict[str, Character]:
 
+        if self.channel_id_literature not in channel_name_to_id:
+            return {}
+
         return {channel_name_to_id[self.channel_id_literature]: self.literature_expert}
@@ -9,6 +9,7 @@ from lapidarist.vector_database import vector_db
 from lapidarist.chunk_space import load_chunks_from_files
 
 from proscenium import Prop
+from proscenium.answer_cache import default_answer_cache
 
 from .docs import books
 
@@ -61,3 +62,7 @@ class ChunkSpace(Prop):
             self.collection_name,
             console=self.console,
         )
+
+        answer_cache = default_answer_cache()
+        if answer_cache is not None:
+            answer_cache.invalidate(self.collection_name)
@@ -11,6 +11,9 @@ from proscenium import WantsToHandleResponse
 from proscenium import control_flow_system_prompt
 from proscenium.complete import complete_simple
 from proscenium.patterns.rag import answer_question
+from proscenium.patterns.rag import answer_question_stream
+from proscenium.routing import ExemplarPreRouter
+from proscenium.routing import KeywordPreRouter
 
 from .docs import books
 
@@ -34,6 +37,19 @@ The user-posted message is:
 {text}
 """
 
+# Names that only come up in questions about the books
+book_keywords = ["Aeschylus", "Prometheus", "Agamemnon", "Walden", "Thoreau"]
+
+example_questions = [
+    default_question,
+    "Why did Thoreau go to live in the woods?",
+]
+
+example_non_questions = [
+    "What is 33312-457?",
+    "Good morning everyone",
+]
+
 
 class LiteratureExpert(Character):
     """
@@ -47,8 +63,10 @@ class LiteratureExpert(Character):
         embedding_model: str,
         collection_name: str,
         admin_channel_id: str,
+        stream: bool = False,
     ):
         super().__init__(admin_channel_id=admin_channel_id)
+        self.stream = stream
         self.generator_model = generator_model
         self.control_flow_model = control_flow_model
         self.milvus_uri = milvus_uri
@@ -61,16 +79,27 @@ class LiteratureExpert(Character):
         self.embedding_fn = embedding_function(embedding_model)
         log.info("Embedding model %s", embedding_model)
 
+        self.pre_routers = [
+            KeywordPreRouter(accept=book_keywords),
+            ExemplarPreRouter(
+                self.embedding_fn.encode_queries,
+                accept=example_questions,
+                reject=example_non_questions,
+            ),
+        ]
+
     def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
 
         log.info("handle? channel_id = %s, speaker_id = %s", channel_id, speaker_id)
 
         response = complete_simple(
+            chat_completion_client=None,
             model_id=self.control_flow_model,
             system_prompt=control_flow_system_prompt,
             user_prompt=wants_to_handle_template.format(
                 book_titles=", ".join([f'"{b.title}' for b in books]), text=utterance
             ),
+            temperature=0,
             response_format={
                 "type": "json_object",
                 "schema": WantsToHandleResponse.model_json_schema(),
@@ -91,6 +120,16 @@ class LiteratureExpert(Character):
         self, channel_id: str, speaker_id: str, utterance: str
     ) -> Generator[tuple[str, str], None, None]:
 
+        if self.stream:
+            yield channel_id, answer_question_stream(
+                utterance,
+                self.generator_model,
+                self.vector_db_client,
+                self.embedding_fn,
+                self.collection_name,
+            )
+            return
+
         yield channel_id, answer_question(
             utterance,
             self.generator_model,
@@ -67,6 +67,9 @@ class EchoScene(Scene):
         channel_name_to_id: dict,
     ) -> dict[str, Character]:
 
+        if self.channel_id not in channel_name_to_id:
+            return {}
+
         return {channel_name_to_id[self.channel_id]: self.echo_character}
 
 
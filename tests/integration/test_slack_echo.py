@@ -36,11 +36,13 @@ def setup_slack():
     production.prepare_props()
     console.print("Props are up-to-date.")
 
-    slack_admin_channel = config.get("slack", {}).get("admin_channel", None)
+    slack_config = config.get("slack", {})
+    slack_admin_channel = slack_config.get("admin_channel", None)
     slack_production_processor = SlackProductionProcessor(
         production,
         slack_admin_channel,
         console,
+        slack_config=slack_config,
     )
 
     time.sleep(2)
@@ -0,0 +1,153 @@
+from types import SimpleNamespace
+
+import time
+
+from proscenium.answer_cache import AnswerMatrix
+from proscenium.answer_cache import SemanticAnswerCache
+from proscenium.patterns.rag import answer_question
+from proscenium.patterns.rag import answer_question_stream
+
+vectors = {
+    "Why did Thoreau go to the woods?": [1.0, 0.0, 0.1],
+    "Why did Thoreau move to the woods?": [0.99, 0.0, 0.12],
+    "Who is Prometheus?": [0.0, 1.0, 0.0],
+}
+
+
+class LookupEmbedding:
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode_queries(self, queries: list[str]) -> list[list[float]]:
+        self.encoded += len(queries)
+        return [vectors[query] for query in queries]
+
+
+class OneChunkVectorDB:
+
+    def __init__(self):
+        self.searches = 0
+
+    def load_collection(self, collection_name: str) -> None:
+        pass
+
+    def search(self, **kwargs) -> list[list[dict]]:
+        self.searches += 1
+        return [[{"id": 1, "distance": 0.9, "entity": {"text": "Walden"}}]]
+
+
+class CountingChatCompletionClient:
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        self.calls += 1
+        if kwargs.get("stream", False):
+            return iter(
+                [
+                    SimpleNamespace(
+                        choices=[SimpleNamespace(delta=SimpleNamespace(content=text))]
+                    )
+                    for text in ["To live ", f"deliberately {self.calls}"]
+                ]
+            )
+        message = SimpleNamespace(content=f"To live deliberately {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def ask(query: str, cache: SemanticAnswerCache, db, embedding, client) -> str:
+    return answer_question(
+        query, "p:m", db, embedding, "books", client, answer_cache=cache
+    )
+
+
+def test_rephrased_questions_share_an_answer_until_invalidated():
+
+    cache = SemanticAnswerCache(threshold=0.95)
+    db, embedding, client = (
+        OneChunkVectorDB(),
+        LookupEmbedding(),
+        CountingChatCompletionClient(),
+    )
+
+    first = ask("Why did Thoreau go to the woods?", cache, db, embedding, client)
+    second = ask("Why did Thoreau move to the woods?", cache, db, embedding, client)
+    other = ask("Who is Prometheus?", cache, db, embedding, client)
+
+    assert first == second == "To live deliberately 1"
+    assert other == "To live deliberately 2"
+    assert db.searches == 2 and client.calls == 2
+    assert embedding.encoded == 3
+    assert cache.hits == 1 and cache.misses == 2
+
+    cache.invalidate("books")
+    again = ask("Why did Thoreau move to the woods?", cache, db, embedding, client)
+
+    assert again == "To live deliberately 3"
+
+
+def test_answers_are_kept_per_collection_and_model():
+
+    cache = SemanticAnswerCache(max_entries=1)
+    vector = vectors["Who is Prometheus?"]
+
+    cache.put("books", "p:m", "Who is Prometheus?", vector, "A titan")
+
+    assert cache.get("books", "p:other", vector) is None
+    assert cache.get("plays", "p:m", vector) is None
+    assert cache.get("books", "p:m", vector) == "A titan"
+
+    cache.put("books", "p:m", "Why did Thoreau go to the woods?", [1, 0, 0], "To live")
+
+    assert cache.get("books", "p:m", vector) is None
+    assert cache.stats()["entries"] == {"books": 1}
+
+
+def test_streamed_answers_are_cached_once_complete():
+
+    cache = SemanticAnswerCache()
+    db, embedding, client = (
+        OneChunkVectorDB(),
+        LookupEmbedding(),
+        CountingChatCompletionClient(),
+    )
+
+    def stream(query: str) -> str:
+        return "".join(
+            answer_question_stream(
+                query, "p:m", db, embedding, "books", client, answer_cache=cache
+            )
+        )
+
+    assert stream("Why did Thoreau go to the woods?") == "To live deliberately 1"
+    assert stream("Why did Thoreau move to the woods?") == "To live deliberately 1"
+    assert client.calls == 1
+
+
+def test_lookups_compare_questions_outside_the_lock(monkeypatch):
+
+    cache = SemanticAnswerCache(ttl_seconds=60)
+    vector = vectors["Who is Prometheus?"]
+    cache.put("books", "p:m", "Who is Prometheus?", vector, "A titan")
+
+    closest = AnswerMatrix.closest
+    matrices = []
+
+    def unlocked_closest(matrix, *args):
+        assert not cache._lock.locked()
+        matrices.append(matrix)
+        return closest(matrix, *args)
+
+    monkeypatch.setattr(AnswerMatrix, "closest", unlocked_closest)
+
+    assert cache.get("books", "p:m", vector) == "A titan"
+    assert cache.get("books", "p:m", vector) == "A titan"
+    assert matrices[0] is matrices[1]
+
+    monkeypatch.setattr(time, "time", lambda: matrices[0].earliest_expiry + 1)
+
+    assert cache.get("books", "p:m", vector) is None
+    assert cache.stats()["entries"] == {"books": 0}
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from proscenium import Character
+from proscenium.patterns.routing import BatchRouter
+from proscenium.patterns.routing import CandidateSelector
+from proscenium.patterns.routing import select_best
+from proscenium.patterns.routing import select_first
+from proscenium.routing import KeywordPreRouter
+
+
+class FakeChatCompletionClient:
+
+    def __init__(self, content: str):
+        self.content = content
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        self.requests.append(messages)
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class Poet(Character):
+    """Answers questions about poetry."""
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        raise AssertionError("Decided by the batch router")
+
+
+class Mathematician(Poet):
+    """Answers questions about arithmetic."""
+
+
+class Chemist(Poet):
+    """Answers questions about chemistry."""
+
+
+def test_one_call_routes_all_undecided_characters():
+
+    client = FakeChatCompletionClient(
+        json.dumps(
+            {
+                "decisions": [
+                    {"character": "Poet", "wants_to_handle": True},
+                    {"character": "Mathematician", "wants_to_handle": False},
+                ]
+            }
+        )
+    )
+    poet = Poet(None)
+    mathematician = Mathematician(None)
+    chemist = Chemist(None, pre_routers=[KeywordPreRouter(reject=["sonnet"])])
+
+    router = BatchRouter(client, "provider:model")
+    chosen = router.route(
+        [poet, mathematician, chemist], "C1", "U1", "Who wrote this sonnet?"
+    )
+
+    assert chosen == [poet]
+    assert len(client.requests) == 1
+    assert "Mathematician: Answers questions about arithmetic." in (
+        client.requests[0][1]["content"]
+    )
+    assert "Chemist" not in client.requests[0][1]["content"], "Pre-routed"
+
+    router.route([poet, mathematician], "C1", "U1", "who wrote this sonnet")
+    assert len(client.requests) == 1, "Decisions are cached per character"
+
+
+def test_instances_of_one_class_get_their_own_decisions():
+
+    client = FakeChatCompletionClient(
+        json.dumps(
+            {
+                "decisions": [
+                    {"character": "Poet", "wants_to_handle": False},
+                    {"character": "Poet #2", "wants_to_handle": True},
+                ]
+            }
+        )
+    )
+    sonnets, haiku = Poet(None), Poet(None)
+
+    chosen = BatchRouter(client, "provider:model").route(
+        [sonnets, haiku], "C1", "U1", "Write me a haiku"
+    )
+
+    assert chosen == [haiku]
+    assert "- Poet #2: Answers questions about poetry." in (
+        client.requests[0][1]["content"]
+    )
+    assert sonnets.quick_decision("Write me a haiku") is False
+
+
+class Sleeper(Character):
+
+    def __init__(self, name: str, seconds: float, accepts: bool):
+        super().__init__(admin_channel_id=None)
+        self._name = name
+        self.seconds = seconds
+        self.accepts = accepts
+
+    def name(self) -> str:
+        return self._name
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        time.sleep(self.seconds)
+        return self.accepts
+
+
+def test_candidates_decide_in_parallel():
+
+    candidates = [
+        Sleeper("slow", 0.3, True),
+        Sleeper("fast", 0.1, True),
+        Sleeper("never", 0.1, False),
+    ]
+
+    first = CandidateSelector(selection=select_first)
+    start = time.monotonic()
+    assert first.select(candidates, "C1", "U1", "first").name() == "fast"
+    assert time.monotonic() - start < 0.25
+
+    best = CandidateSelector(selection=select_best)
+    start = time.monotonic()
+    assert best.select(candidates, "C1", "U1", "best").name() == "slow"
+    assert time.monotonic() - start < 0.5, "Not 0.5 seconds one after another"
+
+    late = CandidateSelector(selection=select_best, deadline_seconds=0.2)
+    assert late.select(candidates, "C1", "U1", "late").name() == "fast"
+
+    for selector in [first, best, late]:
+        selector.shutdown()
+
+
+def test_candidates_decide_in_parallel_async():
+
+    candidates = [Sleeper("slow", 0.3, True), Sleeper("fast", 0.1, True)]
+    selector = CandidateSelector(selection=select_first, deadline_seconds=1.0)
+
+    chosen = asyncio.run(selector.aselect(candidates, "C1", "U1", "async"))
+
+    assert chosen.name() == "fast"
+    selector.shutdown()
@@ -0,0 +1,15 @@
+from benchmark.harness import run_benchmark
+
+
+def test_benchmark_against_fake_slack():
+
+    result = run_benchmark(
+        events=20,
+        channels=4,
+        slack_config={"connections": {"count": 1}},
+        timeout_seconds=30.0,
+    )
+
+    assert result.replies == 20, "Every message is echoed back"
+    assert result.shed == 0
+    assert 0 < result.percentile(50) <= result.percentile(99)
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import httpx
+
+from aisuite.providers import together_provider
+
+from proscenium.clients import ClientRegistry
+from proscenium.clients import provider_streams
+from proscenium.clients import resolve_client
+from proscenium.complete import complete_simple_stream
+
+
+def test_one_lazily_built_client_per_provider():
+
+    registry = ClientRegistry(provider_configs={"openai": {"api_key": "k"}})
+    assert registry.providers() == []
+
+    client = registry.client("openai:gpt-4o")
+    assert registry.client("openai:gpt-4o-mini") is client
+    assert registry.client("ollama:llama3.2") is not client
+    assert registry.providers() == ["openai", "ollama"]
+
+    assert resolve_client(client, "ollama:llama3.2") is client
+
+
+class OneShotChatCompletionClient:
+    """Answers in one response and refuses to stream, like Together's."""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        self.requests.append(kwargs)
+        if kwargs.get("stream", False):
+            raise AssertionError("asked a non-streaming provider to stream")
+        message = SimpleNamespace(content="Forty-two.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_providers_that_cannot_stream_are_completed_in_one_piece():
+
+    assert provider_streams("openai:gpt-4o")
+    assert not provider_streams("together:meta-llama/Llama-3.3-70B")
+
+    client = OneShotChatCompletionClient()
+    chunks = complete_simple_stream(
+        client, "together:meta-llama/Llama-3.3-70B", "system", "user"
+    )
+
+    assert list(chunks) == ["Forty-two."]
+    assert client.requests == [{}]
+
+
+def test_per_request_providers_share_one_pooled_session(monkeypatch):
+
+    monkeypatch.setattr(together_provider, "httpx", together_provider.httpx)
+
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.host)
+        message = {"role": "assistant", "content": "Hello."}
+        return httpx.Response(200, json={"choices": [{"message": message}]})
+
+    http = httpx.Client(transport=httpx.MockTransport(handler))
+    registry = ClientRegistry(
+        provider_configs={"together": {"api_key": "k"}}, http=http
+    )
+    client = registry.client("together:meta-llama/Llama-3.3-70B")
+
+    for _ in range(2):
+        response = client.chat.completions.create(
+            model="together:meta-llama/Llama-3.3-70B",
+            messages=[{"role": "user", "content": "Hi"}],
+        )
+        assert response.choices[0].message.content == "Hello."
+
+    assert requests == ["api.together.xyz", "api.together.xyz"]
+    assert together_provider.httpx.http is http
@@ -0,0 +1,108 @@
+import json
+from types import SimpleNamespace
+
+from aisuite import Client as AISuiteClient
+
+import proscenium.complete
+from proscenium.complete import complete_batch
+from proscenium.complete import complete_batch_stream
+from proscenium.provider_batch import provider_batch_client
+
+
+class FlakyChatCompletionClient:
+
+    def __init__(self, failures: dict[str, int]):
+        self.failures = failures
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        user_prompt = messages[-1]["content"]
+        if self.failures.get(user_prompt, 0) > 0:
+            self.failures[user_prompt] -= 1
+            raise ConnectionError(f"no answer to {user_prompt}")
+        message = SimpleNamespace(content=user_prompt.upper())
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_complete_batch_orders_and_retries():
+
+    client = FlakyChatCompletionClient({"b": 1, "c": 5})
+    prompts = [("system", p) for p in ["a", "b", "c", "d"]]
+
+    responses = complete_batch(
+        client, "p:m", prompts, parallelism=2, retries=1, backoff_seconds=0, cache=False
+    )
+
+    assert responses[:2] == ["A", "B"] and responses[3] == "D"
+    assert isinstance(responses[2], ConnectionError)
+
+    streamed = complete_batch_stream(client, "p:m", prompts[:2], cache=False)
+    assert sorted(streamed) == [(0, "A"), (1, "B")]
+
+
+class FakeBatchClient:
+    """Answers batches like OpenAI's Batch API, failing the request for "b"."""
+
+    def __init__(self, fail_batch: bool = False):
+        self.fail_batch = fail_batch
+        self.submitted = []
+        self.files = SimpleNamespace(create=self.create_file, content=self.content)
+        self.batches = SimpleNamespace(create=self.create_batch)
+
+    def create_file(self, file, purpose: str):
+        self.submitted = [json.loads(line) for line in file[1].read().splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str):
+        if self.fail_batch:
+            raise ConnectionError("batch endpoint unavailable")
+        return SimpleNamespace(id="batch-1", status="completed", output_file_id="out")
+
+    def content(self, file_id: str):
+        lines = []
+        for request in self.submitted:
+            prompt = request["body"]["messages"][-1]["content"]
+            if prompt == "b":
+                response = {"status_code": 500, "body": {}}
+            else:
+                message = {"content": f"batched {prompt}"}
+                response = {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": message}]},
+                }
+            lines.append(
+                json.dumps({"custom_id": request["custom_id"], "response": response})
+            )
+        return SimpleNamespace(text="\n".join(lines))
+
+
+def test_provider_batch_falls_back_per_prompt(monkeypatch):
+
+    prompts = [("system", p) for p in ["a", "b", "c"]]
+    client = FlakyChatCompletionClient({})
+
+    for fail_batch, expected in [
+        (False, ["batched a", "B", "batched c"]),
+        (True, ["A", "B", "C"]),
+    ]:
+        batch_client = FakeBatchClient(fail_batch)
+        monkeypatch.setattr(
+            proscenium.complete,
+            "provider_batch_client",
+            lambda chat_completion_client, model_id: batch_client,
+        )
+
+        responses = complete_batch(
+            client, "openai:m", prompts, provider_batch=True, cache=False
+        )
+
+        assert responses == expected
+        assert [r["body"]["model"] for r in batch_client.submitted] == ["m"] * 3
+
+
+def test_batch_client_is_configured_like_the_provider():
+
+    client = AISuiteClient(provider_configs={"openai": {"api_key": "sk-test"}})
+
+    assert provider_batch_client(client, "together:m") is None
+    assert provider_batch_client(client, "openai:m").api_key == "sk-test"
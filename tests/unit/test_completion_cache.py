@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+from proscenium.complete import complete_simple
+from proscenium.completion_cache import CompletionCache
+from proscenium.completion_cache import completion_key
+from proscenium.completion_cache import set_default_completion_cache
+
+
+class CountingChatCompletionClient:
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=f"response {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_repeated_prompts_are_answered_from_cache(tmp_path):
+
+    client = CountingChatCompletionClient()
+    cache = CompletionCache(path=tmp_path / "completions.sqlite")
+
+    first = complete_simple(client, "m", "system", "user", cache=cache)
+    again = complete_simple(client, "m", "system", "user", cache=cache, timeout=5)
+    other = complete_simple(client, "m", "system", "user", cache=cache, temperature=1)
+
+    assert first == again == "response 1"
+    assert other == "response 2", "temperature is part of the key"
+    assert client.calls == 2
+    assert cache.memory_hits == 1 and cache.misses == 2
+
+    restarted = CompletionCache(path=tmp_path / "completions.sqlite")
+    assert complete_simple(client, "m", "system", "user", cache=restarted) == first
+    assert restarted.disk_hits == 1
+
+
+def test_completion_cache_bounds():
+
+    cache = CompletionCache(memory_entries=2, ttl_seconds=60)
+    for i in range(3):
+        cache.put(completion_key("m", [], {"i": i}), str(i))
+
+    assert cache.get(completion_key("m", [], {"i": 0})) is None, "Evicted"
+    assert cache.get(completion_key("m", [], {"i": 2})) == "2"
+
+    expired = CompletionCache(ttl_seconds=0)
+    expired.put("key", "value")
+    assert expired.get("key") is None
+
+
+def test_default_cache_only_answers_deterministic_calls():
+
+    client = CountingChatCompletionClient()
+    set_default_completion_cache(CompletionCache())
+    try:
+        sampled = [complete_simple(client, "m", "s", "u") for _ in range(2)]
+        decided = [
+            complete_simple(client, "m", "s", "u", temperature=0) for _ in range(2)
+        ]
+        opted_in = complete_simple(client, "m", "s", "v", cache=True)
+        assert complete_simple(client, "m", "s", "v", cache=True) == opted_in
+    finally:
+        set_default_completion_cache(None)
+
+    assert sampled == ["response 1", "response 2"]
+    assert decided == ["response 3", "response 3"]
+    assert client.calls == 4
+
+
+def test_disk_cache_is_trimmed_once_full(tmp_path):
+
+    cache = CompletionCache(
+        path=tmp_path / "completions.sqlite",
+        memory_entries=1,
+        max_entries=10,
+        touch_batch=2,
+    )
+    for i in range(10):
+        cache.put(f"key {i}", str(i))
+    for i in [0, 1]:
+        assert cache.get(f"key {i}") == str(i)
+
+    cache.put("key 10", "10")
+
+    rows = cache._db.execute("SELECT key FROM completions").fetchall()
+    kept = {key for (key,) in rows}
+    assert len(kept) == 9
+    assert {"key 0", "key 1", "key 10"} <= kept, "Recently used are kept"
+    assert "key 2" not in kept
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import asyncio
+import threading
+import time
+
+from proscenium.complete import acomplete_simple
+from proscenium.complete import complete_simple
+from proscenium.concurrency import ProviderLimiter
+from proscenium.concurrency import default_limiter
+from proscenium.concurrency import set_default_limiter
+
+
+class SlowChatCompletionClient:
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=self)
+
+    def _start(self):
+        with self.lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+
+    def _finish(self, model: str):
+        with self.lock:
+            self.in_flight -= 1
+        message = SimpleNamespace(content=f"response from {model}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def create(self, model: str, messages: list, **kwargs):
+        self._start()
+        time.sleep(self.seconds)
+        return self._finish(model)
+
+    async def acreate(self, model: str, messages: list, **kwargs):
+        self._start()
+        await asyncio.sleep(self.seconds)
+        return self._finish(model)
+
+
+def test_provider_limit_is_shared_by_threads_and_tasks():
+
+    previous = default_limiter()
+    set_default_limiter(ProviderLimiter(limits={"p": 2}))
+    client = SlowChatCompletionClient(0.05)
+
+    async def calls():
+        threads = [
+            threading.Thread(
+                target=complete_simple,
+                args=(client, "p:m", "s", "u"),
+                kwargs={"cache": False},
+            )
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        responses = await asyncio.gather(
+            *[acomplete_simple(client, "p:m", "s", "u", cache=False) for _ in range(5)]
+        )
+        for thread in threads:
+            await asyncio.to_thread(thread.join)
+        return responses
+
+    try:
+        responses = asyncio.run(calls())
+    finally:
+        set_default_limiter(previous)
+
+    assert responses == ["response from p:m"] * 5
+    assert client.most_in_flight == 2
+
+
+def test_cancelled_waiter_gives_up_its_place():
+
+    limiter = ProviderLimiter(default_limit=1)
+
+    async def scenario():
+        async with limiter.alimit("p:m"):
+            waiter = asyncio.create_task(limiter.slots("p").aacquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+        async with limiter.alimit("p:m"):
+            return limiter.stats()["p"]
+
+    assert asyncio.run(scenario()) == {"limit": 1, "in_flight": 1, "waiting": 0}
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+from proscenium.interfaces.dispatch import ChannelDispatcher
+from proscenium.interfaces.dispatch import AsyncChannelDispatcher
+from proscenium.interfaces.dispatch import AdmissionController
+from proscenium.interfaces.dispatch import DedupCache
+from proscenium.interfaces.dispatch import admission_accepted
+from proscenium.interfaces.dispatch import admission_deferred
+from proscenium.interfaces.dispatch import admission_shed
+from proscenium.interfaces.dispatch import high_priority
+from proscenium.interfaces.dispatch import low_priority
+
+
+def test_same_channel_runs_in_order():
+
+    dispatcher = ChannelDispatcher(workers=4, queue_depth=100)
+    seen = []
+
+    def work(i: int):
+        time.sleep(0.001 * (5 - i % 5))
+        seen.append(i)
+
+    for i in range(20):
+        assert dispatcher.submit("C1", work, i)
+
+    dispatcher.shutdown()
+    assert seen == list(range(20)), "Work for one channel is serialized in order"
+
+
+def test_different_channels_run_in_parallel():
+
+    dispatcher = ChannelDispatcher(workers=2, queue_depth=10)
+    barrier = threading.Barrier(2, timeout=5)
+
+    def work():
+        barrier.wait()
+
+    dispatcher.submit("C1", work)
+    dispatcher.submit("C2", work)
+    dispatcher.shutdown()
+
+    assert not barrier.broken, "Two channels ran concurrently"
+
+
+def test_queue_depth_is_bounded():
+
+    dispatcher = ChannelDispatcher(workers=1, queue_depth=2)
+    release = threading.Event()
+
+    assert dispatcher.submit("C1", release.wait)
+    assert dispatcher.submit("C1", release.wait)
+    assert not dispatcher.submit("C2", release.wait), "Third item is refused"
+
+    release.set()
+    dispatcher.shutdown()
+    assert dispatcher.depth() == 0
+
+
+def test_admission_sheds_and_defers_low_priority():
+
+    dispatcher = ChannelDispatcher(workers=1, queue_depth=10)
+    admission = AdmissionController(
+        dispatcher,
+        high_water=2,
+        low_priority_high_water=1,
+        defer_low_priority=True,
+        max_deferred=1,
+    )
+    release = threading.Event()
+    ran = []
+
+    assert admission.admit("C1", high_priority, release.wait) == admission_accepted
+    assert admission.admit("C2", low_priority, ran.append, "a") == admission_deferred
+    assert admission.admit("C2", low_priority, ran.append, "b") == admission_shed
+    assert admission.admit("C3", high_priority, ran.append, "c") == admission_accepted
+    assert admission.admit("C3", high_priority, ran.append, "d") == admission_shed
+
+    release.set()
+    deadline = time.time() + 5
+    while admission.deferred() > 0 and time.time() < deadline:
+        time.sleep(0.01)
+    dispatcher.shutdown()
+
+    assert sorted(ran) == ["a", "c"], "Deferred event ran once load dropped"
+
+
+def test_dedup_cache_counts_duplicates():
+
+    dedup = DedupCache(max_entries=3, ttl_seconds=60)
+
+    assert not dedup.seen(["event:E1", "ts:C1:1.0"])
+    assert dedup.seen(["event:E2", "ts:C1:1.0"]), "Same message, new event id"
+    assert not dedup.seen(["event:E3"])
+    assert not dedup.seen(["event:E4"])
+
+    assert len(dedup) == 3, "Oldest entries are evicted"
+    assert (dedup.hits, dedup.misses) == (1, 3)
+
+
+def test_dedup_cache_expires_entries():
+
+    dedup = DedupCache(ttl_seconds=0.01)
+
+    assert not dedup.seen(["event:E1"])
+    time.sleep(0.02)
+    assert not dedup.seen(["event:E1"]), "Expired keys are forgotten"
+
+
+def test_async_dispatcher_orders_each_channel():
+
+    seen = []
+
+    async def work(channel_id: str, i: int):
+        await asyncio.sleep(0.001 * (3 - i % 3))
+        seen.append((channel_id, i))
+
+    async def run():
+        dispatcher = AsyncChannelDispatcher(concurrency=4, queue_depth=100)
+        for i in range(6):
+            assert dispatcher.submit("C1", work, "C1", i)
+            assert dispatcher.submit("C2", work, "C2", i)
+        await dispatcher.join()
+        assert dispatcher.depth() == 0
+
+    asyncio.run(run())
+
+    for channel_id in ["C1", "C2"]:
+        assert [i for c, i in seen if c == channel_id] == list(range(6))
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import asyncio
+import time
+
+from proscenium.clients import ClientRegistry
+from proscenium.clients import default_client_registry
+from proscenium.clients import set_default_client_registry
+from proscenium.complete import acomplete_simple
+from proscenium.complete import complete_simple
+from proscenium.concurrency import default_limiter
+from proscenium.failover import Failover
+from proscenium.failover import set_default_failover
+from proscenium.metrics import MetricsRegistry
+from proscenium.metrics import MetricsSubscriber
+from proscenium.tracing import add_subscriber
+from proscenium.tracing import remove_subscriber
+
+
+class ScriptedChatCompletionClient:
+    """Answers after `delays[model]` seconds, or fails if the delay is None."""
+
+    def __init__(self, delays: dict):
+        self.delays = delays
+        self.cancelled = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def _response(self, model: str):
+        if self.delays[model] is None:
+            raise ConnectionError(f"{model} is down")
+        message = SimpleNamespace(content=f"response from {model}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def create(self, model: str, messages: list, **kwargs):
+        time.sleep(self.delays[model] or 0)
+        return self._response(model)
+
+    async def acreate(self, model: str, messages: list, **kwargs):
+        try:
+            await asyncio.sleep(self.delays[model] or 0)
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        return self._response(model)
+
+
+def with_failover(client, failover, call):
+
+    registry = ClientRegistry()
+    registry._clients = {"p": client, "q": client}
+    previous = default_client_registry()
+    set_default_client_registry(registry)
+    set_default_failover(failover)
+    try:
+        return call()
+    finally:
+        set_default_failover(None)
+        set_default_client_registry(previous)
+
+
+def test_slow_primary_is_hedged():
+
+    client = ScriptedChatCompletionClient({"p:slow": 1.0, "q:fast": 0.01})
+    failover = Failover(fallbacks={"p:slow": ["q:fast"]}, hedge_after_seconds=0.05)
+
+    started = time.monotonic()
+    response = with_failover(
+        client,
+        failover,
+        lambda: asyncio.run(acomplete_simple(None, "p:slow", "s", "u", cache=False)),
+    )
+
+    assert response == "response from q:fast"
+    assert time.monotonic() - started < 0.5
+    assert client.cancelled == ["p:slow"]
+    assert failover.hedges == 1 and failover.fallback_wins == 1
+
+
+def test_abandoned_hedge_frees_its_slot_and_trips_the_breaker():
+
+    client = ScriptedChatCompletionClient({"p:stalled": 0.5, "q:fast": 0.01})
+    failover = Failover(
+        fallbacks={"p:stalled": ["q:fast"]},
+        hedge_after_seconds=0.05,
+        breaker_config={"failures": 1},
+    )
+
+    response = with_failover(
+        client,
+        failover,
+        lambda: complete_simple(None, "p:stalled", "s", "u", cache=False),
+    )
+
+    assert response == "response from q:fast"
+    assert default_limiter().slots("p").in_flight == 0
+    assert failover.stats()["breakers"]["p"] == {"open": True, "times_opened": 1}
+    assert failover.chain("p:stalled") == ["q:fast"]
+
+
+def test_failing_provider_trips_its_breaker():
+
+    client = ScriptedChatCompletionClient({"p:down": None, "q:up": 0})
+    failover = Failover(
+        fallbacks={"p:down": ["q:up"]},
+        breaker_config={"failures": 2, "reset_seconds": 60},
+    )
+
+    def calls():
+        return [
+            complete_simple(None, "p:down", "s", "u", cache=False) for _ in range(3)
+        ]
+
+    assert with_failover(client, failover, calls) == ["response from q:up"] * 3
+    assert failover.chain("p:down") == ["q:up"]
+    assert failover.stats()["breakers"]["p"] == {"open": True, "times_opened": 1}
+
+
+def test_metrics_are_labelled_by_the_serving_model():
+
+    client = ScriptedChatCompletionClient({"p:down": None, "q:up": 0})
+    failover = Failover(fallbacks={"p:down": ["q:up"]})
+    subscriber = MetricsSubscriber(MetricsRegistry())
+    add_subscriber(subscriber)
+    try:
+        with_failover(
+            client,
+            failover,
+            lambda: complete_simple(None, "p:down", "s", "u", cache=False),
+        )
+    finally:
+        remove_subscriber(subscriber)
+
+    assert subscriber.requests.value("q:up", "complete_simple") == 1
+    assert subscriber.requests.value("p:down", "complete_simple") == 0
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+from urllib.request import urlopen
+
+from proscenium import Character
+from proscenium.complete import complete_simple
+from proscenium.interfaces.dispatch import DedupCache
+from proscenium.interfaces.slack import register_slack_metrics
+from proscenium.metrics import MetricsRegistry
+from proscenium.metrics import MetricsServer
+from proscenium.metrics import MetricsSubscriber
+from proscenium.metrics import start_metrics
+from proscenium.tracing import add_subscriber
+from proscenium.tracing import remove_subscriber
+from proscenium.tracing import subscribers
+
+
+class UsageChatCompletionClient:
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        if messages[-1]["content"] == "fail":
+            raise ConnectionError("provider unavailable")
+        message = SimpleNamespace(content="answer")
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_completion_metrics_are_served():
+
+    registry = MetricsRegistry()
+    subscriber = MetricsSubscriber(registry)
+    add_subscriber(subscriber)
+    client = UsageChatCompletionClient()
+    try:
+        for prompt in ["one", "two", "fail"]:
+            try:
+                complete_simple(client, "p:m", "s", prompt, cache=False)
+            except ConnectionError:
+                pass
+    finally:
+        remove_subscriber(subscriber)
+
+    labels = ("p:m", "complete_simple")
+    assert subscriber.requests.value(*labels) == 3
+    assert subscriber.errors.value(*labels) == 1
+    assert subscriber.prompt_tokens.value(*labels) == 24
+    assert subscriber.completion_tokens.value(*labels) == 6
+
+    server = MetricsServer(registry, port=0)
+    server.start()
+    try:
+        with urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            text = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+    assert (
+        'proscenium_completion_requests_total{model_id="p:m",'
+        'call_site="complete_simple"} 3.0'
+    ) in text
+    assert "proscenium_completion_latency_seconds_bucket" in text
+
+
+class Speculator(Character):
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        return True
+
+
+class FixedPlaces:
+
+    def __init__(self, places: dict):
+        self._places = places
+
+    def places(self) -> dict:
+        return self._places
+
+
+def test_slack_counts_are_read_at_each_scrape():
+
+    registry = MetricsRegistry()
+    dedup = DedupCache()
+    speculator = Speculator(None, speculate=True)
+    register_slack_metrics(
+        registry, dedup, FixedPlaces({"C1": speculator, "C2": [speculator]})
+    )
+
+    dedup.seen(["event:E1"])
+    dedup.seen(["event:E1"])
+    speculator.speculation_stats.start()
+    speculator.speculation_stats.waste(2.5)
+    text = registry.exposition()
+
+    assert "proscenium_slack_duplicate_events_total 1.0" in text
+    assert "proscenium_slack_events_total 1.0" in text
+    assert 'proscenium_speculations_started_total{character="Speculator"} 1.0' in text
+    assert (
+        'proscenium_speculation_wasted_seconds_total{character="Speculator"} 2.5'
+    ) in text
+
+    dedup.seen(["event:E1"])
+    assert "proscenium_slack_duplicate_events_total 2.0" in registry.exposition()
+
+
+def test_metrics_port_in_use_is_not_fatal():
+
+    before = subscribers()
+    first = start_metrics({"enabled": True, "port": 0})
+    try:
+        second = start_metrics({"enabled": True, "port": first.port})
+    finally:
+        first.shutdown()
+        for subscriber in subscribers():
+            if subscriber not in before:
+                remove_subscriber(subscriber)
+
+    assert second is None
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+from proscenium.complete import complete_simple
+from proscenium.metrics import MetricsRegistry
+from proscenium.metrics import MetricsSubscriber
+from proscenium.prompt_cache import PromptCaching
+from proscenium.tokens import TokenAccounting
+from proscenium.tokens import set_default_token_accounting
+from proscenium.tracing import add_subscriber
+from proscenium.tracing import remove_subscriber
+
+messages = [
+    {"role": "system", "content": "You are a calculator."},
+    {"role": "user", "content": "What is 2 + 2?"},
+]
+
+tools = [{"type": "function", "function": {"name": "add"}}]
+
+
+class CachingChatCompletionClient:
+    """Records requests and reports `cached_tokens` of each prompt as cached."""
+
+    def __init__(self, cached_tokens: int):
+        self.cached_tokens = cached_tokens
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        self.requests.append((model, messages, kwargs))
+        usage = SimpleNamespace(
+            prompt_tokens=100,
+            completion_tokens=5,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=self.cached_tokens),
+        )
+        message = SimpleNamespace(content="4")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_anthropic_system_prompt_is_marked_cacheable():
+
+    marked, kwargs = PromptCaching().prepare("anthropic:claude", messages, {})
+
+    assert marked[0]["content"] == [
+        {
+            "type": "text",
+            "text": "You are a calculator.",
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+    assert marked[1] is messages[1]
+    assert messages[0]["content"] == "You are a calculator."
+    assert kwargs == {}
+
+
+def test_openai_calls_sharing_a_prefix_share_a_cache_key():
+
+    caching = PromptCaching()
+
+    _, first = caching.prepare("openai:gpt-4o", messages, {"tools": tools})
+    other = messages[:1] + [{"role": "user", "content": "And 3 + 3?"}]
+    _, second = caching.prepare("openai:gpt-4o", other, {"tools": tools})
+    _, untooled = caching.prepare("openai:gpt-4o", messages, {})
+    _, explicit = caching.prepare(
+        "openai:gpt-4o", messages, {"prompt_cache_key": "mine"}
+    )
+
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+    assert first["prompt_cache_key"] != untooled["prompt_cache_key"]
+    assert explicit["prompt_cache_key"] == "mine"
+
+
+def test_other_providers_and_disabled_caching_leave_requests_alone():
+
+    assert PromptCaching().prepare("together:m", messages, {}) == (messages, {})
+    assert PromptCaching(enabled=False).prepare("anthropic:c", messages, {}) == (
+        messages,
+        {},
+    )
+
+
+def test_cached_prompt_tokens_are_reported():
+
+    accounting = TokenAccounting()
+    set_default_token_accounting(accounting)
+    registry = MetricsRegistry()
+    subscriber = MetricsSubscriber(registry)
+    add_subscriber(subscriber)
+    client = CachingChatCompletionClient(cached_tokens=80)
+
+    try:
+        complete_simple(client, "anthropic:claude", "You are terse.", "Hi", cache=False)
+    finally:
+        remove_subscriber(subscriber)
+        set_default_token_accounting(TokenAccounting())
+
+    _, sent, _ = client.requests[0]
+    assert sent[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert accounting.usage["anthropic:claude"].cached_tokens == 80
+    assert (
+        subscriber.cached_prompt_tokens.value("anthropic:claude", "complete_simple")
+        == 80
+    )
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from proscenium import Character
+from proscenium.routing import ExemplarPreRouter
+from proscenium.routing import KeywordPreRouter
+from proscenium.routing import RegexPreRouter
+from proscenium.routing import RoutingCache
+from proscenium.routing import normalize_utterance
+
+
+class CountingCharacter(Character):
+
+    def __init__(self, routing_cache: RoutingCache = None):
+        super().__init__(admin_channel_id=None, routing_cache=routing_cache)
+        self.control_flow_model = "provider:model"
+        self.calls = 0
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        self.calls += 1
+        return "fire" in utterance.lower()
+
+
+def test_normalize_utterance():
+
+    assert normalize_utterance("<@U123>  What did   Hermes say?") == (
+        "what did hermes say"
+    )
+
+
+def test_repeated_utterances_skip_wants_to_handle():
+
+    character = CountingCharacter()
+
+    assert character.decide_to_handle("C1", "U1", "Who stole fire?")
+    assert character.decide_to_handle("C2", "U2", "who stole  FIRE")
+    assert not character.decide_to_handle("C1", "U1", "What is 2+2?")
+
+    assert character.calls == 2
+    assert character.routing_cache.hits == 1
+
+
+def test_routing_cache_expires_and_evicts():
+
+    cache = RoutingCache(max_entries=2, ttl_seconds=0.0)
+    character = CountingCharacter(cache)
+
+    character.decide_to_handle("C1", "U1", "fire")
+    character.decide_to_handle("C1", "U1", "fire")
+    assert character.calls == 2, "Expired decisions are made again"
+
+    cache.ttl_seconds = 60.0
+    for utterance in ["a", "b", "c"]:
+        character.decide_to_handle("C1", "U1", utterance)
+    assert len(cache) == 2
+
+
+class SpeakerCharacter(CountingCharacter):
+
+    def __init__(self):
+        Character.__init__(self, admin_channel_id=None, routing_cache=False)
+        self.calls = 0
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        self.calls += 1
+        return speaker_id == "U1"
+
+
+def test_speaker_dependent_decisions_can_skip_the_cache():
+
+    character = SpeakerCharacter()
+
+    assert character.decide_to_handle("C1", "U1", "hello")
+    assert not character.decide_to_handle("C1", "U2", "hello")
+    assert character.calls == 2
+    assert len(character.routing_cache) == 0
+
+
+def test_pre_routers_decide_before_wants_to_handle():
+
+    character = CountingCharacter()
+    character.pre_routers = [
+        KeywordPreRouter(accept=["Prometheus"], reject=["lunch menu"]),
+        RegexPreRouter(accept=[r"\d+\s*[-+*/]\s*\d+"]),
+    ]
+
+    assert character.decide_to_handle("C1", "U1", "Was prometheus punished?")
+    assert not character.decide_to_handle("C1", "U1", "What's on the LUNCH menu?")
+    assert character.decide_to_handle("C1", "U1", "What is 3 + 4")
+    assert character.calls == 0
+
+    assert character.decide_to_handle("C1", "U1", "Tell me about fire")
+    assert character.calls == 1, "Ambiguous utterances fall back to the LLM"
+
+
+def test_exemplar_pre_router():
+
+    vectors = {"fire": [1.0, 0.0], "math": [0.0, 1.0], "both": [1.0, 1.0]}
+
+    def embed(texts: list[str]) -> list[list[float]]:
+        return [vectors[text] for text in texts]
+
+    pre_router = ExemplarPreRouter(embed, accept=["fire"], reject=["math"])
+
+    assert pre_router.route("fire") is True
+    assert pre_router.route("math") is False
+    assert pre_router.route("both") is None
+    assert pre_router.counts == {True: 1, False: 1, None: 1}
+
+
+def test_pre_router_counts_every_thread():
+
+    pre_router = KeywordPreRouter(accept=["fire"], reject=["math"])
+
+    def route_many():
+        for _ in range(1000):
+            pre_router.route("fire")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(8):
+            executor.submit(route_many)
+
+    assert pre_router.counts == {True: 8000, False: 0, None: 0}
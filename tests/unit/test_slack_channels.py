@@ -0,0 +1,207 @@
+from types import SimpleNamespace
+
+from rich.console import Console
+from slack_sdk.errors import SlackApiError
+
+from proscenium import Character
+from proscenium.admin import Admin
+from proscenium.interfaces.dispatch import DedupCache
+from proscenium.interfaces.slack import ChannelDirectory
+from proscenium.interfaces.slack import Places
+from proscenium.interfaces.slack import make_slack_listener
+from proscenium.interfaces.slack_outbound import SlackSender
+
+
+class PagedWebClient:
+
+    def __init__(self, pages: list[list[dict]]):
+        self.pages = pages
+        self.cursors = []
+
+    def users_conversations(self, types: str, limit: int, cursor: str = None):
+        self.cursors.append(cursor)
+        index = 0 if cursor is None else int(cursor)
+        next_cursor = str(index + 1) if index + 1 < len(self.pages) else ""
+        return {
+            "channels": self.pages[index],
+            "response_metadata": {"next_cursor": next_cursor},
+        }
+
+    def conversations_info(self, channel: str):
+        return {"channel": {"id": channel, "name": "joined"}}
+
+
+def test_load_follows_cursor():
+
+    client = PagedWebClient(
+        [
+            [{"id": "C1", "name": "one"}],
+            [{"id": "C2", "name": "two"}],
+            [{"id": "C3", "name": "three"}],
+        ]
+    )
+    directory = ChannelDirectory(client, "U0", refresh_seconds=None)
+    directory.load()
+
+    assert client.cursors == [None, "1", "2"]
+    assert directory.channel_name_to_id() == {"one": "C1", "two": "C2", "three": "C3"}
+
+
+def test_channel_events_update_directory():
+
+    client = PagedWebClient([[{"id": "C1", "name": "one"}]])
+    directory = ChannelDirectory(client, "U0", refresh_seconds=None)
+    directory.load()
+
+    directory.apply_event(
+        {"type": "channel_rename", "channel": {"id": "C1", "name": "uno"}}
+    )
+    directory.apply_event(
+        {"type": "member_joined_channel", "user": "U0", "channel": "C2"}
+    )
+    directory.apply_event(
+        {"type": "member_joined_channel", "user": "U9", "channel": "C3"}
+    )
+
+    assert directory.channel_name_to_id() == {"uno": "C1", "joined": "C2"}
+
+    directory.apply_event(
+        {"type": "member_left_channel", "user": "U0", "channel": "C2"}
+    )
+    assert directory.get("C2") is None
+
+    assert not directory.apply_event({"type": "message", "channel": "C1"})
+
+
+def test_only_channels_the_bot_is_in_are_added():
+
+    client = PagedWebClient([[{"id": "C1", "name": "one"}]])
+    directory = ChannelDirectory(client, "U0", refresh_seconds=None)
+    directory.load()
+
+    directory.apply_event(
+        {"type": "channel_created", "channel": {"id": "C2", "name": "elsewhere"}}
+    )
+    directory.apply_event(
+        {
+            "type": "channel_created",
+            "channel": {"id": "C3", "name": "mine", "is_member": True},
+        }
+    )
+
+    assert directory.channel_name_to_id() == {"one": "C1", "mine": "C3"}
+
+
+class FailingInfoWebClient(PagedWebClient):
+
+    def conversations_info(self, channel: str):
+        self.pages = [[{"id": "C1", "name": "one"}, {"id": channel, "name": "two"}]]
+        response = SimpleNamespace(status_code=400, headers={})
+        raise SlackApiError("channel_not_found", response)
+
+
+def test_failed_join_lookup_waits_for_the_next_refresh(caplog):
+
+    client = FailingInfoWebClient([[{"id": "C1", "name": "one"}]])
+    sender = SlackSender(client, max_retries=0)
+    directory = ChannelDirectory(client, "U0", refresh_seconds=None, sender=sender)
+    directory.load()
+    changes = []
+    directory.on_change(lambda: changes.append(directory.channel_name_to_id()))
+
+    assert directory.apply_event(
+        {"type": "member_joined_channel", "user": "U0", "channel": "C2"}
+    )
+    sender.join()
+
+    assert directory.get("C2") is None
+    assert changes == []
+    assert "added at the next refresh" in caplog.text
+
+    directory.load()
+
+    assert changes == [{"one": "C1", "two": "C2"}]
+    sender.shutdown()
+
+
+class Poet(Character):
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        return True
+
+
+class PoetryProduction:
+
+    def __init__(self):
+        self.poet = Poet(None)
+
+    def places(self, channel_name_to_id: dict) -> dict[str, Character]:
+        if "poetry" not in channel_name_to_id:
+            return {}
+        return {channel_name_to_id["poetry"]: self.poet}
+
+
+class RecordingAdmission:
+
+    def __init__(self):
+        self.admitted = []
+
+    def admit(self, channel_id: str, priority: int, fn, *args) -> str:
+        self.admitted.append((channel_id, args))
+        return "dispatched"
+
+
+class SocketModeStandIn:
+
+    def send_socket_mode_response(self, response) -> None:
+        pass
+
+
+def events_request(event_id: str, event: dict) -> SimpleNamespace:
+    return SimpleNamespace(
+        type="events_api",
+        envelope_id=event_id,
+        retry_attempt=None,
+        payload={"event_id": event_id, "event": event},
+    )
+
+
+def test_message_in_channel_joined_later_is_dispatched():
+
+    client = PagedWebClient([[{"id": "A1", "name": "admin"}]])
+    client.conversations_info = lambda channel: {
+        "channel": {"id": channel, "name": "poetry"}
+    }
+    directory = ChannelDirectory(client, "U0", refresh_seconds=None)
+    directory.load()
+
+    production = PoetryProduction()
+    places = Places(production, directory, Admin("A1", "admin"))
+    admission = RecordingAdmission()
+    listener = make_slack_listener(
+        "U0",
+        "A1",
+        directory,
+        places,
+        admission,
+        DedupCache(),
+        None,
+        None,
+        Console(quiet=True),
+    )
+    message = {"type": "message", "user": "U1", "channel": "C2", "text": "A sonnet?"}
+
+    listener(SocketModeStandIn(), events_request("E1", message))
+    assert admission.admitted == []
+
+    listener(
+        SocketModeStandIn(),
+        events_request(
+            "E2", {"type": "member_joined_channel", "user": "U0", "channel": "C2"}
+        ),
+    )
+    listener(SocketModeStandIn(), events_request("E3", {**message, "ts": "2"}))
+
+    assert [channel_id for channel_id, _ in admission.admitted] == ["C2"]
+    assert admission.admitted[0][1][2] is production.poet
+    assert places.get("A1").channel == "admin"
@@ -0,0 +1,92 @@
+import time
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.slack_response import SlackResponse
+
+from proscenium.interfaces.slack_outbound import SlackSender
+from proscenium.interfaces.slack_outbound import AdminDigest
+from proscenium.interfaces.slack_outbound import TokenBucket
+
+
+def rate_limited_response(retry_after: str) -> SlackResponse:
+    return SlackResponse(
+        client=None,
+        http_verb="POST",
+        api_url="https://slack.com/api/chat.postMessage",
+        req_args={},
+        data={"ok": False, "error": "ratelimited"},
+        headers={"Retry-After": retry_after},
+        status_code=429,
+    )
+
+
+class FlakyWebClient:
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.posted = []
+
+    def chat_postMessage(self, channel: str, text: str):
+        if self.failures > 0:
+            self.failures -= 1
+            raise SlackApiError("ratelimited", rate_limited_response("0.05"))
+        self.posted.append((channel, text))
+        return {"ok": True, "ts": str(len(self.posted))}
+
+
+def test_token_bucket_spaces_calls():
+
+    bucket = TokenBucket(per_minute=600, burst=1)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    assert elapsed >= 0.25, "Three calls past the burst wait 0.1s each"
+
+
+def test_sender_retries_after_rate_limit():
+
+    client = FlakyWebClient(failures=2)
+    sender = SlackSender(
+        client, backoff_seconds=0.01, rates_per_minute={"chat_postMessage": 6000}
+    )
+
+    response = sender.call("chat_postMessage", channel="C1", text="hello")
+    sender.shutdown()
+
+    assert response["ts"] == "1"
+    assert client.posted == [("C1", "hello")]
+
+
+def test_sender_keeps_channel_order():
+
+    client = FlakyWebClient(failures=0)
+    sender = SlackSender(client, rates_per_minute={"chat_postMessage": 6000})
+
+    for i in range(10):
+        sender.send("chat_postMessage", channel="C1", text=str(i))
+    sender.shutdown()
+
+    assert [text for _, text in client.posted] == [str(i) for i in range(10)]
+
+
+def test_admin_digest_batches_permalinks():
+
+    client = FlakyWebClient(failures=0)
+    sender = SlackSender(client)
+    digest = AdminDigest(sender, "ADMIN", interval_seconds=None, max_batch=3)
+
+    for i in range(4):
+        digest.add("C1", f"https://example.slack.com/archives/C1/p{i}")
+    sender.join()
+
+    assert len(client.posted) == 1, "One digest for the first full batch"
+    assert client.posted[0][0] == "ADMIN"
+    assert "p2" in client.posted[0][1]
+
+    digest.stop()
+    sender.shutdown()
+
+    assert len(client.posted) == 2, "Stopping flushes the remainder"
+    assert "p3" in client.posted[1][1]
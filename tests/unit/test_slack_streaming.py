@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from proscenium.interfaces.slack import stream_error_note
+from proscenium.interfaces.slack import stream_response
+from proscenium.interfaces.slack_async import stream_response as astream_response
+from proscenium.interfaces.slack_outbound import AdminDigest
+from proscenium.interfaces.slack_outbound import SlackSender
+
+
+class RecordingWebClient:
+
+    def __init__(self):
+        self.calls = []
+
+    def chat_postMessage(self, channel: str, text: str):
+        self.calls.append(("post", channel, text))
+        return {"ok": True, "ts": "1.0"}
+
+    def chat_update(self, channel: str, ts: str, text: str):
+        self.calls.append(("update", channel, text))
+        return {"ok": True, "ts": ts}
+
+    def chat_getPermalink(self, channel: str, message_ts: str):
+        return {"permalink": f"https://example.slack.com/archives/{channel}/p10"}
+
+
+def test_stream_response_edits_placeholder():
+
+    client = RecordingWebClient()
+    sender = SlackSender(client, rates_per_minute={"chat_update": 6000})
+    digest = AdminDigest(sender, "ADMIN", interval_seconds=None, max_batch=1)
+
+    stream_response(
+        sender, digest, "C1", iter(["Hermes ", "said ", "no."]), update_seconds=0
+    )
+    sender.join()
+    sender.shutdown()
+
+    assert client.calls[0] == ("post", "C1", "…")
+    assert client.calls[-2] == ("update", "C1", "Hermes said no.")
+    assert client.calls[-1][1] == "ADMIN", "Final message is linked in the digest"
+
+
+def test_failed_stream_is_finalized():
+
+    client = RecordingWebClient()
+    sender = SlackSender(client, rates_per_minute={"chat_update": 6000})
+    digest = AdminDigest(sender, "ADMIN", interval_seconds=None, max_batch=1)
+
+    def chunks():
+        yield "Hermes "
+        raise TimeoutError("provider timed out")
+
+    with pytest.raises(TimeoutError):
+        stream_response(sender, digest, "C1", chunks(), update_seconds=60)
+    sender.join()
+    sender.shutdown()
+
+    assert client.calls[-2] == ("update", "C1", "Hermes\n\n" + stream_error_note)
+    assert "…" not in client.calls[-2][2]
+
+
+class AsyncRecordingSender:
+
+    def __init__(self):
+        self.calls = []
+
+    async def call(self, method: str, **kwargs):
+        self.calls.append((method, kwargs.get("text")))
+        return {"ok": True, "ts": "1.0", "permalink": "https://example.slack.com/p10"}
+
+
+class NoDigest:
+
+    admin_channel_id = "ADMIN"
+
+    async def add(self, channel_id: str, permalink: str) -> None:
+        pass
+
+
+def test_failed_async_stream_is_finalized():
+
+    sender = AsyncRecordingSender()
+
+    async def chunks():
+        yield "Hermes "
+        raise ConnectionError("provider went away")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(astream_response(sender, NoDigest(), "C1", chunks(), 60))
+
+    assert ("chat_update", "Hermes\n\n" + stream_error_note) in sender.calls
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from proscenium.interfaces.slack import SocketModePool
+
+
+class FakeSocketModeClient:
+
+    reconnecting = 0
+    overlapped = False
+    lock = threading.Lock()
+
+    def __init__(self, reconnect_seconds: float = 0.0):
+        self.reconnect_seconds = reconnect_seconds
+        self.healthy = True
+        self.reconnects = []
+        self.disconnected = False
+        self.closed = False
+        self.socket_mode_request_listeners = []
+
+    def connect(self) -> None:
+        self.healthy = True
+
+    def is_connected(self) -> bool:
+        return self.healthy
+
+    def connect_to_new_endpoint(self, force: bool = False) -> None:
+        cls = type(self)
+        with cls.lock:
+            cls.reconnecting += 1
+            cls.overlapped = cls.overlapped or cls.reconnecting > 1
+        self.reconnects.append(time.monotonic())
+        time.sleep(self.reconnect_seconds)
+        self.healthy = True
+        with cls.lock:
+            cls.reconnecting -= 1
+
+    def disconnect(self) -> None:
+        self.disconnected = True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def pool_of(size: int, **kwargs) -> tuple[SocketModePool, list[FakeSocketModeClient]]:
+
+    clients = []
+
+    def client_factory() -> FakeSocketModeClient:
+        client = FakeSocketModeClient(reconnect_seconds=0.02)
+        clients.append(client)
+        return client
+
+    pool = SocketModePool(
+        "xapp-token", None, size=size, client_factory=client_factory, **kwargs
+    )
+    return pool, clients
+
+
+def test_unhealthy_connection_is_reconnected():
+
+    pool, clients = pool_of(3, health_check_seconds=0.05)
+    pool.connect()
+    clients[1].healthy = False
+
+    assert pool.connected() == 2
+
+    pool.start_health_checks()
+    deadline = time.monotonic() + 2.0
+    while len(clients[1].reconnects) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pool.disconnect()
+
+    assert len(clients[1].reconnects) >= 1
+    assert clients[0].reconnects == [] and clients[2].reconnects == []
+    assert pool.connected() == 3
+
+
+def test_reconnects_are_staggered():
+
+    FakeSocketModeClient.overlapped = False
+    pool, clients = pool_of(3, health_check_seconds=None, reconnect_stagger_seconds=0.1)
+    pool.connect()
+    clients[2].healthy = False
+
+    restart = threading.Thread(target=pool.restart)
+    restart.start()
+    time.sleep(0.01)
+    pool.check_health()
+    restart.join()
+
+    times = [client.reconnects[0] for client in clients]
+    assert times[1] - times[0] >= 0.1 and times[2] - times[1] >= 0.1
+    assert len(clients[2].reconnects) == 1, "Reconnected by the restart"
+    assert not FakeSocketModeClient.overlapped, "One reconnect at a time"
+
+
+def test_disconnect_closes_every_connection():
+
+    pool, clients = pool_of(4, health_check_seconds=0.01)
+    pool.connect()
+    pool.start_health_checks()
+
+    pool.disconnect()
+
+    assert all(client.disconnected and client.closed for client in clients)
+    assert pool._checker is None
@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from proscenium import Character
+from proscenium.interfaces.slack import handle_utterance
+from proscenium.interfaces.slack_async import handle_utterance as ahandle_utterance
+from proscenium.interfaces.slack_outbound import AdminDigest
+from proscenium.interfaces.slack_outbound import SlackSender
+from proscenium.speculation import SpeculationPool
+from proscenium.speculation import set_default_speculation_pool
+
+
+class RecordingWebClient:
+
+    def __init__(self):
+        self.posted = []
+
+    def chat_postMessage(self, channel: str, text: str):
+        self.posted.append((channel, text))
+        return {"ok": True, "ts": "1.0"}
+
+    def chat_getPermalink(self, channel: str, message_ts: str):
+        return {"permalink": f"https://example.slack.com/archives/{channel}/p10"}
+
+
+class SlowCharacter(Character):
+
+    def __init__(self):
+        super().__init__(admin_channel_id="ADMIN", speculate=True)
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        time.sleep(0.2)
+        return "please" in utterance
+
+    def handle(self, channel_id: str, speaker_id: str, utterance: str):
+        time.sleep(0.2)
+        yield channel_id, "answer"
+
+
+def test_speculative_handle_overlaps_wants_to_handle():
+
+    client = RecordingWebClient()
+    sender = SlackSender(client, rates_per_minute={"chat_postMessage": 6000})
+    digest = AdminDigest(sender, "ADMIN", interval_seconds=None)
+    character = SlowCharacter()
+
+    start = time.monotonic()
+    handle_utterance(sender, digest, character, "C1", "U1", "answer please")
+    sender.join()
+    elapsed = time.monotonic() - start
+
+    handle_utterance(sender, digest, character, "C1", "U1", "no thanks")
+    sender.join()
+    sender.shutdown()
+
+    assert client.posted == [("C1", "answer")]
+    assert elapsed < 0.35, "handle ran while wants_to_handle was deciding"
+    assert character.speculation_stats.used == 1
+    assert character.speculation_stats.wasted == 1
+
+
+class FailingDecisionCharacter(SlowCharacter):
+
+    def wants_to_handle(self, channel_id: str, speaker_id: str, utterance: str) -> bool:
+        raise TimeoutError("control flow model timed out")
+
+
+def test_saturated_pool_skips_speculation():
+
+    client = RecordingWebClient()
+    sender = SlackSender(client, rates_per_minute={"chat_postMessage": 6000})
+    digest = AdminDigest(sender, "ADMIN", interval_seconds=None)
+    character = SlowCharacter()
+    pool = SpeculationPool(workers=1)
+    set_default_speculation_pool(pool)
+
+    try:
+        assert pool.acquire(), "Another speculation holds the only slot"
+        handle_utterance(sender, digest, character, "C1", "U1", "answer please")
+        pool.release()
+        sender.join()
+    finally:
+        set_default_speculation_pool(SpeculationPool())
+        sender.shutdown()
+
+    assert client.posted == [("C1", "answer")]
+    assert character.speculation_stats.started == 0
+    assert character.speculation_stats.skipped == 1
+
+
+def test_failed_decision_discards_speculation():
+
+    character = FailingDecisionCharacter()
+
+    with pytest.raises(TimeoutError):
+        handle_utterance(None, None, character, "C1", "U1", "answer please")
+
+    assert character.speculation_stats.started == 1
+    assert character.speculation_stats.wasted == 1
+
+
+class AsyncRecordingSender:
+
+    def __init__(self):
+        self.posted = []
+
+    async def call(self, method: str, **kwargs):
+        if method == "chat_postMessage":
+            self.posted.append((kwargs["channel"], kwargs["text"]))
+        return {"ok": True, "ts": "1.0", "permalink": "https://example.slack.com/p10"}
+
+
+class NoDigest:
+
+    admin_channel_id = "ADMIN"
+
+    async def add(self, channel_id: str, permalink: str) -> None:
+        pass
+
+
+def test_async_speculative_handle():
+
+    sender = AsyncRecordingSender()
+    character = SlowCharacter()
+
+    async def run():
+        await ahandle_utterance(sender, NoDigest(), character, "C1", "U1", "please")
+        await ahandle_utterance(sender, NoDigest(), character, "C1", "U1", "no")
+
+    asyncio.run(run())
+
+    assert sender.posted == [("C1", "answer")]
+    assert character.speculation_stats.started == 2
+    assert character.speculation_stats.wasted == 1
+
+
+def test_async_failed_decision_discards_speculation():
+
+    character = FailingDecisionCharacter()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(ahandle_utterance(None, NoDigest(), character, "C1", "U1", "hi"))
+
+    assert character.speculation_stats.wasted == 1
+
+
+class StreamingCharacter(SlowCharacter):
+
+    def __init__(self):
+        super().__init__()
+        self.closed = threading.Event()
+        self.stream_closed = threading.Event()
+
+    def handle(self, channel_id: str, speaker_id: str, utterance: str):
+        try:
+            yield channel_id, self.stream()
+        finally:
+            self.closed.set()
+
+    def stream(self):
+        try:
+            while True:
+                time.sleep(0.05)
+                yield "chunk "
+        finally:
+            self.stream_closed.set()
+
+
+def test_discarded_speculation_closes_handle():
+
+    character = StreamingCharacter()
+
+    handle_utterance(None, None, character, "C1", "U1", "no thanks")
+
+    assert character.stream_closed.wait(1)
+    assert character.closed.wait(1)
+    assert character.speculation_stats.wasted == 1
+
+
+def test_async_discarded_speculation_closes_handle():
+
+    character = StreamingCharacter()
+
+    async def run():
+        await ahandle_utterance(None, NoDigest(), character, "C1", "U1", "no")
+        await asyncio.to_thread(character.stream_closed.wait, 1)
+
+    asyncio.run(run())
+
+    assert character.stream_closed.is_set()
+    assert character.closed.is_set()
+    assert character.speculation_stats.wasted == 1
@@ -0,0 +1,35 @@
+from proscenium.patterns.rag import rag_prompt
+from proscenium.tokens import ApproximateTokenizer
+from proscenium.tokens import TokenAccounting
+
+
+def test_least_similar_chunks_are_dropped_first():
+
+    chunks = [{"id": i, "entity": {"text": f"{'word ' * 50}{i}"}} for i in range(1, 5)]
+    tokenizer = ApproximateTokenizer()
+    everything = tokenizer.count(rag_prompt(chunks, "question?"))
+
+    prompt = rag_prompt(chunks, "question?", everything - 10, tokenizer)
+
+    assert "CHUNK 3." in prompt and "CHUNK 4." not in prompt
+    assert tokenizer.count(prompt) <= everything - 10
+
+
+def test_tool_results_are_trimmed_before_the_question():
+
+    accounting = TokenAccounting(budgets={"p": 60})
+    messages = [
+        {"role": "system", "content": "You are a calculator."},
+        {"role": "user", "content": "What is 2 + 2?"},
+        {"role": "tool", "tool_call_id": "1", "content": "4 " * 200},
+    ]
+
+    fitted, tokens, trimmed = accounting.fit_messages("p:m", messages)
+
+    assert fitted[:2] == messages[:2]
+    assert fitted[2]["content"].endswith("[truncated]")
+    assert tokens <= 60 and trimmed > 0
+    assert messages[2]["content"] == "4 " * 200
+
+    accounting.record("p:m", tokens, trimmed)
+    assert accounting.usage["p:m"].calls == 1
@@ -0,0 +1,69 @@
+from io import StringIO
+from types import SimpleNamespace
+
+from rich.console import Console
+
+from proscenium.complete import complete_simple
+from proscenium.tracing import Subscriber
+from proscenium.tracing import add_subscriber
+from proscenium.tracing import remove_subscriber
+from proscenium.tracing import span
+from proscenium.tracing_console import RichConsoleSubscriber
+
+
+class EchoChatCompletionClient:
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model: str, messages: list, **kwargs):
+        message = SimpleNamespace(content=messages[-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class RecordingSubscriber(Subscriber):
+
+    def __init__(self):
+        self.ended = []
+
+    def span_ended(self, span):
+        self.ended.append(span)
+
+
+def test_completions_are_traced_as_nested_spans():
+
+    recorder = RecordingSubscriber()
+    add_subscriber(recorder)
+    try:
+        with span("request", user="U1"):
+            complete_simple(EchoChatCompletionClient(), "p:m", "s", "hi", cache=False)
+    finally:
+        remove_subscriber(recorder)
+
+    completion, request = recorder.ended
+    assert completion.name == "completion" and completion.parent is request
+    assert completion.attributes["response"] == "hi"
+    assert completion.attributes["model_id"] == "p:m"
+    assert completion.end >= completion.start
+
+
+def test_console_rendering_happens_in_the_subscriber():
+
+    output = StringIO()
+    subscriber = RichConsoleSubscriber()
+    add_subscriber(subscriber)
+    try:
+        complete_simple(
+            EchoChatCompletionClient(),
+            "p:m",
+            "s",
+            "rendered later",
+            cache=False,
+            console=Console(file=output, width=120),
+        )
+        subscriber.join()
+    finally:
+        remove_subscriber(subscriber)
+
+    assert "complete_simple call" in output.getvalue()
+    assert "rendered later" in output.getvalue()